@@ -11,7 +11,7 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(EmailOTP)
 class EmailOTPAdmin(admin.ModelAdmin):
-    list_display = ['email', 'otp', 'created_at', 'attempts', 'is_used']
-    list_filter = ['is_used', 'created_at']
+    list_display = ['email', 'otp', 'created_at', 'attempts', 'is_used', 'is_invite']
+    list_filter = ['is_used', 'is_invite', 'created_at']
     search_fields = ['email']
 
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .models import UserProfile, EmailOTP
+from .tasks import send_invite_emails
+
+
+def _queue_invite_emails(invites):
+    """Hand the invitations to the bulk lane in batches; send inline if no broker is reachable."""
+    size = settings.INVITE_EMAIL_BATCH_SIZE
+    for start in range(0, len(invites), size):
+        batch = invites[start:start + size]
+        try:
+            send_invite_emails.apply_async((batch,), retry=False)
+        except Exception:
+            try:
+                send_invite_emails(batch)
+            except Exception as e:
+                # Log error in production
+                print(f"Error sending invitation emails: {e}")
+
+
+def invite_seekers(emails):
+    """
+    Create unverified Seeker accounts for the new addresses in `emails` and email each an OTP.
+
+    Returns (invited, existing) email lists. Invited accounts have no usable password
+    until they verify their email.
+    """
+    # Addresses differing only in case belong to the same mailbox; keep the first spelling given
+    first_spelling = {}
+    for email in emails:
+        first_spelling.setdefault(email.lower(), email)
+    emails = list(first_spelling.values())
+    lowered = list(first_spelling)
+    taken = set()
+    for email, username in User.objects.annotate(email_lower=Lower('email'), username_lower=Lower('username')).filter(
+        Q(email_lower__in=lowered) | Q(username_lower__in=lowered)
+    ).values_list('email_lower', 'username_lower'):
+        taken.update((email, username))
+    existing = [email for email in emails if email.lower() in taken]
+    invited = [email for email in emails if email.lower() not in taken]
+    if not invited:
+        return invited, existing
+
+    # One unusable password for everyone: no hashing, and login is refused until a password is set
+    password = make_password(None)
+    otps = {email: EmailOTP.generate_otp() for email in invited}
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=email, email=email, password=password, is_active=True) for email in invited
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, role='Seeker', is_email_verified=False) for user in users
+        ])
+        EmailOTP.objects.bulk_create([
+            EmailOTP(email=email, otp=otp, is_invite=True) for email, otp in otps.items()
+        ])
+        transaction.on_commit(lambda: _queue_invite_emails(list(otps.items())))
+    return invited, existing
@@ -30,6 +30,7 @@ class EmailOTP(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     attempts = models.IntegerField(default=0)
     is_used = models.BooleanField(default=False)
+    is_invite = models.BooleanField(default=False)
 
     class Meta:
         indexes = [
@@ -37,8 +38,11 @@ class EmailOTP(models.Model):
         ]
 
     def is_expired(self):
-        """Check if OTP is expired (5 minutes)."""
-        expiry_time = self.created_at + timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
+        """Check if OTP is expired (5 minutes, or the invitation lifetime for invites)."""
+        lifetime = timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
+        if self.is_invite:
+            lifetime = timedelta(hours=settings.INVITE_EXPIRY_HOURS)
+        expiry_time = self.created_at + lifetime
         return timezone.now() > expiry_time
 
     def can_attempt(self):
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from .models import UserProfile, EmailOTP
-from django.core.mail import send_mail
+from .tasks import send_otp_email
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
@@ -41,18 +41,15 @@ class SignupSerializer(serializers.Serializer):
         otp = EmailOTP.generate_otp()
         EmailOTP.objects.create(email=email, otp=otp)
 
-        # Send OTP email (in production, use proper email service)
+        # Send OTP email on the high-priority queue; send inline if no broker is reachable
         try:
-            send_mail(
-                subject='Verify your email - Events Platform',
-                message=f'Your OTP is: {otp}. It will expire in {settings.OTP_EXPIRY_MINUTES} minutes.',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            # Log error in production
-            print(f"Error sending email: {e}")
+            send_otp_email.apply_async((email, otp), retry=False)
+        except Exception:
+            try:
+                send_otp_email(email, otp)
+            except Exception as e:
+                # Log error in production
+                print(f"Error sending email: {e}")
 
         return user
 
@@ -61,6 +58,8 @@ class VerifyEmailSerializer(serializers.Serializer):
     """Serializer for email verification."""
     email = serializers.EmailField()
     otp = serializers.CharField(max_length=6)
+    # Invited seekers choose their password when verifying
+    password = serializers.CharField(write_only=True, required=False, validators=[validate_password])
 
     def validate(self, attrs):
         """Validate OTP."""
@@ -96,6 +95,9 @@ class VerifyEmailSerializer(serializers.Serializer):
             else:
                 raise serializers.ValidationError({"otp": "Maximum attempts exceeded. Please request a new OTP."})
 
+        if not user.has_usable_password() and not attrs.get('password'):
+            raise serializers.ValidationError({"password": "Choose a password to finish accepting the invitation."})
+
         attrs['otp_obj'] = otp_obj
         attrs['user'] = user
         return attrs
@@ -108,6 +110,10 @@ class VerifyEmailSerializer(serializers.Serializer):
         otp_obj.is_used = True
         otp_obj.save()
 
+        if self.validated_data.get('password'):
+            user.set_password(self.validated_data['password'])
+            user.save(update_fields=['password'])
+
         profile = user.profile
         profile.is_email_verified = True
         profile.save()
@@ -115,6 +121,13 @@ class VerifyEmailSerializer(serializers.Serializer):
         return user
 
 
+class InviteSerializer(serializers.Serializer):
+    """Serializer for bulk seeker invitations."""
+    emails = serializers.ListField(
+        child=serializers.EmailField(), allow_empty=False, max_length=settings.INVITE_MAX_EMAILS
+    )
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user information."""
     role = serializers.CharField(source='profile.role', read_only=True)
@@ -0,0 +1,44 @@
+import logging
+from celery import shared_task
+from django.core.mail import EmailMessage, send_mail
+from django.conf import settings
+from events_platform.mail import PartialSendError, retry_countdown, send_in_order
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def send_otp_email(email, otp):
+    """Send an email verification OTP (routed to the high-priority otp queue)."""
+    send_mail(
+        subject='Verify your email - Events Platform',
+        message=f'Your OTP is: {otp}. It will expire in {settings.OTP_EXPIRY_MINUTES} minutes.',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+        fail_silently=False,
+    )
+
+
+@shared_task(bind=True, ignore_result=True)
+def send_invite_emails(self, invites):
+    """Send a batch of (email, otp) invitations over one SMTP connection, retrying unsent invitations."""
+    messages = [
+        EmailMessage(
+            subject='You are invited - Events Platform',
+            body=(
+                f'You have been invited to Events Platform. Your OTP is: {otp}. Verify your email with it '
+                f'and choose a password within {settings.INVITE_EXPIRY_HOURS} hours.'
+            ),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email],
+        )
+        for email, otp in invites
+    ]
+    try:
+        send_in_order(messages)
+    except PartialSendError as error:
+        logger.warning('Invitation batch reached %d of %d addresses; retrying the rest', error.sent, len(invites))
+        raise self.retry(
+            args=(invites[error.sent:],),
+            exc=error, countdown=retry_countdown(self.request.retries), max_retries=settings.EMAIL_MAX_RETRIES,
+        )
@@ -0,0 +1,131 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from events_platform.throttling import SlidingWindowThrottle
+from .models import EmailOTP, UserProfile
+from .tasks import send_invite_emails
+
+RATES = {'login': '3/min', 'signup': '3/min', 'verify_email': '3/min', 'enroll': '3/min'}
+
+
+@mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', RATES)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, **headers):
+        return self.client.post(
+            '/api/auth/login/', {'email': 'nobody@example.com', 'password': 'wrong'}, **headers
+        )
+
+    def test_anonymous_requests_over_the_rate_get_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 401)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_rotating_forwarded_for_does_not_reset_the_bucket(self):
+        for i in range(3):
+            self.login(HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR='10.0.0.99').status_code, 429)
+
+    def test_clients_are_counted_apart_by_address(self):
+        for _ in range(3):
+            self.login(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 401)
+
+    def test_previous_window_still_counts_after_it_closes(self):
+        with mock.patch.object(SlidingWindowThrottle, 'timer', return_value=30.0):
+            for _ in range(3):
+                self.login()
+        # 10s into the next window the previous one still weighs 5/6 of its 3 requests
+        with mock.patch.object(SlidingWindowThrottle, 'timer', return_value=70.0):
+            self.assertEqual(self.login().status_code, 401)
+            self.assertEqual(self.login().status_code, 429)
+        with mock.patch.object(SlidingWindowThrottle, 'timer', return_value=119.0):
+            self.assertEqual(self.login().status_code, 401)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, EMAIL_RETRY_BACKOFF_SECONDS=0)
+class InviteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        facilitator = User.objects.create_user(
+            username='host@example.com', email='host@example.com', password='Str0ng-pass!'
+        )
+        UserProfile.objects.create(user=facilitator, role='Facilitator', is_email_verified=True)
+        self.client = APIClient()
+        self.client.force_authenticate(facilitator)
+
+    def invite(self, emails):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/auth/invite/', {'emails': emails}, format='json')
+
+    def otp_for(self, email):
+        return EmailOTP.objects.get(email=email, is_invite=True).otp
+
+    def test_bulk_invite_creates_unverified_seekers_and_mails_each_an_otp(self):
+        emails = [f'seeker{i}@example.com' for i in range(5)]
+        with self.settings(INVITE_EMAIL_BATCH_SIZE=2):
+            response = self.invite(emails)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['invited'], emails)
+        users = User.objects.filter(email__in=emails).select_related('profile')
+        self.assertEqual(len(users), 5)
+        for user in users:
+            self.assertEqual(user.profile.role, 'Seeker')
+            self.assertFalse(user.profile.is_email_verified)
+            self.assertFalse(user.has_usable_password())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), emails)
+        self.assertIn(self.otp_for(emails[0]), next(m.body for m in mail.outbox if m.to == [emails[0]]))
+
+    def test_invited_seeker_sets_a_password_when_verifying(self):
+        self.invite(['new@example.com'])
+        login = {'email': 'new@example.com', 'password': 'An0ther-pass!'}
+        self.assertEqual(self.client.post('/api/auth/login/', login).status_code, 403)
+
+        verify = {'email': 'new@example.com', 'otp': self.otp_for('new@example.com')}
+        response = self.client.post('/api/auth/verify-email/', verify)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.data)
+
+        response = self.client.post('/api/auth/verify-email/', {**verify, 'password': 'An0ther-pass!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', self.client.post('/api/auth/login/', login).data)
+
+    def test_existing_addresses_are_reported_whatever_their_case(self):
+        self.invite(['taken@example.com'])
+        mail.outbox.clear()
+        response = self.invite(['Taken@Example.com', 'fresh@example.com', 'FRESH@example.com'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['existing'], ['Taken@Example.com'])
+        self.assertEqual(response.data['invited'], ['fresh@example.com'])
+        self.assertEqual(User.objects.filter(email__iexact='fresh@example.com').count(), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['fresh@example.com']])
+
+    def test_nothing_new_to_invite_returns_200(self):
+        self.invite(['taken@example.com'])
+        response = self.invite(['TAKEN@example.com'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['invited'], [])
+
+    def test_failed_send_retries_only_the_unsent_invitations(self):
+        send_messages, failed = LocmemBackend.send_messages, []
+
+        def flaky(backend, messages):
+            if messages[0].to == ['b@example.com'] and not failed:
+                failed.append(True)
+                raise ConnectionError('connection reset')
+            return send_messages(backend, messages)
+
+        invites = [('a@example.com', '111111'), ('b@example.com', '222222'), ('c@example.com', '333333')]
+        with mock.patch.object(LocmemBackend, 'send_messages', flaky), self.assertLogs('accounts.tasks', 'WARNING'):
+            send_invite_emails.apply(args=(invites,))
+        self.assertEqual([message.to[0] for message in mail.outbox], [email for email, _ in invites])
@@ -1,18 +1,22 @@
 from rest_framework import status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from django.db import IntegrityError
 from .models import UserProfile, EmailOTP
-from .serializers import SignupSerializer, VerifyEmailSerializer, UserSerializer
-from .permissions import IsVerified
+from .invitations import invite_seekers
+from .serializers import SignupSerializer, VerifyEmailSerializer, InviteSerializer, UserSerializer
+from .permissions import IsVerified, IsFacilitator
+from events_platform.throttling import LoginThrottle, SignupThrottle, VerifyEmailThrottle
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """Custom login view that checks email verification."""
     permission_classes = [AllowAny]
+    throttle_classes = [LoginThrottle]
 
     def post(self, request, *args, **kwargs):
         email = request.data.get('email')
@@ -55,7 +59,9 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes([SignupThrottle])
 def signup(request):
     """Create unverified user and send OTP."""
     serializer = SignupSerializer(data=request.data)
@@ -72,7 +78,9 @@ def signup(request):
 
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes([VerifyEmailThrottle])
 def verify_email(request):
     """Verify email with OTP."""
     serializer = VerifyEmailSerializer(data=request.data)
@@ -88,6 +96,27 @@ def verify_email(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsVerified, IsFacilitator])
+def invite(request):
+    """Create Seeker accounts for a list of emails and send each an invitation OTP."""
+    serializer = InviteSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        invited, existing = invite_seekers(serializer.validated_data['emails'])
+    except IntegrityError:
+        # Someone signed up with one of the addresses meanwhile
+        return Response(
+            {'detail': 'Some of these emails were registered meanwhile. Please try again.', 'code': 'invite_conflict'},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(
+        {'detail': f'Invited {len(invited)} seekers.', 'code': 'invite_success', 'invited': invited, 'existing': existing},
+        status=status.HTTP_201_CREATED if invited else status.HTTP_200_OK
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsVerified])
 def user_profile(request):
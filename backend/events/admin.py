@@ -1,17 +1,222 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Event, Enrollment
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Event, Enrollment, ArchivedEvent, ArchivedEnrollment
+from .sharding import enrollment_shards, is_sharded, shard_for_enrollment
+
+
+def estimated_row_count(model, using=None):
+    """Planner row estimate for a model's table, or None where the database keeps none."""
+    connection = connections[using or model.objects.db]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # Both ends of the rowid come straight off the primary key; close enough for page links
+            # (enrollment shards number from their own id block, so the lowest id is not 1)
+            cursor.execute(f'SELECT MAX(rowid) - MIN(rowid) + 1 FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    # Postgres reports -1 for tables that were never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never counts a whole large table."""
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not self.object_list.query.where:
+            estimate = estimated_row_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        # Filtered lists are counted up to the limit and no further
+        return self.object_list.order_by()[:limit].count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Changelists whose cost does not grow with the table."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class StartsFilter(admin.SimpleListFilter):
+    """Upcoming / in progress / past, from indexed range lookups."""
+    title = 'when'
+    parameter_name = 'when'
+
+    def lookups(self, request, model_admin):
+        return [('upcoming', 'Upcoming'), ('ongoing', 'In progress'), ('past', 'Past')]
+
+    def queryset(self, request, queryset):
+        now = timezone.now()
+        if self.value() == 'upcoming':
+            return queryset.filter(starts_at__gt=now)
+        if self.value() == 'ongoing':
+            return queryset.filter(starts_at__lte=now, ends_at__gte=now)
+        if self.value() == 'past':
+            return queryset.filter(ends_at__lt=now)
+        return queryset
+
+
+class LanguageFilter(admin.SimpleListFilter):
+    """Language choices from a cached DISTINCT instead of one per page load."""
+    title = 'language'
+    parameter_name = 'language'
+
+    def lookups(self, request, model_admin):
+        cache_key = f'admin:{model_admin.model._meta.label_lower}:languages'
+        languages = cache.get(cache_key)
+        if languages is None:
+            languages = list(
+                model_admin.model.objects.order_by('language').values_list('language', flat=True).distinct()
+            )
+            cache.set(cache_key, languages, settings.ADMIN_FILTER_CACHE_SECONDS)
+        return [(language, language) for language in languages]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(language=self.value())
+        return queryset
+
+
+class EventChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # One grouped count per shard for the rows on this page only
+        counts = Event.enrolled_counts([event.pk for event in self.result_list])
+        for event in self.result_list:
+            event.enrolled_count = counts.get(event.pk, 0)
 
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(ScalableAdmin):
     list_display = ['title', 'location', 'language', 'starts_at', 'created_by', 'total_enrollments', 'capacity']
-    list_filter = ['language', 'location', 'starts_at']
-    search_fields = ['title', 'description', 'location']
+    list_filter = [StartsFilter, LanguageFilter]
+    list_select_related = ['created_by']
+    search_fields = ['title', 'location']
+    autocomplete_fields = ['created_by']
+
+    def get_changelist(self, request, **kwargs):
+        return EventChangeList
+
+    @admin.display(description='Total enrollments')
+    def total_enrollments(self, obj):
+        return obj.enrolled_count
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Shard whose enrollments are listed; a changelist cannot span databases."""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in enrollment_shards()]
+
+    def value(self):
+        value = super().value()
+        return value if value in enrollment_shards() else enrollment_shards()[0]
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(self.value())
+
+
+class EnrollmentChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Events and seekers live in default; attach them to the page's rows in two queries
+        events = Event.objects.in_bulk({enrollment.event_id for enrollment in self.result_list})
+        seekers = User.objects.in_bulk({enrollment.seeker_id for enrollment in self.result_list})
+        for enrollment in self.result_list:
+            if enrollment.event_id in events:
+                enrollment.event = events[enrollment.event_id]
+            if enrollment.seeker_id in seekers:
+                enrollment.seeker = seekers[enrollment.seeker_id]
 
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(ScalableAdmin):
+    """
+    With sharding the changelist shows one shard at a time and is read-only: rows are
+    listed without joins, and searching by event title or seeker email is unavailable.
+    """
     list_display = ['event', 'seeker', 'status', 'created_at']
     list_filter = ['status', 'created_at']
+    list_select_related = ['event', 'seeker']
     search_fields = ['event__title', 'seeker__email']
+    autocomplete_fields = ['event', 'seeker']
+
+    def get_list_filter(self, request):
+        if is_sharded():
+            return [ShardFilter, *self.list_filter]
+        return self.list_filter
+
+    def get_list_select_related(self, request):
+        # An empty list, not False, which would join every related field in list_display
+        return [] if is_sharded() else self.list_select_related
+
+    def get_search_fields(self, request):
+        return [] if is_sharded() else self.search_fields
+
+    def get_changelist(self, request, **kwargs):
+        return EnrollmentChangeList if is_sharded() else ChangeList
+
+    def get_object(self, request, object_id, from_field=None):
+        if is_sharded():
+            try:
+                return Enrollment.objects.using(shard_for_enrollment(object_id)).get(pk=object_id)
+            except (Enrollment.DoesNotExist, ValueError):
+                return None
+        return super().get_object(request, object_id, from_field)
+
+    def has_add_permission(self, request):
+        return not is_sharded() and super().has_add_permission(request)
 
+    def has_change_permission(self, request, obj=None):
+        return not is_sharded() and super().has_change_permission(request, obj)
+
+
+
+class ReadOnlyAdmin(ScalableAdmin):
+    """Archive tables are written only by the archival job."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedEvent)
+class ArchivedEventAdmin(ReadOnlyAdmin):
+    list_display = ['title', 'location', 'language', 'starts_at', 'ends_at', 'created_by', 'capacity', 'archived_at']
+    list_filter = [LanguageFilter]
+    list_select_related = ['created_by']
+    search_fields = ['title', 'location']
+    raw_id_fields = ['created_by']
+
+
+@admin.register(ArchivedEnrollment)
+class ArchivedEnrollmentAdmin(ReadOnlyAdmin):
+    list_display = ['event', 'seeker', 'status', 'created_at']
+    list_filter = ['status']
+    list_select_related = ['event', 'seeker']
+    search_fields = ['event__title', 'seeker__email']
+    raw_id_fields = ['event', 'seeker']
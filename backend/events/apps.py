@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
 
+    def ready(self):
+        from events_platform import query_shapes, tracing
+        from . import signals  # noqa: F401
+        post_migrate.connect(signals.reserve_shard_ids, sender=self)
+        tracing.install()
+        query_shapes.install()
@@ -0,0 +1,112 @@
+"""Hot/cold split: move long-finished events and their enrollments into archive tables."""
+from datetime import timedelta
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from .models import (
+    Event, Enrollment, EventChange, EventDailyRollup, Notification, Recommendation, Tombstone,
+    ArchivedEvent, ArchivedEnrollment, ArchivedEventDailyRollup,
+)
+from .sharding import group_by_shard
+
+EVENT_COLUMNS = (
+    'id', 'title', 'description', 'language', 'location', 'starts_at', 'ends_at',
+    'capacity', 'created_by_id', 'created_at', 'updated_at'
+)
+ENROLLMENT_COLUMNS = ('id', 'event_id', 'seeker_id', 'status', 'created_at', 'updated_at')
+ROLLUP_COLUMNS = ('event_id', 'day', 'enrolled', 'canceled')
+
+
+def delete_where_in(model, field, values, using=DEFAULT_DB_ALIAS):
+    """Set-based DELETE that skips the cascade collector and delete signals."""
+    if not values:
+        return 0
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field).column)
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', list(values))
+        return cursor.rowcount
+
+
+def archive_enrollments(alias, event_ids, chunk_size=5000):
+    """
+    Move the enrollments of `event_ids` on shard `alias` to the archive, one short transaction
+    per chunk; returns how many were moved.
+
+    Each chunk deletes exactly the rows it copied, so an enrollment written meanwhile is
+    left for a later chunk instead of being deleted unarchived. The archive copy commits
+    before the shard delete, and copying again is a no-op, so a failure in between only
+    leaves rows to be retried.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic(using=alias), transaction.atomic():
+            rows = list(
+                Enrollment.objects.using(alias).filter(event_id__in=event_ids)
+                .order_by('id').values(*ENROLLMENT_COLUMNS)[:chunk_size]
+            )
+            if not rows:
+                return moved
+            ids = [row['id'] for row in rows]
+            ArchivedEnrollment.objects.bulk_create([ArchivedEnrollment(**row) for row in rows], ignore_conflicts=True)
+            Tombstone.objects.bulk_create([
+                Tombstone(kind='enrollment', reason='archived', object_id=row['id'], owner_id=row['seeker_id'])
+                for row in rows
+            ])
+            Notification.objects.filter(enrollment_id__in=ids).delete()
+            moved += delete_where_in(Enrollment, 'id', ids, using=alias)
+
+
+def archive_events(event_ids, chunk_size=5000):
+    """
+    Copy events, their enrollments and their daily rollups to the archive, then delete them
+    from the hot tables.
+
+    The deletes are set-based, so they do here what the cascade and the delete signals would:
+    recommendations and pending change notices go, and sync clients get tombstones.
+    """
+    # Archived enrollments point at their archived event, so the events are copied first
+    events = list(Event.objects.filter(id__in=event_ids).values(*EVENT_COLUMNS))
+    event_ids = [row['id'] for row in events]
+    ArchivedEvent.objects.bulk_create([ArchivedEvent(**row) for row in events], ignore_conflicts=True)
+
+    shards = group_by_shard(event_ids)
+    for alias, shard_event_ids in shards.items():
+        archive_enrollments(alias, shard_event_ids, chunk_size)
+
+    with transaction.atomic():
+        ArchivedEventDailyRollup.objects.bulk_create([
+            ArchivedEventDailyRollup(**row)
+            for row in EventDailyRollup.objects.filter(event_id__in=event_ids).values(*ROLLUP_COLUMNS)
+        ], ignore_conflicts=True)
+        Tombstone.objects.bulk_create([
+            Tombstone(kind='event', reason='archived', object_id=row['id'], owner_id=row['created_by_id'])
+            for row in events
+        ])
+        delete_where_in(Recommendation, 'event', event_ids)
+        delete_where_in(EventChange, 'event', event_ids)
+        delete_where_in(EventDailyRollup, 'event', event_ids)
+        archived = delete_where_in(Event, 'id', event_ids)
+
+    # Enrollments written while the events were being archived
+    for alias, shard_event_ids in shards.items():
+        archive_enrollments(alias, shard_event_ids, chunk_size)
+    return archived
+
+
+def archive_past_events(days=None, batch_size=None):
+    """Archive, batch by batch, every event that ended more than `days` ago."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+
+    archived = 0
+    while True:
+        event_ids = list(
+            Event.objects.filter(ends_at__lt=cutoff).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not event_ids:
+            return archived
+        archived += archive_events(event_ids)
@@ -0,0 +1,172 @@
+"""Helpers shared by the benchmark management commands."""
+import socketserver
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from accounts.models import UserProfile
+from .models import Event, Enrollment
+from .sharding import enrollment_shards, shard_for_event
+
+
+@contextmanager
+def rolled_back():
+    """Run a block inside a transaction (one per database) that is always rolled back."""
+    aliases = {DEFAULT_DB_ALIAS, *enrollment_shards()}
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+        for alias in aliases:
+            transaction.set_rollback(True, using=alias)
+
+
+def timed(func, repeat=1):
+    """Return the best wall-clock time of `repeat` calls and the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class QueryCounter:
+    """Execute wrapper that counts statements, from any thread."""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def counted_queries():
+    """
+    Count every statement run in the block, on every database, without the size cap
+    of `connection.queries_log`. Connections opened meanwhile (fan_out threads) count too.
+    """
+    counter = QueryCounter()
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(counter)
+
+    connection_created.connect(install)
+    try:
+        with ExitStack() as stack:
+            for alias in {DEFAULT_DB_ALIAS, *enrollment_shards()}:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            yield counter
+    finally:
+        connection_created.disconnect(install)
+
+
+def seed_users(count, role='Seeker', prefix='bench'):
+    """Create verified users with profiles in bulk."""
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(
+            username=f'{prefix}-{role.lower()}-{i}@example.com',
+            email=f'{prefix}-{role.lower()}-{i}@example.com',
+            password=password,
+        )
+        for i in range(count)
+    ])
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, role=role, is_email_verified=True) for user in users
+    ])
+    return users
+
+
+def seed_events(facilitator, count, starts_at=None, duration=timedelta(hours=2), capacity=None, spacing=timedelta(hours=1)):
+    """Create `count` events for a facilitator, `spacing` apart."""
+    starts_at = starts_at or timezone.now() + timedelta(days=1)
+    return Event.objects.bulk_create([
+        Event(
+            title=f'Benchmark event {i}',
+            description='Benchmark event description. ' * 20,
+            language='English',
+            location=f'Room {i % 10}',
+            starts_at=starts_at + spacing * i,
+            ends_at=starts_at + spacing * i + duration,
+            capacity=capacity,
+            created_by=facilitator,
+        )
+        for i in range(count)
+    ])
+
+
+def seed_enrollments(events, seekers, status='enrolled', batch_size=5000):
+    """Enroll every seeker in every event, on each event's shard."""
+    by_shard = {}
+    for event in events:
+        by_shard.setdefault(shard_for_event(event.id), []).append(event)
+
+    enrollments = []
+    for alias, shard_events in by_shard.items():
+        enrollments.extend(Enrollment.objects.using(alias).bulk_create(
+            [
+                Enrollment(
+                    event=event,
+                    seeker=seeker,
+                    status=status,
+                    event_starts_at=event.starts_at,
+                    event_ends_at=event.ends_at,
+                )
+                for event in shard_events for seeker in seekers
+            ],
+            batch_size=batch_size,
+        ))
+    return enrollments
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accept every command and sleep before acknowledging each message."""
+
+    def handle(self):
+        self.wfile.write(b'220 fake ESMTP\r\n')
+        for line in self.rfile:
+            command = line[:4].upper()
+            if command == b'DATA':
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                time.sleep(self.server.latency)
+                with self.server.lock:
+                    self.server.messages += 1
+                self.wfile.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+@contextmanager
+def fake_smtp_server(latency=0.0):
+    """Run a local SMTP server that takes `latency` seconds per message; yields it with `.port` and `.messages`."""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeSMTPHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.messages = 0
+    server.port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,92 @@
+"""
+Per-day event counts and remaining seats for one calendar month.
+
+Days follow the server's time zone. Summaries are cached per month (and
+split); saving or deleting an event drops the summaries of the months it
+was in and is in now. Remaining seats also move with enrollments, which do
+not invalidate, so those lag by at most `EVENT_CALENDAR_CACHE_SECONDS`.
+"""
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+from .models import Enrollment, Event
+from .sharding import is_sharded
+
+SPLITS = ('language', 'location')
+
+
+def month_bounds(month):
+    """Aware [start, end) datetimes of the month containing the date `month`."""
+    tz = timezone.get_current_timezone()
+    start = datetime(month.year, month.month, 1)
+    end = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+
+
+def cache_key(month, split=None):
+    return f'events:calendar:{month:%Y-%m}:{split or "all"}'
+
+
+def invalidate_months(*moments):
+    """Drop the cached summaries of the months containing each of `moments`."""
+    months = {timezone.localtime(moment).date() for moment in moments if moment is not None}
+    cache.delete_many([cache_key(month, split) for month in months for split in (None, *SPLITS)])
+
+
+def _day_rows(events, split):
+    """Events and remaining seats per day (and split value) in one grouped query."""
+    group = ('day', split) if split else ('day',)
+    enrolled = Enrollment.objects.filter(event=OuterRef('pk'), status='enrolled').order_by().values(
+        'event'
+    ).annotate(count=Count('id')).values('count')
+    remaining = Case(
+        When(capacity__isnull=False, then=Greatest(F('capacity') - Coalesce(Subquery(enrolled), 0), Value(0))),
+        output_field=IntegerField(),
+    )
+    return list(events.values(*group).annotate(
+        events=Count('id'),
+        remaining_seats=Sum(remaining),
+        unlimited_events=Count('id', filter=Q(capacity__isnull=True)),
+    ).order_by(*group))
+
+
+def _sharded_day_rows(events, split):
+    """As `_day_rows`, counting enrollments with one grouped query per shard."""
+    columns = ('day', split) if split else ('day',)
+    listed = list(events.values('id', 'capacity', *columns))
+    enrolled = Event.enrolled_counts([row['id'] for row in listed])
+    days = {}
+    for row in listed:
+        key = tuple(row[column] for column in columns)
+        day = days.setdefault(key, {
+            **dict(zip(columns, key)), 'events': 0, 'remaining_seats': None, 'unlimited_events': 0,
+        })
+        day['events'] += 1
+        if row['capacity'] is None:
+            day['unlimited_events'] += 1
+        else:
+            seats = max(row['capacity'] - enrolled.get(row['id'], 0), 0)
+            day['remaining_seats'] = (day['remaining_seats'] or 0) + seats
+    return [days[key] for key in sorted(days)]
+
+
+def month_summary(month, split=None):
+    """Per-day totals for the month containing the date `month`, optionally split by language or location."""
+    key = cache_key(month, split)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    start, end = month_bounds(month)
+    events = Event.objects.filter(starts_at__gte=start, starts_at__lt=end).annotate(
+        day=TruncDate('starts_at', tzinfo=timezone.get_current_timezone())
+    )
+    rows = _sharded_day_rows(events, split) if is_sharded() else _day_rows(events, split)
+    for row in rows:
+        row['day'] = row['day'].isoformat()
+    summary = {'month': f'{month:%Y-%m}', 'split': split, 'days': rows}
+    cache.set(key, summary, settings.EVENT_CALENDAR_CACHE_SECONDS)
+    return summary
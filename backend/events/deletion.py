@@ -0,0 +1,47 @@
+"""
+Delete events without handing their enrollments to the cascade collector.
+
+The collector loads every enrollment of an event as an object so it can send
+its delete signals, all inside one transaction. Here an event's enrollments
+go in keyset chunks of plain ids, each chunk in its own short transaction,
+doing what the cascade and the Enrollment delete signals would have done.
+The event itself is deleted last, once the cascade has nothing left to load.
+"""
+from django.conf import settings
+from django.db import transaction
+from .archive import delete_where_in
+from .models import Enrollment, Notification, Tombstone
+from .sharding import shard_for_event
+
+
+def delete_event_enrollments(event_id, chunk_size=None):
+    """Delete an event's enrollments chunk by chunk; returns how many were deleted."""
+    chunk_size = chunk_size or settings.EVENT_DELETE_CHUNK_SIZE
+    alias = shard_for_event(event_id)
+    deleted = 0
+    last_id = 0
+    while True:
+        rows = list(
+            Enrollment.objects.using(alias).filter(event_id=event_id, id__gt=last_id)
+            .order_by('id').values_list('id', 'seeker_id')[:chunk_size]
+        )
+        if not rows:
+            return deleted
+        ids = [enrollment_id for enrollment_id, _ in rows]
+        with transaction.atomic(), transaction.atomic(using=alias):
+            # Sync clients still learn about every enrollment that disappears
+            Tombstone.objects.bulk_create([
+                Tombstone(kind='enrollment', object_id=enrollment_id, owner_id=seeker_id)
+                for enrollment_id, seeker_id in rows
+            ])
+            Notification.objects.filter(enrollment_id__in=ids).delete()
+            deleted += delete_where_in(Enrollment, 'id', ids, using=alias)
+        last_id = ids[-1]
+
+
+def delete_event(event, chunk_size=None):
+    """Delete an event after clearing its enrollments in chunks; returns the enrollments deleted."""
+    deleted = delete_event_enrollments(event.pk, chunk_size)
+    # Enrollments added while the chunks ran are left to the cascade
+    event.delete()
+    return deleted
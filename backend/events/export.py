@@ -0,0 +1,177 @@
+"""
+Columnar export of events, enrollments and tombstones for offline reporting.
+
+Each table is read a chunk at a time in keyset order on (updated_at, id), or
+(deleted_at, id) for tombstones, and every chunk is written as one Parquet
+row group (or Arrow IPC record batch), so memory depends on the chunk size
+and not on the table. The last
+exported key per table (and per shard for enrollments) is kept in
+`_cursors.json` in the export directory; the next run only exports rows
+changed since. A row updated again appears in a later file, so readers keep
+the newest copy of each id, and deletions arrive through the tombstones
+export; their `reason` tells rows deleted from rows moved to the archive. Rows newer than `ANALYTICS_EXPORT_LAG_SECONDS` wait for the next
+run, so transactions still open at export time are not skipped.
+"""
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Enrollment, Event, Tombstone
+from .sharding import enrollment_shards
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    # pyarrow is only needed by the export
+    pyarrow = None
+
+# table name -> (model, columns, keyset timestamp field)
+EXPORTS = {
+    'events': (Event, (
+        'id', 'title', 'description', 'language', 'location', 'starts_at', 'ends_at',
+        'capacity', 'created_by_id', 'created_at', 'updated_at'
+    ), 'updated_at'),
+    'enrollments': (Enrollment, (
+        'id', 'event_id', 'seeker_id', 'status', 'event_starts_at', 'event_ends_at', 'created_at', 'updated_at'
+    ), 'updated_at'),
+    'tombstones': (Tombstone, ('id', 'kind', 'reason', 'object_id', 'owner_id', 'deleted_at'), 'deleted_at'),
+}
+CURSOR_FILE = '_cursors.json'
+FORMATS = ('parquet', 'arrow')
+
+
+def _arrow_type(model, column):
+    field = next(field for field in model._meta.concrete_fields if field.attname == column)
+    kind = field.get_internal_type()
+    if kind == 'ForeignKey' or kind.endswith('AutoField') or kind.endswith('IntegerField'):
+        return pyarrow.int64()
+    if kind == 'DateTimeField':
+        return pyarrow.timestamp('us', tz='UTC')
+    if kind == 'BooleanField':
+        return pyarrow.bool_()
+    return pyarrow.string()
+
+
+def schema_for(table):
+    model, columns, _ = EXPORTS[table]
+    return pyarrow.schema([(column, _arrow_type(model, column)) for column in columns])
+
+
+class _Writer:
+    """Stream chunks into one file, only visible under its final name once complete."""
+
+    def __init__(self, path, schema, fmt):
+        self.path = path
+        self.partial = path.with_name(path.name + '.partial')
+        if fmt == 'parquet':
+            self.writer = pyarrow.parquet.ParquetWriter(self.partial, schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(str(self.partial), schema)
+        self.schema = schema
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        batch = pyarrow.record_batch(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.partial, self.path)
+
+    def discard(self):
+        self.writer.close()
+        self.partial.unlink(missing_ok=True)
+
+
+def read_cursors(directory):
+    path = Path(directory) / CURSOR_FILE
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def write_cursors(directory, cursors):
+    path = Path(directory) / CURSOR_FILE
+    partial = path.with_name(path.name + '.partial')
+    partial.write_text(json.dumps(cursors, indent=2, sort_keys=True))
+    os.replace(partial, path)
+
+
+def export_table(table, directory, cursor=None, using=DEFAULT_DB_ALIAS, fmt='parquet', chunk_size=None, until=None):
+    """
+    Write rows of `table` changed after `cursor` (and up to `until`) to one new file.
+
+    Returns (rows written, new cursor). The cursor is a JSON-friendly [timestamp, id] pair.
+    """
+    chunk_size = chunk_size or settings.ANALYTICS_EXPORT_CHUNK_SIZE
+    model, columns, stamp = EXPORTS[table]
+    queryset = model.objects.using(using).order_by(stamp, 'id')
+    if until is not None:
+        queryset = queryset.filter(**{f'{stamp}__lte': until})
+    stamp_index = columns.index(stamp)
+    id_index = columns.index('id')
+
+    suffix = '' if using == DEFAULT_DB_ALIAS else f'-{using}'
+    path = Path(directory) / table / f'{table}{suffix}-{timezone.now():%Y%m%dT%H%M%S%f}.{fmt}'
+    writer = None
+    written = 0
+    try:
+        while True:
+            page = queryset
+            if cursor:
+                moment = parse_datetime(cursor[0])
+                page = page.filter(Q(**{f'{stamp}__gt': moment}) | Q(**{stamp: moment, 'id__gt': cursor[1]}))
+            rows = list(page.values_list(*columns)[:chunk_size])
+            if not rows:
+                break
+            if writer is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                writer = _Writer(path, schema_for(table), fmt)
+            writer.write(rows)
+            written += len(rows)
+            cursor = [rows[-1][stamp_index].isoformat(), rows[-1][id_index]]
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    if writer is not None:
+        writer.close()
+    return written, cursor
+
+
+def export_analytics(tables=None, directory=None, fmt=None, full=False, chunk_size=None):
+    """Export every table incrementally (or in full); returns rows written per table and shard."""
+    if pyarrow is None:
+        raise RuntimeError('The analytics export needs pyarrow: pip install pyarrow')
+    directory = Path(directory or settings.ANALYTICS_EXPORT_DIR)
+    fmt = fmt or settings.ANALYTICS_EXPORT_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}; use one of {", ".join(FORMATS)}.')
+    directory.mkdir(parents=True, exist_ok=True)
+    tables = tables or list(EXPORTS)
+    cursors = read_cursors(directory)
+    if full:
+        cursors = {key: cursor for key, cursor in cursors.items() if key.partition(':')[0] not in tables}
+    until = timezone.now() - timedelta(seconds=settings.ANALYTICS_EXPORT_LAG_SECONDS)
+
+    written = {}
+    for table in tables:
+        # Enrollments are exported shard by shard, each with its own cursor
+        aliases = enrollment_shards() if table == 'enrollments' else [DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            key = table if alias == DEFAULT_DB_ALIAS else f'{table}:{alias}'
+            count, cursors[key] = export_table(
+                table, directory, cursors.get(key), using=alias, fmt=fmt, chunk_size=chunk_size, until=until
+            )
+            written[key] = count
+            # Save after every file so a failure later on does not export it again
+            write_cursors(directory, cursors)
+    return written
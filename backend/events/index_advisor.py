@@ -0,0 +1,272 @@
+"""
+Index proposals from recorded query shapes.
+
+Each shape's WHERE and ORDER BY are read per table: columns compared with
+`=`/`IN` form the index key, then the first range or ordering column.
+Equality filters whose recorded value never varies on a choices or boolean
+field, and IS [NOT] NULL tests, become the condition of a partial index. When an
+equality lookup reads only a few more columns of the table, they are added to
+cover it (INCLUDE on PostgreSQL, trailing key columns elsewhere). A proposal is dropped
+when a declared index already serves it.
+"""
+import re
+from django.apps import apps
+from django.db import connections, models
+from django.db.backends.utils import names_digest
+from django.db.migrations import AddIndex, Migration
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+COLUMN = r'(?:"(?P<table>\w+)"|(?P<alias>[A-Z]\d+))\."(?P<column>\w+)"'
+EQUALS = re.compile(COLUMN + r' (?:= %s|IN \(%s\))')
+NULL_TEST = re.compile(COLUMN + r' IS (?P<negated>NOT )?NULL')
+RANGE = re.compile(COLUMN + r' (?:<|<=|>|>=) %s')
+ORDERED = re.compile(COLUMN + r'(?: (?:ASC|DESC))?')
+TABLE_ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+MAX_COVERED_COLUMNS = 3
+
+
+class Proposal:
+    """A suggested index on one model, with the recorded cost of the shapes it serves."""
+
+    def __init__(self, model, equal, tail, condition, include):
+        self.model = model
+        self.equal = equal
+        self.tail = tail
+        self.condition = condition
+        self.include = include
+        self.total_ms = 0.0
+        self.calls = 0
+        self.shapes = []
+
+    @property
+    def key(self):
+        return (self.model._meta.db_table, tuple(self.equal + self.tail), repr(self.condition), tuple(self.include))
+
+    def index(self, include_supported=True):
+        """The proposal as a named `models.Index`; covered columns trail the key where INCLUDE is unsupported."""
+        fields = self.equal + self.tail
+        include = self.include
+        if not include_supported:
+            fields, include = fields + include, []
+        table = self.model._meta.db_table
+        columns = [self.model._meta.get_field(name).column for name in fields]
+        digest = names_digest(table, *columns, repr(self.condition), *include, length=6)
+        return models.Index(
+            fields=fields,
+            condition=self.condition,
+            include=include or None,
+            name=f'{table[:11]}_{columns[0][:7]}_{digest}_idx',
+        )
+
+
+def _table_models(app_labels):
+    return {
+        model._meta.db_table: model
+        for label in app_labels
+        for model in apps.get_app_config(label).get_models()
+    }
+
+
+def _references(pattern, sql, aliases):
+    """(table, column, match) for each column reference matched by `pattern`."""
+    for match in pattern.finditer(sql):
+        table = match.group('table') or aliases.get(match.group('alias'))
+        yield table, match.group('column'), match
+
+
+def _field(model, column):
+    return next((field for field in model._meta.concrete_fields if field.column == column), None)
+
+
+def _constant(field, samples, position):
+    """The single value always recorded for a choices or boolean filter, or None."""
+    if samples is None or position >= len(samples) or not samples[position] or len(samples[position]) != 1:
+        return None
+    if not field.choices and not isinstance(field, models.BooleanField):
+        return None
+    return samples[position][0]
+
+
+def proposals_for(entry, table_models):
+    """Index proposals for one recorded shape, one per table it filters."""
+    sql = entry['shape']
+    if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')) or ' WHERE ' not in sql:
+        return []
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+    head, _, where = sql.partition(' WHERE ')
+    order = where.rpartition(' ORDER BY ')[2] if ' ORDER BY ' in where else ''
+    order = re.split(r' LIMIT | OFFSET | FOR UPDATE', order)[0]
+
+    per_table = {}
+
+    def table_entry(table):
+        return per_table.setdefault(table, {'equal': [], 'range': [], 'order': [], 'condition': models.Q()})
+
+    for table, column, match in _references(EQUALS, where, aliases):
+        model = table_models.get(table)
+        field = model and _field(model, column)
+        if field is None or field.primary_key:
+            continue
+        value = _constant(field, entry.get('samples'), (head + ' WHERE ' + where[:match.end()]).count('%s') - 1)
+        found = table_entry(table)
+        if value is not None:
+            found['condition'] &= models.Q(**{field.name: value})
+        elif field.name not in found['equal']:
+            found['equal'].append(field.name)
+    for table, column, match in _references(NULL_TEST, where, aliases):
+        model = table_models.get(table)
+        field = model and _field(model, column)
+        if field is not None:
+            table_entry(table)['condition'] &= models.Q(**{f'{field.name}__isnull': not match.group('negated')})
+    for table, column, _ in _references(RANGE, where, aliases):
+        model = table_models.get(table)
+        field = model and _field(model, column)
+        if field is not None and field.name not in table_entry(table)['range']:
+            table_entry(table)['range'].append(field.name)
+    # An index only saves the sort for the table the ORDER BY starts with
+    for table, column, _ in _references(ORDERED, order, aliases):
+        model = table_models.get(table)
+        field = model and _field(model, column)
+        if field is None or table not in per_table:
+            break
+        if any(parts['order'] for name, parts in per_table.items() if name != table):
+            break
+        per_table[table]['order'].append(field.name)
+
+    found = []
+    for table, parts in per_table.items():
+        model = table_models[table]
+        equal = parts['equal']
+        tail = parts['range'][:1] or [name for name in parts['order'] if name not in equal]
+        if not equal and not tail:
+            continue
+        # Cover the query when it reads only a few more of this table's columns
+        selected = []
+        for ref_table, column, _ in _references(re.compile(COLUMN), head, aliases):
+            field = _field(model, column) if ref_table == table else None
+            if field is not None and not field.primary_key and field.name not in equal + tail + selected:
+                selected.append(field.name)
+        covering = equal and head.startswith('SELECT') and len(selected) <= MAX_COVERED_COLUMNS
+        include = selected if covering else []
+        condition = parts['condition'] if parts['condition'] else None
+        found.append(Proposal(model, equal, tail, condition, include))
+    return found
+
+
+def declared_indexes(model):
+    """(column names, condition, included column names, unique) of every index the model declares."""
+    meta = model._meta
+    indexes = [([meta.pk.column], None, [], True)]
+    for field in meta.concrete_fields:
+        if field.db_index or field.unique:
+            indexes.append(([field.column], None, [], field.unique))
+    for fields in meta.unique_together:
+        indexes.append(([meta.get_field(name).column for name in fields], None, [], True))
+    for index in list(meta.indexes) + [c for c in meta.constraints if isinstance(c, models.UniqueConstraint)]:
+        columns = [meta.get_field(name.lstrip('-')).column for name in index.fields]
+        include = [meta.get_field(name).column for name in getattr(index, 'include', None) or ()]
+        indexes.append((columns, index.condition, include, isinstance(index, models.UniqueConstraint)))
+    return indexes
+
+
+def is_served(proposal, indexes):
+    """Whether a declared index already answers the proposal's queries as well."""
+    meta = proposal.model._meta
+    equal = {meta.get_field(name).column for name in proposal.equal}
+    tail = [meta.get_field(name).column for name in proposal.tail]
+    include = {meta.get_field(name).column for name in proposal.include}
+    condition_columns = set()
+    for child in (proposal.condition.children if proposal.condition else ()):
+        condition_columns.add(meta.get_field(child[0].split('__')[0]).column)
+
+    for columns, condition, included, unique in indexes:
+        if condition is not None and condition != proposal.condition:
+            continue
+        # A lookup of at most one row gains nothing from a wider index
+        if unique and set(columns) <= equal:
+            return True
+        # Columns fixed by the proposal's condition may sit in a full index's leading run
+        fixed = equal | (condition_columns if condition is None else set())
+        leading = 0
+        while leading < len(columns) and columns[leading] in fixed:
+            leading += 1
+        if not equal <= set(columns[:leading]):
+            continue
+        if tail and columns[leading:leading + 1] != tail[:1]:
+            continue
+        if leading == 0 and not tail:
+            continue
+        if include <= set(columns) | set(included):
+            return True
+    return False
+
+
+def propose(entries, app_labels):
+    """Unserved proposals for the recorded entries, most expensive first."""
+    table_models = _table_models(app_labels)
+    declared = {model: declared_indexes(model) for model in table_models.values()}
+    merged = {}
+    for entry in entries:
+        for proposal in proposals_for(entry, table_models):
+            if is_served(proposal, declared[proposal.model]):
+                continue
+            proposal = merged.setdefault(proposal.key, proposal)
+            proposal.total_ms += entry['total_ms']
+            proposal.calls += entry['calls']
+            proposal.shapes.append(entry['shape'])
+    return sorted(merged.values(), key=lambda proposal: proposal.total_ms, reverse=True)
+
+
+def migration_source(app_label, proposals, include_supported=True):
+    """(file name, source) of a migration adding the proposals' indexes after the app's latest migration."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaf = sorted(loader.graph.leaf_nodes(app_label))[-1]
+    number = int(leaf[1].split('_', 1)[0]) + 1
+    migration = Migration(f'{number:04d}_advised_indexes', app_label)
+    migration.dependencies = [leaf]
+    migration.operations = [
+        AddIndex(model_name=proposal.model._meta.model_name, index=proposal.index(include_supported))
+        for proposal in proposals
+    ]
+    return f'{migration.name}.py', MigrationWriter(migration).as_string()
+
+
+def unused_indexes(app_labels, entries, using='default'):
+    """
+    Declared indexes of the apps' tables that no query uses: by the server's scan counters
+    on PostgreSQL, else by the query plans of the recorded shapes.
+    """
+    connection = connections[using]
+    tables = set(_table_models(app_labels))
+    with connection.cursor() as cursor:
+        indexes = {}
+        for table in tables:
+            for name, info in connection.introspection.get_constraints(cursor, table).items():
+                if info['index'] and not info['unique'] and not info['primary_key']:
+                    indexes[name] = table
+
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexrelname FROM pg_stat_user_indexes WHERE idx_scan = 0 AND indexrelname = ANY(%s)',
+                [list(indexes)]
+            )
+            return sorted((indexes[name], name) for name, in cursor.fetchall())
+
+        used = set()
+        for entry in entries:
+            sql = entry['shape']
+            if entry['alias'] != using or not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            samples = entry.get('samples') or []
+            params = [values[0] if values else None for values in samples]
+            params += [None] * (sql.count('%s') - len(params))
+            try:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            except Exception:
+                continue
+            for *_, detail in cursor.fetchall():
+                match = re.search(r'USING (?:COVERING )?INDEX (\w+)', detail)
+                if match:
+                    used.add(match.group(1))
+    return sorted((table, name) for name, table in indexes.items() if name not in used)
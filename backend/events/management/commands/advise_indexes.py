@@ -0,0 +1,101 @@
+from contextlib import ExitStack
+from pathlib import Path
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from events.benchmarking import rolled_back
+from events.index_advisor import migration_source, propose, unused_indexes
+from events_platform.query_shapes import ShapeRecorder
+from .check_query_counts import WORKLOAD_SETTINGS, workload
+
+
+class Command(BaseCommand):
+    help = (
+        'Rank recorded query shapes by total time, propose partial, composite or covering indexes '
+        'for them, write the proposals as migrations for review, and list indexes nothing uses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'captures', nargs='*',
+            help='Capture files written with QUERY_CAPTURE_FILE. Without any, a local workload is recorded.'
+        )
+        parser.add_argument('--history', type=int, default=200, help='Past and upcoming events for the local workload.')
+        parser.add_argument('--apps', nargs='+', default=['events', 'accounts'], help='Apps to advise on.')
+        parser.add_argument('--top', type=int, default=15, help='Query shapes to list.')
+        parser.add_argument('--output', help='Write one migration per app with proposals into this directory.')
+
+    def handle(self, *args, **options):
+        recorder = ShapeRecorder()
+        if options['captures']:
+            for path in options['captures']:
+                try:
+                    recorder.load(path)
+                except OSError as e:
+                    raise CommandError(f'Cannot read {path}: {e}')
+        else:
+            self.record_workload(recorder, options['history'])
+        entries = recorder.ranked()
+        if not entries:
+            raise CommandError('No queries were recorded.')
+
+        self.stdout.write(f'Top query shapes by total time ({len(entries)} recorded):')
+        for entry in entries[:options['top']]:
+            self.stdout.write(
+                f'  {entry["total_ms"]:10.1f} ms {entry["calls"]:>8} calls {entry["max_ms"]:8.1f} ms max  '
+                f'[{entry["alias"]}] {entry["shape"][:140]}'
+            )
+
+        include_supported = connection.features.supports_covering_indexes
+        proposals = propose(entries, options['apps'])
+        self.stdout.write('')
+        self.stdout.write(f'Proposed indexes ({len(proposals)}):')
+        for proposal in proposals:
+            index = proposal.index(include_supported)
+            self.stdout.write(
+                f'  {proposal.total_ms:10.1f} ms {proposal.calls:>8} calls  '
+                f'{proposal.model._meta.label}: {self.describe(index)}'
+            )
+            self.stdout.write(f'      e.g. {proposal.shapes[0][:140]}')
+
+        if proposals and options['output']:
+            for app_label in options['apps']:
+                selected = [proposal for proposal in proposals if proposal.model._meta.app_label == app_label]
+                if not selected:
+                    continue
+                name, source = migration_source(app_label, selected, include_supported)
+                path = Path(options['output']) / app_label / name
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(source)
+                self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+            self.stdout.write(
+                'Review each index, add the ones you keep to their model\'s Meta.indexes, '
+                'and move the migration into the app\'s migrations.'
+            )
+
+        unused = unused_indexes(options['apps'], entries)
+        source = 'the server\'s scan counters' if connection.vendor == 'postgresql' else 'the recorded query plans'
+        self.stdout.write('')
+        self.stdout.write(f'Declared indexes unused according to {source} ({len(unused)}):')
+        for table, name in unused:
+            self.stdout.write(f'  {table}.{name}')
+
+    def record_workload(self, recorder, history):
+        """Record every budgeted endpoint and task of check_query_counts on seeded data."""
+        with override_settings(**WORKLOAD_SETTINGS), rolled_back():
+            cache.clear()
+            # The generator seeds between steps, outside the recorded block
+            for _, run in workload(history):
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(recorder))
+                    run()
+
+    def describe(self, index):
+        parts = [f'fields={index.fields}']
+        if index.condition is not None:
+            parts.append(f'condition={index.condition!r}')
+        if index.include:
+            parts.append(f'include={list(index.include)}')
+        return f'models.Index({", ".join(parts)}, name={index.name!r})'
@@ -0,0 +1,100 @@
+import queue
+import statistics
+import threading
+import time
+from celery.utils.time import rate
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from kombu.utils.limits import TokenBucket
+from events_platform.celery import app
+
+OTP_TASK = 'accounts.tasks.send_otp_email'
+REMINDER_TASK = 'events.tasks.send_digest_batch'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure OTP latency while a reminder backlog drains, with every task on one shared '
+        'queue versus the lanes Celery routes them to. Queues and per-task rate limits come from '
+        "the Celery app's router and task annotations; workers are threads and SMTP sends are "
+        'simulated with a fixed latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reminders', type=int, default=100000, help='Reminder emails in the backlog.')
+        parser.add_argument('--otps', type=int, default=20, help='OTP emails sent while the backlog drains.')
+        parser.add_argument('--otp-interval-ms', type=float, default=50.0, help='Gap between OTP sends.')
+        parser.add_argument('--smtp-latency-ms', type=float, default=0.1, help='Simulated cost of one SMTP send.')
+        parser.add_argument('--workers', type=int, default=2, help='Worker threads per queue (shared queue gets the total).')
+
+    def handle(self, *args, **options):
+        app.loader.import_default_modules()
+        lanes = {self.lane(task) for task in (OTP_TASK, REMINDER_TASK)}
+        for task in (OTP_TASK, REMINDER_TASK):
+            self.stdout.write(f'{task}: queue {self.lane(task)}, rate limit {app.tasks[task].rate_limit or "none"} per worker')
+        for label in ('shared', 'routed'):
+            latencies, remaining = self.run(
+                routed=label == 'routed',
+                worker_count=options['workers'] * (len(lanes) if label == 'shared' else 1),
+                **options
+            )
+            self.stdout.write(
+                f'{label:<7} OTP latency p50 {statistics.median(latencies) * 1000:8.2f} ms, '
+                f'max {max(latencies) * 1000:8.2f} ms; reminder batches still queued: {remaining}'
+            )
+
+    def lane(self, task):
+        """Queue the Celery app routes `task` to, as `apply_async` would."""
+        return app.amqp.router.route({}, task)['queue'].name
+
+    def run(self, routed, worker_count, reminders, otps, otp_interval_ms, smtp_latency_ms, **options):
+        latency = smtp_latency_ms / 1000
+        batch_size = settings.NOTIFICATION_BATCH_SIZE
+        queues = {}
+
+        def queue_for(task):
+            return queues.setdefault(self.lane(task) if routed else 'shared', queue.Queue())
+
+        # The reminder scan enqueues its whole backlog up front
+        for start in range(0, reminders, batch_size):
+            queue_for(REMINDER_TASK).put((REMINDER_TASK, time.perf_counter(), min(batch_size, reminders - start)))
+        queue_for(OTP_TASK)
+
+        latencies = []
+        done = threading.Event()
+
+        def worker(lane):
+            # Celery keeps one token bucket per task type in each worker
+            buckets = {
+                task: TokenBucket(rate(app.tasks[task].rate_limit), capacity=1)
+                for task in (OTP_TASK, REMINDER_TASK) if app.tasks[task].rate_limit
+            }
+            while not done.is_set():
+                try:
+                    task, enqueued_at, messages = lane.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                bucket = buckets.get(task)
+                while bucket is not None and not bucket.can_consume(1) and not done.is_set():
+                    time.sleep(bucket.expected_time(1))
+                time.sleep(messages * latency)
+                if task == OTP_TASK:
+                    latencies.append(time.perf_counter() - enqueued_at)
+                    if len(latencies) == otps:
+                        done.set()
+
+        threads = [
+            threading.Thread(target=worker, args=(lane,), daemon=True)
+            for lane in queues.values() for _ in range(worker_count)
+        ]
+        for thread in threads:
+            thread.start()
+
+        for _ in range(otps):
+            queue_for(OTP_TASK).put((OTP_TASK, time.perf_counter(), 1))
+            time.sleep(otp_interval_ms / 1000)
+
+        done.wait()
+        for thread in threads:
+            thread.join()
+        return latencies, queue_for(REMINDER_TASK).qsize()
@@ -0,0 +1,65 @@
+import time
+import tracemalloc
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from events.benchmarking import rolled_back, seed_users, seed_events, seed_enrollments
+from events.deletion import delete_event
+from events.models import Enrollment, Notification, Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare deleting a large event through the cascade collector and through the chunked '
+        'delete path: time, peak Python memory and leftovers (seeded data is rolled back).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enrollments', type=int, default=20000, help='Enrollments (with a reminder each) per event.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Chunk size for the chunked path.')
+        parser.add_argument(
+            '--memory', action='store_true',
+            help='Also report peak Python memory (tracing slows both paths down considerably).'
+        )
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            facilitator = seed_users(1, role='Facilitator', prefix='del')[0]
+            seekers = seed_users(options['enrollments'], prefix='del')
+            events = seed_events(facilitator, 2)
+            enrollments = seed_enrollments(events, seekers)
+            Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=enrollment.seeker_id,
+                    enrollment=enrollment,
+                    kind='reminder',
+                    due_at=timezone.now() + timedelta(days=1),
+                )
+                for enrollment in enrollments
+            ], batch_size=5000)
+
+            memory = options['memory']
+            self.measure('cascade collector', events[0], lambda event: event.delete(), memory)
+            self.measure('chunked', events[1], lambda event: delete_event(event, options['chunk_size']), memory)
+
+    def measure(self, label, event, delete, memory):
+        enrollment_ids = list(Enrollment.objects.filter(event=event).values_list('id', flat=True))
+        last_tombstone = Tombstone.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        if memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        delete(event)
+        elapsed = time.perf_counter() - started
+        report = f'{label:<18} {len(enrollment_ids)} enrollments in {elapsed * 1000:9.1f} ms'
+        if memory:
+            report += f', peak Python memory {tracemalloc.get_traced_memory()[1] / 2 ** 20:7.1f} MiB'
+            tracemalloc.stop()
+
+        leftovers = (
+            Enrollment.objects.filter(event_id=event.pk).count()
+            + Notification.objects.filter(enrollment_id__in=enrollment_ids).count()
+        )
+        tombstones = Tombstone.objects.filter(id__gt=last_tombstone, kind='enrollment').count()
+        if leftovers or tombstones != len(enrollment_ids):
+            raise CommandError(f'{label}: {leftovers} rows left behind, {tombstones}/{len(enrollment_ids)} tombstones.')
+        self.stdout.write(report)
@@ -0,0 +1,116 @@
+import time
+import tracemalloc
+from datetime import timedelta
+from django.conf import settings
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from events.benchmarking import counted_queries, fake_smtp_server, rolled_back, seed_users, seed_events, seed_enrollments
+from events.models import EventChange, Notification
+from events.tasks import notify_event_change, send_notification_digests, send_reminder_emails
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure reminder, follow-up and event change email throughput with Celery in eager mode, against the '
+        'locmem backend and a local fake SMTP server with injected latency (seeded data is rolled back).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2, help='Events starting within the reminder window.')
+        parser.add_argument('--enrollments', type=int, default=2000, help='Seekers enrolled in every event.')
+        parser.add_argument('--followups', type=int, default=500, help='Follow-up notifications due now, sent as digests.')
+        parser.add_argument('--smtp-latency-ms', type=float, default=2.0, help='Fake SMTP server time per message.')
+        parser.add_argument('--backend', choices=['locmem', 'smtp', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        backends = ['locmem', 'smtp'] if options['backend'] == 'both' else [options['backend']]
+        # Celery reads its settings through Django's, so this runs every task inline
+        with override_settings(CELERY_TASK_ALWAYS_EAGER=True), rolled_back(), \
+                fake_smtp_server(options['smtp_latency_ms'] / 1000) as server:
+            facilitator = seed_users(1, role='Facilitator', prefix='notify')[0]
+            seekers = seed_users(options['enrollments'], prefix='notify')
+            # Reminders are due now for events starting just over an hour from now
+            events = seed_events(
+                facilitator, options['events'],
+                starts_at=timezone.now() + timedelta(hours=1, minutes=2),
+                spacing=timedelta(minutes=1),
+            )
+            enrollments = seed_enrollments(events, seekers)
+            followups = enrollments[:options['followups']]
+
+            def followup_digests():
+                # As left by enrolling an hour ago: follow-ups falling due now, sent by the digest run
+                Notification.objects.bulk_create(
+                    [
+                        Notification(
+                            recipient_id=enrollment.seeker_id, enrollment_id=enrollment.id,
+                            kind='followup', due_at=timezone.now(),
+                        )
+                        for enrollment in followups
+                    ],
+                    batch_size=1000,
+                )
+                send_notification_digests.delay()
+
+            def change_notice():
+                # As left by rescheduling the first event: a pending change that is already the latest
+                changed_at = timezone.now()
+                EventChange.objects.create(
+                    event=events[0],
+                    previous_starts_at=events[0].starts_at - timedelta(days=1),
+                    previous_location=events[0].location,
+                    changed_at=changed_at,
+                )
+                notify_event_change.delay(events[0].pk, changed_at.isoformat())
+
+            scenarios = [
+                ('reminders', send_reminder_emails.delay),
+                ('followups', followup_digests),
+                ('event change', change_notice),
+            ]
+            for backend in backends:
+                email_settings = {'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend'}
+                if backend == 'smtp':
+                    email_settings = {
+                        'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                        'EMAIL_HOST': '127.0.0.1',
+                        'EMAIL_PORT': server.port,
+                        'EMAIL_USE_TLS': False,
+                        'EMAIL_HOST_USER': '',
+                        'EMAIL_HOST_PASSWORD': '',
+                    }
+                with override_settings(**email_settings):
+                    for label, run in scenarios:
+                        self.measure(f'{label}/{backend}', run, server)
+
+    def measure(self, label, run, server):
+        """Run a scenario twice on the same data: once timed with queries counted, once for peak memory."""
+        with rolled_back(), counted_queries() as queries:
+            mail.outbox = []
+            sent_before = server.messages
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            messages = len(mail.outbox) + server.messages - sent_before
+            query_count = queries.count
+
+        with rolled_back():
+            tracemalloc.start()
+            try:
+                run()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                mail.outbox = []
+
+        if not messages:
+            raise CommandError(f'{label}: no messages were sent.')
+        rate = messages / elapsed
+        beat_window = settings.NOTIFICATION_LEAD_MINUTES * 60
+        self.stdout.write(
+            f'{label:<18} {messages:>7} messages in {elapsed:7.2f} s: {rate:9.1f} msgs/s, '
+            f'{query_count / messages:6.2f} queries/msg, peak {peak / 2 ** 20:6.1f} MiB, '
+            f'~{int(rate * beat_window)} per {settings.NOTIFICATION_LEAD_MINUTES}-minute beat window'
+        )
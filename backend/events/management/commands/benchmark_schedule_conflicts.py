@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from events.benchmarking import rolled_back, timed, seed_users, seed_events, seed_enrollments
+from events.models import Enrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Time schedule-conflict checks and the free/busy endpoint for a seeker with a long '
+        'enrollment history (seeded data is rolled back).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history', type=int, default=5000, help='Past enrollments of the seeker.')
+        parser.add_argument('--upcoming', type=int, default=50, help='Upcoming enrollments of the seeker.')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per variant; the best is reported.')
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of the overlap lookup.')
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+
+        with rolled_back():
+            facilitator = seed_users(1, role='Facilitator', prefix='sched')[0]
+            seeker = seed_users(1, prefix='sched')[0]
+            now = timezone.now()
+            past = seed_events(facilitator, options['history'], starts_at=now - timedelta(hours=options['history'] + 3))
+            upcoming = seed_events(facilitator, options['upcoming'])
+            seed_enrollments(past + upcoming, [seeker])
+            candidate = upcoming[len(upcoming) // 2]
+
+            def naive():
+                # What a check without the copied times costs: the whole history, filtered in Python
+                return sorted(
+                    (enrollment.event_id, enrollment.event.starts_at, enrollment.event.ends_at)
+                    for enrollment in Enrollment.objects.filter(seeker=seeker, status='enrolled').select_related('event')
+                    if enrollment.event.ends_at > candidate.starts_at and enrollment.event.starts_at < candidate.ends_at
+                )
+
+            def indexed():
+                return sorted(Enrollment.overlapping(seeker.id, candidate.starts_at, candidate.ends_at))
+
+            naive_time, naive_rows = timed(naive, repeat)
+            indexed_time, indexed_rows = timed(indexed, repeat)
+            if naive_rows != indexed_rows:
+                raise CommandError('Indexed overlap lookup disagrees with the full-history scan.')
+            self.stdout.write(
+                f'conflict check: full history {naive_time * 1000:.2f} ms, indexed {indexed_time * 1000:.2f} ms, '
+                f'{naive_time / indexed_time:.1f}x speedup ({len(indexed_rows)} conflicts)'
+            )
+
+            client = APIClient()
+            client.force_authenticate(seeker)
+            busy_time, response = timed(lambda: client.get('/api/enrollments/busy/'), repeat)
+            if response.status_code != 200:
+                raise CommandError(f'/api/enrollments/busy/ returned {response.status_code}: {response.content[:200]}')
+            self.stdout.write(
+                f'free/busy (7 days): {busy_time * 1000:.2f} ms, '
+                f'{len(response.data["busy"])} busy blocks, {len(response.data["free"])} free gaps'
+            )
+
+            if options['explain']:
+                self.stdout.write(
+                    Enrollment.objects.filter(
+                        seeker_id=seeker.id,
+                        status='enrolled',
+                        event_ends_at__gt=candidate.starts_at,
+                        event_starts_at__lt=candidate.ends_at,
+                    ).explain()
+                )
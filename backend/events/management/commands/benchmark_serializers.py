@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from events.benchmarking import rolled_back, timed, seed_users, seed_events, seed_enrollments
+from events.models import Event, Enrollment
+from events.serializers import (
+    EventListSerializer, EnrollmentSerializer,
+    EventListValuesSerializer, EnrollmentValuesSerializer,
+)
+from events_platform.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = 'Compare the stock and values-based list serializers on seeded data (rolled back afterwards).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page to serialize.')
+        parser.add_argument('--seekers', type=int, default=10, help='Seekers enrolled in every event.')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per variant; the best is reported.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        with rolled_back():
+            facilitator = seed_users(1, role='Facilitator')[0]
+            seekers = seed_users(options['seekers'])
+            events = seed_events(facilitator, rows, capacity=options['seekers'] * 2)
+            seed_enrollments(events, seekers)
+
+            event_qs = Event.objects.filter(created_by=facilitator)
+            enrollment_qs = Enrollment.objects.filter(seeker=seekers[0]).order_by('id')
+
+            self.compare(
+                'events',
+                lambda: JSONRenderer().render(EventListSerializer(event_qs.all(), many=True).data),
+                lambda: ORJSONRenderer().render(
+                    EventListValuesSerializer(EventListValuesSerializer.get_values(event_qs), many=True).data
+                ),
+                repeat,
+            )
+            self.compare(
+                'enrollments',
+                lambda: JSONRenderer().render(EnrollmentSerializer(enrollment_qs.all(), many=True).data),
+                lambda: ORJSONRenderer().render(
+                    EnrollmentValuesSerializer(EnrollmentValuesSerializer.get_values(enrollment_qs), many=True).data
+                ),
+                repeat,
+            )
+
+    def compare(self, label, stock, fast, repeat):
+        stock_time, stock_body = timed(stock, repeat)
+        fast_time, fast_body = timed(fast, repeat)
+        if stock_body != fast_body:
+            raise CommandError(f'{label}: fast path output differs from the stock serializer.')
+
+        self.stdout.write(
+            f'{label}: stock {stock_time * 1000:.2f} ms, fast {fast_time * 1000:.2f} ms, '
+            f'{stock_time / fast_time:.1f}x speedup ({len(fast_body)} bytes, identical)'
+        )
@@ -0,0 +1,197 @@
+import json
+import re
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from events.benchmarking import rolled_back, seed_users, seed_events, seed_enrollments
+from events.models import Enrollment, Event, Notification
+from events.tasks import send_reminder_emails
+
+
+# (role, path, maximum queries). Paths may use {event}, {events}, {enrollment} and {now}.
+QUERY_BUDGETS = [
+    ('seeker', '/api/events/', 4),
+    ('seeker', '/api/events/?starts_after={now}&language=English', 4),
+    ('seeker', '/api/events/{event}/', 4),
+    ('seeker', '/api/events/recommended/', 4),
+    ('seeker', '/api/events/seats/?ids={events}', 3),
+    ('seeker', '/api/events/calendar/', 3),
+    ('seeker', '/api/events/calendar/?split=language', 3),
+    ('seeker', '/api/enrollments/', 3),
+    ('seeker', '/api/enrollments/upcoming/', 3),
+    ('seeker', '/api/enrollments/past/', 3),
+    ('seeker', '/api/enrollments/busy/', 3),
+    ('seeker', '/api/enrollments/{enrollment}/', 2),
+    ('facilitator', '/api/events/', 4),
+    ('facilitator', '/api/events/{event}/enrollments/', 3),
+    ('facilitator', '/api/events/analytics/', 6),
+]
+
+# (task, maximum queries) for tasks run inline with their reminder window populated.
+# Each digest recipient costs a locked claim in its own transaction (savepoints here).
+TASK_BUDGETS = [
+    (send_reminder_emails, 9),
+]
+
+# Tables whose queries must always be served by an index
+HOT_TABLES = {Event._meta.db_table, Enrollment._meta.db_table, Notification._meta.db_table}
+ALIAS_PATTERN = re.compile(r'"(\w+)" ([UT]\d+)\b')
+
+
+# Run the workload with these, inside rolled_back()
+WORKLOAD_SETTINGS = {
+    'ALLOWED_HOSTS': ['*'],
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'check-query-counts'}},
+    'CELERY_TASK_ALWAYS_EAGER': True,
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+}
+
+
+def workload(history):
+    """
+    Seed a history of `history` past and upcoming events, then yield (label, run) for
+    every budgeted endpoint and task, in budget order.
+    """
+    facilitator = seed_users(1, role='Facilitator', prefix='qc')[0]
+    seeker = seed_users(1, prefix='qc')[0]
+    now = timezone.now()
+    past = seed_events(facilitator, history, starts_at=now - timedelta(days=history + 1), capacity=10)
+    upcoming = seed_events(facilitator, history, capacity=10)
+    # Two events inside the reminder window, so the reminder task has something to send
+    soon = seed_events(facilitator, 2, starts_at=now + timedelta(hours=1, minutes=2), spacing=timedelta(minutes=1))
+    enrollments = seed_enrollments(past + upcoming + soon, [seeker])
+
+    users = {'seeker': seeker.pk, 'facilitator': facilitator.pk}
+
+    def request(client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}: {response.content[:200]}')
+
+    for role, path, _ in QUERY_BUDGETS:
+        client = APIClient()
+        # Fresh user per request so nothing is cached between endpoints
+        client.force_authenticate(User.objects.get(pk=users[role]))
+        url = path.format(
+            event=upcoming[0].pk,
+            events=','.join(str(event.pk) for event in upcoming[:50]),
+            enrollment=enrollments[-1].pk,
+            now=now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        )
+        yield f'{role} {path}', lambda client=client, url=url: request(client, url)
+
+    for task, _ in TASK_BUDGETS:
+        yield f'task {task.name}', task.delay
+
+
+class QueryRecorder:
+    """Execute wrapper that keeps every statement with its parameters."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def _seq_scans(node):
+    if node.get('Node Type') == 'Seq Scan':
+        yield node.get('Relation Name')
+    for child in node.get('Plans', ()):
+        yield from _seq_scans(child)
+
+
+def full_scans(sql, params):
+    """Hot tables that a SELECT reads without an index, according to the database's planner."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return set()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # The seeded tables are tiny; without this the planner scans them whether or not an index fits
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scanned = set(_seq_scans(plan[0]['Plan']))
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            aliases = {alias: table for table, alias in ALIAS_PATTERN.findall(sql)}
+            scanned = {
+                aliases.get(detail.split()[1], detail.split()[1])
+                for *_, detail in cursor.fetchall()
+                if detail.startswith('SCAN ') and 'USING' not in detail
+            }
+        else:
+            return set()
+    return scanned & HOT_TABLES
+
+
+class Command(BaseCommand):
+    help = (
+        'Assert that hot endpoints and tasks stay within their query budgets, that the count does '
+        'not grow with history size, and that no hot query falls back to a full table scan '
+        '(seeded data is rolled back).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=5, help='Past and upcoming events in the small history.')
+        parser.add_argument('--large', type=int, default=200, help='Past and upcoming events in the large history.')
+        parser.add_argument('--show-plans', action='store_true', help='Print every query with the tables it scans.')
+
+    def handle(self, *args, **options):
+        small = self.measure(options['small'])
+        large = self.measure(options['large'])
+        budgets = [(role, path, budget) for role, path, budget in QUERY_BUDGETS]
+        budgets += [('task', task.name.rsplit('.', 1)[-1], budget) for task, budget in TASK_BUDGETS]
+
+        failures = []
+        for (role, path, budget), small_queries, large_queries in zip(budgets, small, large):
+            small_count, large_count = len(small_queries), len(large_queries)
+            status = 'ok'
+            if large_count > budget:
+                status = f'over budget ({budget})'
+            elif large_count > small_count:
+                status = f'grows with history ({small_count} -> {large_count})'
+
+            scans = []
+            for sql, scanned in large_queries:
+                if scanned:
+                    scans.append(f'full scan of {", ".join(sorted(scanned))}: {sql[:200]}')
+                if options['show_plans']:
+                    self.stdout.write(f'    {"SCAN " + ",".join(sorted(scanned)) if scanned else "indexed":<24} {sql[:160]}')
+            if scans and status == 'ok':
+                status = f'{len(scans)} full scan(s)'
+
+            if status != 'ok':
+                failures.append(f'{role} {path}: {status}')
+                failures.extend(f'    {scan}' for scan in scans)
+            self.stdout.write(f'{role:<12} {path:<52} {large_count:>3} queries  {status}')
+
+        if failures:
+            raise CommandError('Query budget check failed:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'All endpoints within query budget, no full scans ({connection.vendor}).'))
+
+    def measure(self, history):
+        """
+        Seed a history of `history` past and upcoming events, run every endpoint and task,
+        and return per budget entry its queries as (sql, full-scanned hot tables).
+        """
+        results = []
+        with override_settings(**WORKLOAD_SETTINGS), rolled_back():
+            # Cached responses from the previous history would hide their queries
+            cache.clear()
+            for _, run in workload(history):
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    run()
+                results.append(self.explain(recorder))
+        return results
+
+    def explain(self, recorder):
+        return [(sql, full_scans(sql, params)) for sql, params in recorder.queries]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    """Seed rollups from existing enrollments: enrolled on created_at, canceled on updated_at."""
+    from django.db.models import Count
+    from django.db.models.functions import TruncDate
+
+    Enrollment = apps.get_model('events', 'Enrollment')
+    EventDailyRollup = apps.get_model('events', 'EventDailyRollup')
+
+    counts = {}
+    enrolled = Enrollment.objects.annotate(day=TruncDate('created_at')).values('event_id', 'day').annotate(n=Count('id')).order_by()
+    for row in enrolled:
+        counts.setdefault((row['event_id'], row['day']), [0, 0])[0] += row['n']
+    canceled = Enrollment.objects.filter(status='canceled').annotate(day=TruncDate('updated_at')).values('event_id', 'day').annotate(n=Count('id')).order_by()
+    for row in canceled:
+        counts.setdefault((row['event_id'], row['day']), [0, 0])[1] += row['n']
+
+    EventDailyRollup.objects.bulk_create(
+        [
+            EventDailyRollup(event_id=event_id, day=day, enrolled=n_enrolled, canceled=n_canceled)
+            for (event_id, day), (n_enrolled, n_canceled) in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('enrolled', models.PositiveIntegerField(default=0)),
+                ('canceled', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='events.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='events_even_day_d6879d_idx')],
+                'unique_together': {('event', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
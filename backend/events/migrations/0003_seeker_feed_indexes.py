@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['seeker', 'status', 'event'], name='events_enro_seeker__d39d59_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['ends_at'], name='events_even_ends_at_4aabb3_idx'),
+        ),
+    ]
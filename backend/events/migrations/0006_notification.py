@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0005_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('followup', 'Follow-up'), ('reminder', 'Reminder')], max_length=20)),
+                ('due_at', models.DateTimeField()),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='events.enrollment')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient', 'sent_at', 'due_at'], name='events_noti_recipie_120db8_idx'), models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['due_at'], name='events_notif_pending_due_idx')],
+                'unique_together': {('enrollment', 'kind', 'due_at')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:32
+
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_event_times(apps, schema_editor):
+    """Copy each event's times onto its enrollments."""
+    from django.db import DEFAULT_DB_ALIAS
+    from django.db.models import OuterRef, Subquery
+
+    db = schema_editor.connection.alias
+    Enrollment = apps.get_model('events', 'Enrollment')
+    Event = apps.get_model('events', 'Event')
+
+    if db == DEFAULT_DB_ALIAS:
+        events = Event.objects.using(db).filter(pk=OuterRef('event_id'))
+        Enrollment.objects.using(db).update(
+            event_starts_at=Subquery(events.values('starts_at')[:1]),
+            event_ends_at=Subquery(events.values('ends_at')[:1]),
+        )
+    else:
+        # Enrollment shards hold no events, so read the times from default a chunk of events at a time
+        event_ids = list(
+            Enrollment.objects.using(db).order_by('event_id').values_list('event_id', flat=True).distinct()
+        )
+        for start in range(0, len(event_ids), BACKFILL_CHUNK_SIZE):
+            chunk = event_ids[start:start + BACKFILL_CHUNK_SIZE]
+            events = Event.objects.using(DEFAULT_DB_ALIAS).only('starts_at', 'ends_at').in_bulk(chunk)
+            for event in events.values():
+                Enrollment.objects.using(db).filter(event_id=event.pk).update(
+                    event_starts_at=event.starts_at,
+                    event_ends_at=event.ends_at,
+                )
+
+    # Enrollments of events deleted without them have no times to copy and would block NOT NULL
+    Enrollment.objects.using(db).filter(event_starts_at__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='event_starts_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='event_ends_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_event_times, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='event_starts_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='event_ends_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['seeker', 'status', 'event_ends_at', 'event_starts_at'], name='events_enro_seeker__6a7907_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_enrollment_event_times'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['updated_at', 'id'], name='events_enro_updated_311ea9_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_enrollment_export_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_starts_at', models.DateTimeField()),
+                ('previous_location', models.CharField(max_length=200)),
+                ('changed_at', models.DateTimeField()),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_change', to='events.event')),
+            ],
+        ),
+    ]
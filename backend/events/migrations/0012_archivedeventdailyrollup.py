@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_eventchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEventDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('enrolled', models.PositiveIntegerField(default=0)),
+                ('canceled', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='events.archivedevent')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='events_arch_day_126fc4_idx')],
+                'unique_together': {('event', 'day')},
+            },
+        ),
+    ]
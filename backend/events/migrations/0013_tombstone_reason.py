@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_archivedeventdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='reason',
+            field=models.CharField(choices=[('deleted', 'Deleted'), ('archived', 'Archived')], default='deleted', max_length=20),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_tombstone_reason'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventdailyrollup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='eventdailyrollup',
+            index=models.Index(fields=['updated_at', 'id'], name='events_even_updated_f46c9e_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 class Event(models.Model):
@@ -20,14 +21,24 @@ class Event(models.Model):
         ordering = ['starts_at']
         indexes = [
             models.Index(fields=['starts_at']),
+            models.Index(fields=['ends_at']),
             models.Index(fields=['language']),
             models.Index(fields=['location']),
             models.Index(fields=['created_by']),
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.location}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded times and location so saves can tell when the event moved."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_times = (instance.__dict__.get('starts_at'), instance.__dict__.get('ends_at'))
+        instance._loaded_location = instance.__dict__.get('location')
+        return instance
+
     @property
     def available_seats(self):
         """Calculate available seats."""
@@ -44,9 +55,36 @@ class Event(models.Model):
     @property
     def is_past(self):
         """Check if event has ended."""
-        from django.utils import timezone
         return self.ends_at < timezone.now()
 
+    @staticmethod
+    def enrolled_counts(event_ids):
+        """Map event id to its enrolled count using one grouped query per shard."""
+        if not event_ids:
+            return {}
+        from .sharding import fan_out, group_by_shard
+
+        groups = group_by_shard(event_ids)
+        results = fan_out(
+            lambda alias: list(
+                Enrollment.objects.using(alias).filter(
+                    event_id__in=groups[alias],
+                    status='enrolled'
+                ).values('event_id').annotate(count=models.Count('id')).order_by()
+            ),
+            groups
+        )
+        return {row['event_id']: row['count'] for rows in results for row in rows}
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """Let the router place the row on its event's shard unless a database was chosen."""
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
 
 class Enrollment(models.Model):
     """Enrollment model."""
@@ -55,20 +93,246 @@ class Enrollment(models.Model):
         ('canceled', 'Canceled'),
     ]
 
-    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='enrollments')
-    seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
+    # No database-level constraints: with sharding the rows live apart from events and users
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='enrollments', db_constraint=False)
+    seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments', db_constraint=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='enrolled')
+    # Copy of the event's times so schedule checks are one index range scan per seeker
+    event_starts_at = models.DateTimeField()
+    event_ends_at = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         unique_together = [['event', 'seeker']]
         indexes = [
             models.Index(fields=['event', 'seeker']),
+            models.Index(fields=['seeker', 'status', 'event']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['seeker', 'updated_at', 'id']),
+            models.Index(fields=['seeker', 'status', 'event_ends_at', 'event_starts_at']),
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.seeker.email} - {self.event.title} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        if self.event_starts_at is None or self.event_ends_at is None:
+            self.event_starts_at, self.event_ends_at = self.event.starts_at, self.event.ends_at
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def overlapping(seeker_id, starts_at, ends_at):
+        """
+        (event_id, starts_at, ends_at) of the seeker's enrolled events overlapping [starts_at, ends_at).
+
+        Ranges on (seeker, status, event_ends_at), so only enrollments ending after
+        `starts_at` are read, however long the seeker's history is.
+        """
+        from .sharding import fan_out
+
+        results = fan_out(lambda alias: list(
+            Enrollment.objects.using(alias).filter(
+                seeker_id=seeker_id,
+                status='enrolled',
+                event_ends_at__gt=starts_at,
+                event_starts_at__lt=ends_at,
+            ).values_list('event_id', 'event_starts_at', 'event_ends_at')
+        ))
+        return sorted((row for rows in results for row in rows), key=lambda row: (row[1], row[0]))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded status so saves can tell what changed."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+
+class EventDailyRollup(models.Model):
+    """Per-day enrollment and cancellation counts for an event."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    enrolled = models.PositiveIntegerField(default=0)
+    canceled = models.PositiveIntegerField(default=0)
+    # Last seat change counted here; delta-sync clients follow it to refresh seat counts
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['event', 'day']]
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['updated_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} - {self.day} - +{self.enrolled}/-{self.canceled}"
+
+    @classmethod
+    def record(cls, event_id, day, enrolled=0, canceled=0):
+        """Add to the counts for an event and day, creating the row if needed."""
+        increments = {
+            'enrolled': models.F('enrolled') + enrolled,
+            'canceled': models.F('canceled') + canceled,
+            'updated_at': timezone.now(),
+        }
+        if cls.objects.filter(event_id=event_id, day=day).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(event_id=event_id, day=day, enrolled=enrolled, canceled=canceled)
+        except IntegrityError:
+            # Another writer created the row first
+            cls.objects.filter(event_id=event_id, day=day).update(**increments)
+
+
+
+class Notification(models.Model):
+    """Outbox entry for an email to a seeker; due entries are sent as one digest per recipient."""
+    KIND_CHOICES = [
+        ('followup', 'Follow-up'),
+        ('reminder', 'Reminder'),
+    ]
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    enrollment = models.ForeignKey(
+        Enrollment, on_delete=models.CASCADE, related_name='notifications', db_constraint=False
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    due_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [['enrollment', 'kind', 'due_at']]
+        indexes = [
+            models.Index(fields=['recipient', 'sent_at', 'due_at']),
+            models.Index(fields=['due_at'], condition=models.Q(sent_at__isnull=True), name='events_notif_pending_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.recipient_id} due {self.due_at}"
+
+
+class EventChange(models.Model):
+    """Pending notice to enrollees that an event moved, kept from the first of a burst of edits."""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='pending_change')
+    previous_starts_at = models.DateTimeField()
+    previous_location = models.CharField(max_length=200)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.event_id} changed at {self.changed_at}"
+
+
+class Recommendation(models.Model):
+    """Precomputed top-K event suggestion for a seeker, rebuilt by the nightly batch."""
+    seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='recommendations')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [['seeker', 'rank']]
+        indexes = [
+            models.Index(fields=['event']),
+        ]
+
+    def __str__(self):
+        return f"{self.seeker_id} - #{self.rank} {self.event_id}"
+
+
+class Tombstone(models.Model):
+    """Record of a deleted or archived event or enrollment, kept for delta-sync clients."""
+    KIND_CHOICES = [
+        ('event', 'Event'),
+        ('enrollment', 'Enrollment'),
+    ]
+    REASON_CHOICES = [
+        ('deleted', 'Deleted'),
+        ('archived', 'Archived'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Archived rows leave the hot tables but live on in the archive tables
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default='deleted')
+    object_id = models.BigIntegerField()
+    # Event creator or enrollment seeker; not a foreign key so it survives user deletion
+    owner_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id']),
+            models.Index(fields=['owner_id', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} {self.reason} at {self.deleted_at}"
+
+
+class ArchivedEvent(models.Model):
+    """Event moved out of the hot table after it ended; keeps its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    language = models.CharField(max_length=50)
+    location = models.CharField(max_length=200)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_events')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-ends_at']
+        indexes = [
+            models.Index(fields=['ends_at']),
+            models.Index(fields=['created_by']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.location} (archived)"
+
+
+class ArchivedEnrollment(models.Model):
+    """Enrollment of an archived event; keeps its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='enrollments')
+    seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_enrollments')
+    status = models.CharField(max_length=20, choices=Enrollment.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [['event', 'seeker']]
+        indexes = [
+            models.Index(fields=['seeker', 'status', 'event']),
+        ]
+
+    def __str__(self):
+        return f"{self.seeker.email} - {self.event.title} - {self.status} (archived)"
+
+
+class ArchivedEventDailyRollup(models.Model):
+    """Daily rollup of an archived event, kept so facilitator analytics do not lose its history."""
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    enrolled = models.PositiveIntegerField(default=0)
+    canceled = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [['event', 'day']]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} - {self.day} - +{self.enrolled}/-{self.canceled} (archived)"
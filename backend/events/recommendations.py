@@ -0,0 +1,148 @@
+"""
+Nightly batch that scores upcoming events for every seeker with a history.
+
+Scores combine item-item co-occurrence (events enrolled in by the same
+seekers, cosine-normalized) with how often the seeker picked each candidate's
+language and location. Everything is sparse matrix algebra over the whole
+enrollment history, done in chunks of seekers, and the top K per seeker is
+written to the Recommendation table for indexed lookups at request time.
+"""
+from itertools import chain
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ArchivedEnrollment, ArchivedEvent, Enrollment, Event, Recommendation
+from .sharding import fan_out
+
+CO_OCCURRENCE_WEIGHT = 1.0
+LANGUAGE_WEIGHT = 0.5
+LOCATION_WEIGHT = 0.25
+# Rows fetched per round trip while streaming the enrollment history
+HISTORY_CHUNK_SIZE = 10000
+
+
+def _pairs(queryset):
+    """(seeker_id, event_id) rows of `queryset` as an (n x 2) array, streamed from a server-side cursor."""
+    rows = queryset.filter(status='enrolled').values_list('seeker_id', 'event_id').iterator(chunk_size=HISTORY_CHUNK_SIZE)
+    # Straight into an int64 buffer; no per-row tuples are kept
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+
+
+def _history():
+    """(seeker_id, event_id) pairs of every enrollment, hot and archived."""
+    pairs = fan_out(lambda alias: _pairs(Enrollment.objects.using(alias)))
+    pairs.append(_pairs(ArchivedEnrollment.objects.all()))
+    return np.concatenate(pairs)
+
+
+def _one_hot(values):
+    """Sparse (len(values) x distinct values) indicator matrix."""
+    _, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return sparse.csr_matrix(
+        (np.ones(len(codes), dtype=np.float32), (np.arange(len(codes)), codes)),
+        shape=(len(codes), codes.max() + 1 if len(codes) else 0)
+    )
+
+
+def _row_normalize(matrix):
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    totals[totals == 0] = 1
+    return sparse.diags(1 / totals) @ matrix
+
+
+def _top_k(scores, k):
+    """Per row of a CSR matrix, the column indices and values of its k largest positive entries."""
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        values = scores.data[start:end]
+        columns = scores.indices[start:end]
+        keep = values > 0
+        values, columns = values[keep], columns[keep]
+        if len(values) > k:
+            best = np.argpartition(-values, k - 1)[:k]
+            values, columns = values[best], columns[best]
+        order = np.argsort(-values, kind='stable')
+        yield row, columns[order], values[order]
+
+
+def compute_recommendations(top_k=None, chunk_size=None):
+    """Rebuild the Recommendation table; returns the number of rows written."""
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    chunk_size = chunk_size or settings.RECOMMENDATIONS_CHUNK_SIZE
+    now = timezone.now()
+
+    history = _history()
+    candidates = list(Event.objects.filter(starts_at__gt=now).values_list('id', 'language', 'location'))
+    if not len(history) or not candidates:
+        Recommendation.objects.all().delete()
+        return 0
+
+    # Index every event seen in history or offered as a candidate
+    candidate_ids = np.array([row[0] for row in candidates], dtype=np.int64)
+    event_ids = np.union1d(np.unique(history[:, 1]), candidate_ids)
+    seeker_ids, seeker_index = np.unique(history[:, 0], return_inverse=True)
+    event_index = np.searchsorted(event_ids, history[:, 1])
+    candidate_index = np.searchsorted(event_ids, candidate_ids)
+
+    # Seeker x event enrollment matrix
+    enrolled = sparse.csr_matrix(
+        (np.ones(len(history), dtype=np.float32), (seeker_index, event_index)),
+        shape=(len(seeker_ids), len(event_ids))
+    )
+    enrolled.data[:] = 1
+
+    # Event x candidate co-occurrence, cosine-normalized by popularity. A candidate's
+    # similarity to itself only reaches seekers already enrolled in it, who are masked out below.
+    popularity = np.asarray(enrolled.sum(axis=0)).ravel()
+    inverse_norm = 1 / np.sqrt(np.maximum(popularity, 1))
+    co_occurrence = (
+        sparse.diags(inverse_norm)
+        @ (enrolled.T @ enrolled[:, candidate_index])
+        @ sparse.diags(inverse_norm[candidate_index])
+    ).tocsr()
+
+    # Language and location share of each seeker's history, against each candidate's
+    attributes = dict(
+        (row[0], row[1:]) for row in Event.objects.filter(id__in=event_ids.tolist()).values_list('id', 'language', 'location')
+    )
+    attributes.update(
+        (row[0], row[1:]) for row in ArchivedEvent.objects.filter(id__in=event_ids.tolist()).values_list('id', 'language', 'location')
+    )
+    content = []
+    for position, weight in ((0, LANGUAGE_WEIGHT), (1, LOCATION_WEIGHT)):
+        values = [attributes.get(event_id, ('', ''))[position] for event_id in event_ids.tolist()]
+        event_features = _one_hot(values)
+        content.append((weight, event_features, event_features[candidate_index]))
+
+    written = 0
+    for start in range(0, len(seeker_ids), chunk_size):
+        chunk = enrolled[start:start + chunk_size]
+        scores = CO_OCCURRENCE_WEIGHT * _row_normalize(chunk) @ co_occurrence
+        for weight, event_features, candidate_features in content:
+            preference = _row_normalize(chunk @ event_features)
+            scores = scores + weight * (preference @ candidate_features.T)
+        # Never suggest events the seeker is already enrolled in
+        scores = sparse.csr_matrix(scores - scores.multiply(chunk[:, candidate_index]))
+        scores.eliminate_zeros()
+
+        rows = [
+            Recommendation(
+                seeker_id=int(seeker_ids[start + row]),
+                event_id=int(candidate_ids[column]),
+                rank=rank,
+                score=float(score),
+                computed_at=now,
+            )
+            for row, columns, values in _top_k(scores, top_k)
+            for rank, (column, score) in enumerate(zip(columns, values), start=1)
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(seeker_id__in=seeker_ids[start:start + chunk_size].tolist()).delete()
+            Recommendation.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+
+    # Seekers whose history no longer yields anything
+    Recommendation.objects.filter(computed_at__lt=now).delete()
+    return written
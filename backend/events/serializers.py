@@ -1,10 +1,39 @@
+from operator import itemgetter
 from rest_framework import serializers
 from .models import Event, Enrollment
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 
-class EventSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Trim output to the `sparse_fields` selection in the serializer context.
+
+    Computed fields list the model columns they read in `Meta.sparse_sources`
+    so views can push the selection down into `.only()`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('sparse_fields')
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    def get_only_fields(self):
+        """Return the `.only()` lookups and relations to join for the selected fields."""
+        sources = getattr(self.Meta, 'sparse_sources', {})
+        lookups = {self.Meta.model._meta.pk.name}
+        for name, field in self.fields.items():
+            if name in sources:
+                lookups.update(sources[name])
+            else:
+                lookups.add(field.source.replace('.', '__'))
+        relations = {lookup.split('__')[0] for lookup in lookups if '__' in lookup}
+        return sorted(lookups), sorted(relations)
+
+
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Event model."""
     created_by_email = serializers.EmailField(source='created_by.email', read_only=True)
     available_seats = serializers.SerializerMethodField()
@@ -24,6 +53,11 @@ class EventSerializer(serializers.ModelSerializer):
             'is_past', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_by', 'created_at', 'updated_at']
+        sparse_sources = {
+            'available_seats': ['capacity'],
+            'total_enrollments': [],
+            'is_past': ['ends_at'],
+        }
 
     def validate(self, attrs):
         """Validate event data."""
@@ -40,7 +74,7 @@ class EventSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class EventListSerializer(serializers.ModelSerializer):
+class EventListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for event lists."""
     created_by_email = serializers.EmailField(source='created_by.email', read_only=True)
     available_seats = serializers.SerializerMethodField()
@@ -58,9 +92,14 @@ class EventListSerializer(serializers.ModelSerializer):
             'starts_at', 'ends_at', 'capacity', 'created_by_email',
             'available_seats', 'total_enrollments', 'is_past'
         ]
+        sparse_sources = {
+            'available_seats': ['capacity'],
+            'total_enrollments': [],
+            'is_past': ['ends_at'],
+        }
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Enrollment model."""
     event_title = serializers.CharField(source='event.title', read_only=True)
     event_starts_at = serializers.DateTimeField(source='event.starts_at', read_only=True)
@@ -93,3 +132,133 @@ class EnrollmentSerializer(serializers.ModelSerializer):
 
         return attrs
 
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for list endpoints.
+
+    Works from `.values()` rows instead of model instances, so there is no
+    field introspection or per-field dispatch. Subclasses must produce
+    exactly the same representation as their ModelSerializer counterpart.
+
+    `field_sources` maps each output field to the columns it reads. Plain
+    columns are copied as-is, `datetime_fields` are formatted like
+    DateTimeField and anything else is rendered by a `get_<field>` method.
+    """
+    fields = ()
+    field_sources = {}
+    datetime_fields = ()
+
+    def __init__(self, instance=None, many=False, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        selected = self.context.get('sparse_fields')
+        self.selected_fields = [name for name in self.fields if selected is None or name in selected]
+
+    @classmethod
+    def get_columns(cls, fields=None, extra=()):
+        """Columns needed for the selected fields (plus `extra`)."""
+        columns = []
+        for name in cls.fields:
+            if fields is None or name in fields:
+                columns.extend(c for c in cls.field_sources[name] if c not in columns)
+        columns.extend(c for c in extra if c not in columns)
+        return columns
+
+    @classmethod
+    def get_values(cls, queryset, fields=None, extra=()):
+        """Restrict a queryset to the columns needed for the selected fields (plus `extra`)."""
+        return queryset.values(*cls.get_columns(fields, extra))
+
+    def get_getter(self, name):
+        method = getattr(self, f'get_{name}', None)
+        if method is not None:
+            return method
+        column = self.field_sources[name][0]
+        if name in self.datetime_fields:
+            return lambda row: _format_datetime(row[column])
+        return itemgetter(column)
+
+    def prepare(self, rows):
+        """Batch-load anything the rows need before they are rendered."""
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    @property
+    def data(self):
+        rows = list(self.instance) if self.many else [self.instance]
+        self.getters = [(name, self.get_getter(name)) for name in self.selected_fields]
+        self.prepare(rows)
+        data = [self.to_representation(row) for row in rows]
+        return data if self.many else data[0]
+
+
+def _format_datetime(value):
+    """Format a datetime exactly like DateTimeField, without its per-call overhead."""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class EventListValuesSerializer(ValuesSerializer):
+    """Fast path for EventListSerializer."""
+    fields = EventListSerializer.Meta.fields
+    field_sources = {
+        'id': ('id',),
+        'title': ('title',),
+        'description': ('description',),
+        'language': ('language',),
+        'location': ('location',),
+        'starts_at': ('starts_at',),
+        'ends_at': ('ends_at',),
+        'capacity': ('capacity',),
+        'created_by_email': ('created_by__email',),
+        'available_seats': ('id', 'capacity'),
+        'total_enrollments': ('id',),
+        'is_past': ('ends_at',),
+    }
+    datetime_fields = ('starts_at', 'ends_at')
+
+    def prepare(self, rows):
+        """Load enrolled counts with one grouped query, only if a seat field is shown."""
+        self.enrolled_counts = {}
+        if {'available_seats', 'total_enrollments'} & set(self.selected_fields):
+            self.enrolled_counts = Event.enrolled_counts([row['id'] for row in rows])
+        self.now = timezone.now()
+
+    def get_available_seats(self, row):
+        if row['capacity'] is None:
+            return None
+        return max(0, row['capacity'] - self.enrolled_counts.get(row['id'], 0))
+
+    def get_total_enrollments(self, row):
+        return self.enrolled_counts.get(row['id'], 0)
+
+    def get_is_past(self, row):
+        return row['ends_at'] < self.now
+
+
+class EnrollmentValuesSerializer(ValuesSerializer):
+    """Fast path for EnrollmentSerializer."""
+    fields = EnrollmentSerializer.Meta.fields
+    field_sources = {
+        'id': ('id',),
+        'event': ('event_id',),
+        'event_title': ('event__title',),
+        'event_starts_at': ('event__starts_at',),
+        'event_location': ('event__location',),
+        'seeker': ('seeker_id',),
+        'seeker_email': ('seeker__email',),
+        'status': ('status',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    datetime_fields = ('event_starts_at', 'created_at', 'updated_at')
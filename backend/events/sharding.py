@@ -0,0 +1,159 @@
+"""
+Optional hash sharding of Enrollment rows across database aliases.
+
+With `ENROLLMENT_SHARDS` empty everything lives in `default` and these
+helpers reduce to the plain queries. With shards configured, each enrollment
+is stored on `shard_for_event(event_id)` and every other model stays in
+`default`. Shards cannot join to events or users, so per-seeker reads fan out
+to all shards in parallel and the related columns are merged in from
+`default`. Each shard numbers its enrollments from its own `SHARD_ID_SPAN`
+block, so an enrollment id alone names its shard.
+"""
+import contextvars
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SHARD_ID_SPAN = 10 ** 12
+
+
+def enrollment_shards():
+    """Database aliases holding enrollments."""
+    return list(settings.ENROLLMENT_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def is_sharded():
+    return bool(settings.ENROLLMENT_SHARDS)
+
+
+def shard_for_event(event_id):
+    """Alias storing the enrollments of an event."""
+    shards = enrollment_shards()
+    return shards[zlib.crc32(str(event_id).encode()) % len(shards)]
+
+
+def shard_for_enrollment(enrollment_id):
+    """Alias storing an enrollment, read off its id block."""
+    shards = enrollment_shards()
+    index = int(enrollment_id) // SHARD_ID_SPAN - 1
+    return shards[index] if is_sharded() and 0 <= index < len(shards) else DEFAULT_DB_ALIAS
+
+
+def group_by_shard(event_ids):
+    """Map each shard alias to the given event ids stored on it."""
+    groups = defaultdict(list)
+    for event_id in event_ids:
+        groups[shard_for_event(event_id)].append(event_id)
+    return dict(groups)
+
+
+def fan_out(func, aliases=None):
+    """Call `func(alias)` for every shard, in parallel when there is more than one."""
+    aliases = enrollment_shards() if aliases is None else list(aliases)
+    if len(aliases) <= 1:
+        return [func(alias) for alias in aliases]
+
+    def run(context, alias):
+        try:
+            # Run in the caller's context so the shard queries join its trace
+            return context.run(func, alias)
+        finally:
+            # Worker threads open their own connections
+            connections.close_all()
+
+    contexts = [contextvars.copy_context() for _ in aliases]
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return list(executor.map(run, contexts, aliases))
+
+
+def enrollment_values(build, columns):
+    """
+    Rows of `build(queryset)` from every shard as dicts of `columns`.
+
+    `build` receives a `.values()` queryset on one shard and adds filters,
+    ordering or a slice. `event__*` and `seeker__*` columns cannot be joined
+    on a shard, so they are loaded from `default` and merged into the rows.
+    """
+    from django.contrib.auth.models import User
+    from .models import Enrollment, Event
+
+    related = {'event': (Event, []), 'seeker': (User, [])}
+    local = []
+    for column in columns:
+        prefix, _, rest = column.partition('__')
+        if rest and prefix in related:
+            related[prefix][1].append(rest)
+            column = f'{prefix}_id'
+        if column not in local:
+            local.append(column)
+
+    rows = list(chain.from_iterable(
+        fan_out(lambda alias: list(build(Enrollment.objects.using(alias).values(*local))))
+    ))
+
+    for prefix, (model, fields) in related.items():
+        if not fields:
+            continue
+        key = f'{prefix}_id'
+        found = {
+            obj['id']: obj
+            for obj in model.objects.using(DEFAULT_DB_ALIAS)
+            .filter(id__in={row[key] for row in rows}).values('id', *fields)
+        }
+        for row in rows:
+            obj = found.get(row[key], {})
+            for field in fields:
+                row[f'{prefix}__{field}'] = obj.get(field)
+    return rows
+
+
+def reserve_id_block(alias):
+    """Start a shard's enrollment ids at its own block so ids never collide across shards."""
+    from .models import Enrollment
+
+    start = (enrollment_shards().index(alias) + 1) * SHARD_ID_SPAN
+    connection = connections[alias]
+    table = Enrollment._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MAX(id) FROM {connection.ops.quote_name(table)}')
+        if (cursor.fetchone()[0] or 0) >= start:
+            return
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, false)", [table, start])
+        elif connection.vendor == 'sqlite':
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [table])
+            cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start - 1])
+
+
+class EnrollmentShardRouter:
+    """Send enrollments to their event's shard and everything else to `default`."""
+
+    def _route(self, model, **hints):
+        if not is_sharded():
+            return None
+        if model._meta.label_lower != 'events.enrollment':
+            return DEFAULT_DB_ALIAS
+
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        label = instance._meta.label_lower
+        if label == 'events.enrollment' and instance.event_id is not None:
+            return shard_for_event(instance.event_id)
+        if label == 'events.event' and instance.pk is not None:
+            return shard_for_event(instance.pk)
+        if getattr(instance, 'enrollment_id', None) is not None:
+            return shard_for_enrollment(instance.enrollment_id)
+        return None
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Enrollments point at events and users in another database
+        if is_sharded():
+            return True
+        return None
@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils import timezone
+from .calendar_summary import invalidate_months
+from .deletion import delete_event_enrollments
+from .models import Event, EventChange, Enrollment, EventDailyRollup, Notification, Tombstone
+from .sharding import enrollment_shards, is_sharded, reserve_id_block, shard_for_event
+from .streams import publish_seats
+from .tasks import notify_event_change
+
+
+@receiver(post_save, sender=Enrollment)
+def roll_up_enrollment(sender, instance, created, raw=False, **kwargs):
+    """Count enroll and cancel transitions into the event's daily rollup, which also dates the seat change."""
+    if raw:
+        return
+
+    previous = None if created else getattr(instance, '_loaded_status', None)
+    if instance.status == previous or (not created and previous is None):
+        return
+
+    day = timezone.localdate()
+    if instance.status == 'enrolled':
+        EventDailyRollup.record(instance.event_id, day, enrolled=1)
+    elif previous == 'enrolled':
+        EventDailyRollup.record(instance.event_id, day, canceled=1)
+    instance._loaded_status = instance.status
+
+    event_id = instance.event_id
+    transaction.on_commit(lambda: publish_seats(event_id))
+
+
+@receiver(post_delete, sender=Enrollment)
+def roll_up_enrollment_delete(sender, instance, origin=None, **kwargs):
+    """Deleting an active enrollment frees its seat, so count it as a cancellation."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    # Cascades are left alone: the deleted event (or the deleted creator's events) takes its rollups with it
+    if instance.status != 'enrolled' or origin_model is not Enrollment:
+        return
+    EventDailyRollup.record(instance.event_id, timezone.localdate(), canceled=1)
+
+
+@receiver(post_save, sender=Event)
+def publish_event_capacity(sender, instance, created, raw=False, **kwargs):
+    """Capacity edits change available seats, so push them to stream listeners."""
+    if created or raw:
+        return
+    event_id = instance.pk
+    transaction.on_commit(lambda: publish_seats(event_id))
+
+
+@receiver(post_save, sender=Event)
+def invalidate_calendar(sender, instance, raw=False, **kwargs):
+    """Drop the cached calendar of the month the event was in and the one it is in now."""
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_times', (None, None))[0]
+    transaction.on_commit(lambda: invalidate_months(previous, instance.starts_at))
+
+
+@receiver(post_save, sender=Event)
+def queue_change_notice(sender, instance, created, raw=False, **kwargs):
+    """Tell enrollees when the event moves; the notice waits for a burst of edits to settle."""
+    if created or raw or not hasattr(instance, '_loaded_location'):
+        return
+    previous_starts_at, previous_location = instance._loaded_times[0], instance._loaded_location
+    if (previous_starts_at, previous_location) == (instance.starts_at, instance.location):
+        return
+    instance._loaded_location = instance.location
+
+    changed_at = timezone.now()
+    # Within a burst the first edit's values stay as the ones to compare against
+    change, created_change = EventChange.objects.get_or_create(
+        event_id=instance.pk,
+        defaults={
+            'previous_starts_at': previous_starts_at,
+            'previous_location': previous_location,
+            'changed_at': changed_at,
+        }
+    )
+    if not created_change:
+        EventChange.objects.filter(pk=change.pk).update(changed_at=changed_at)
+    event_id = instance.pk
+    transaction.on_commit(lambda: notify_event_change.apply_async(
+        (event_id, changed_at.isoformat()), countdown=settings.EVENT_CHANGE_COALESCE_SECONDS
+    ))
+
+
+# Runs after the receivers above, which read the loaded times it resets
+@receiver(post_save, sender=Event)
+def sync_enrollment_times(sender, instance, created, raw=False, **kwargs):
+    """Keep the enrollments' copy of the event's times current when it is rescheduled."""
+    times = (instance.starts_at, instance.ends_at)
+    if created or raw or getattr(instance, '_loaded_times', times) == times:
+        return
+    Enrollment.objects.using(shard_for_event(instance.pk)).filter(event_id=instance.pk).update(
+        event_starts_at=instance.starts_at,
+        event_ends_at=instance.ends_at,
+        # The rows changed, so the changefeed and the analytics export must pick them up again
+        updated_at=timezone.now(),
+    )
+    instance._loaded_times = times
+
+
+@receiver(post_delete, sender=Event)
+def tombstone_event(sender, instance, **kwargs):
+    """Leave a tombstone so sync clients learn about the deletion."""
+    Tombstone.objects.create(kind='event', object_id=instance.pk, owner_id=instance.created_by_id)
+    starts_at = instance.starts_at
+    transaction.on_commit(lambda: invalidate_months(starts_at))
+
+
+@receiver(post_delete, sender=Enrollment)
+def tombstone_enrollment(sender, instance, **kwargs):
+    """Leave a tombstone so sync clients learn about the deletion."""
+    Tombstone.objects.create(kind='enrollment', object_id=instance.pk, owner_id=instance.seeker_id)
+    if instance.status == 'enrolled':
+        event_id = instance.event_id
+        transaction.on_commit(lambda: publish_seats(event_id))
+
+
+@receiver(pre_delete, sender=Event)
+def delete_event_shard_enrollments(sender, instance, **kwargs):
+    """The cascade collector only looks in the event's database, so clear its shard first."""
+    if is_sharded():
+        delete_event_enrollments(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def delete_seeker_shard_enrollments(sender, instance, **kwargs):
+    """Clear a deleted user's enrollments from every shard."""
+    if is_sharded():
+        for alias in enrollment_shards():
+            Enrollment.objects.using(alias).filter(seeker_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Enrollment)
+def delete_shard_enrollment_notifications(sender, instance, **kwargs):
+    """Notifications stay in default, out of reach of a shard's cascade."""
+    if is_sharded():
+        Notification.objects.filter(enrollment_id=instance.pk).delete()
+
+
+def reserve_shard_ids(using, **kwargs):
+    """After migrating a shard, move its enrollment ids into the shard's own block."""
+    if is_sharded() and using in enrollment_shards():
+        reserve_id_block(using)
@@ -0,0 +1,171 @@
+"""
+Server-Sent Events stream of seat availability.
+
+Served directly by `events_platform/asgi.py` so each connection can watch for
+client disconnects while it waits. Enrollment changes publish one seat count
+per event, which the pub/sub backend fans out to every listener; listeners
+never query the database after the initial snapshot. The same counts back the
+batch seat lookup, cached briefly and refreshed whenever they are published.
+"""
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from events_platform.pubsub import get_pubsub
+from .models import Event
+
+SEAT_STREAM_PATH = re.compile(r'^/api/events/(?P<event_id>\d+)/seats/stream/$')
+
+
+def seat_channel(event_id):
+    return f'seats.{event_id}'
+
+
+def seat_payloads(event_ids):
+    """Current capacity and seat counts for each existing event in `event_ids`, by id."""
+    capacities = dict(Event.objects.filter(pk__in=event_ids).values_list('id', 'capacity'))
+    enrolled = Event.enrolled_counts(list(capacities))
+    return {
+        event_id: {
+            'event': event_id,
+            'capacity': capacity,
+            'total_enrollments': enrolled.get(event_id, 0),
+            'available_seats': None if capacity is None else max(0, capacity - enrolled.get(event_id, 0)),
+        }
+        for event_id, capacity in capacities.items()
+    }
+
+
+def seat_payload(event_id):
+    """Current capacity and seat counts for an event, or None if it does not exist."""
+    return seat_payloads([event_id]).get(event_id)
+
+
+def seat_cache_key(event_id):
+    return f'events:seats:{event_id}'
+
+
+def cached_seat_payloads(event_ids):
+    """As `seat_payloads`, served from the cache for up to `EVENT_SEATS_CACHE_SECONDS`."""
+    if not settings.EVENT_SEATS_CACHE_SECONDS:
+        return seat_payloads(event_ids)
+    cached = cache.get_many([seat_cache_key(event_id) for event_id in event_ids])
+    payloads = {payload['event']: payload for payload in cached.values()}
+    missing = [event_id for event_id in event_ids if event_id not in payloads]
+    if missing:
+        fresh = seat_payloads(missing)
+        cache.set_many(
+            {seat_cache_key(event_id): payload for event_id, payload in fresh.items()},
+            settings.EVENT_SEATS_CACHE_SECONDS
+        )
+        payloads.update(fresh)
+    return payloads
+
+
+def publish_seats(event_id):
+    """Publish the event's seat counts to every stream subscriber and refresh the cached copy."""
+    payload = seat_payload(event_id)
+    if payload is not None:
+        get_pubsub().publish(seat_channel(event_id), payload)
+        if settings.EVENT_SEATS_CACHE_SECONDS:
+            cache.set(seat_cache_key(event_id), payload, settings.EVENT_SEATS_CACHE_SECONDS)
+
+
+def authenticate(token):
+    """Return the verified user for a JWT access token, or None."""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+    auth = JWTAuthentication()
+    try:
+        user = auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    if not hasattr(user, 'profile') or not user.profile.is_email_verified:
+        return None
+    return user
+
+
+def _cors_headers(scope):
+    origin = dict(scope['headers']).get(b'origin', b'').decode()
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [
+            (b'access-control-allow-origin', origin.encode()),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin'),
+        ]
+    return []
+
+
+async def _send_json(send, scope, status, detail, code):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')] + _cors_headers(scope),
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'detail': detail, 'code': code}).encode()})
+
+
+def _sse(message):
+    return f'event: seats\ndata: {json.dumps(message)}\n\n'.encode()
+
+
+async def seat_stream(scope, receive, send):
+    """ASGI app: GET /api/events/<id>/seats/stream/?token=<access token>."""
+    event_id = int(SEAT_STREAM_PATH.match(scope['path']).group('event_id'))
+    # EventSource cannot set headers, so the access token comes in the query string
+    token = parse_qs(scope['query_string'].decode()).get('token', [''])[0]
+
+    user = await sync_to_async(authenticate)(token) if token else None
+    if user is None:
+        return await _send_json(send, scope, 401, 'Authentication credentials were not provided or are invalid.', 'not_authenticated')
+
+    subscription = get_pubsub().subscribe(seat_channel(event_id))
+    try:
+        snapshot = await sync_to_async(seat_payload)(event_id)
+        if snapshot is None:
+            return await _send_json(send, scope, 404, 'Event not found.', 'event_not_found')
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ] + _cors_headers(scope),
+        })
+        await send({'type': 'http.response.body', 'body': _sse(snapshot), 'more_body': True})
+
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            while True:
+                update = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {update, disconnect},
+                    timeout=settings.SEAT_STREAM_KEEPALIVE_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnect in done:
+                    update.cancel()
+                    break
+                if update in done:
+                    body = _sse(update.result())
+                else:
+                    update.cancel()
+                    body = b': keepalive\n\n'
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnect.cancel()
+    finally:
+        subscription.close()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
@@ -1,21 +1,24 @@
+import logging
+from itertools import groupby
 from celery import shared_task
-from django.core.mail import send_mail
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, send_mail, get_connection
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
 from datetime import timedelta
-from .models import Enrollment, Event
+from events_platform.mail import PartialSendError, retry_countdown, send_in_order
+from .models import Enrollment, Event, EventChange, Notification, Tombstone
+from .sharding import fan_out, group_by_shard, is_sharded, shard_for_enrollment, shard_for_event
 
+logger = logging.getLogger(__name__)
 
-@shared_task
-def send_followup_email(enrollment_id):
-    """Send follow-up email to seeker 1 hour after enrollment."""
-    try:
-        enrollment = Enrollment.objects.get(id=enrollment_id, status='enrolled')
-        event = enrollment.event
-        seeker = enrollment.seeker
 
-        subject = f'Thank you for enrolling in {event.title}'
-        message = f"""
+def render_followup(event, seeker):
+    """Subject and body of the follow-up email for one enrollment."""
+    subject = f'Thank you for enrolling in {event.title}'
+    message = f"""
 Hello {seeker.email},
 
 Thank you for enrolling in "{event.title}"!
@@ -30,38 +33,13 @@ We look forward to seeing you there!
 Best regards,
 Events Platform Team
         """
+    return subject, message
 
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[seeker.email],
-            fail_silently=False,
-        )
-    except Enrollment.DoesNotExist:
-        pass
-
-
-@shared_task
-def send_reminder_emails():
-    """Send reminder emails to seekers 1 hour before their enrolled events start."""
-    now = timezone.now()
-    reminder_time = now + timedelta(hours=1)
-    reminder_window_end = reminder_time + timedelta(minutes=5)  # 5-minute window
-
-    # Get enrollments for events starting in approximately 1 hour
-    enrollments = Enrollment.objects.filter(
-        status='enrolled',
-        event__starts_at__gte=reminder_time,
-        event__starts_at__lte=reminder_window_end,
-    ).select_related('event', 'seeker')
 
-    for enrollment in enrollments:
-        event = enrollment.event
-        seeker = enrollment.seeker
-
-        subject = f'Reminder: {event.title} starts in 1 hour!'
-        message = f"""
+def render_reminder(event, seeker):
+    """Subject and body of the reminder email for one enrollment."""
+    subject = f'Reminder: {event.title} starts in 1 hour!'
+    message = f"""
 Hello {seeker.email},
 
 This is a reminder that "{event.title}" starts in 1 hour!
@@ -76,16 +54,301 @@ See you soon!
 Best regards,
 Events Platform Team
         """
+    return subject, message
+
+
+def render_event_change(event, seeker, previous_starts_at, previous_location):
+    """Subject and body of the email telling an enrollee that their event moved."""
+    changes = []
+    if event.starts_at != previous_starts_at:
+        changes.append(
+            f"- Starts: {event.starts_at.strftime('%Y-%m-%d %H:%M UTC')} "
+            f"(was {previous_starts_at.strftime('%Y-%m-%d %H:%M UTC')})"
+        )
+    if event.location != previous_location:
+        changes.append(f'- Location: {event.location} (was {previous_location})')
+
+    subject = f'Updated: {event.title}'
+    message = f"""
+Hello {seeker.email},
+
+"{event.title}" has changed:
+{chr(10).join(changes)}
+
+Your enrollment stays as it is.
+
+Best regards,
+Events Platform Team
+        """
+    return subject, message
+
+
+def render_digest(seeker, notifications):
+    """Subject and body of one email covering several notifications."""
+    if len(notifications) == 1:
+        render = render_reminder if notifications[0].kind == 'reminder' else render_followup
+        return render(notifications[0].enrollment.event, seeker)
+
+    sections = []
+    for kind, heading in (('reminder', 'Starting soon'), ('followup', 'Thank you for enrolling')):
+        lines = [
+            f'- "{n.enrollment.event.title}" - {n.enrollment.event.location}, '
+            f'{n.enrollment.event.starts_at.strftime("%Y-%m-%d %H:%M UTC")} ({n.enrollment.event.language})'
+            for n in notifications if n.kind == kind
+        ]
+        if lines:
+            sections.append(f'{heading}:\n' + '\n'.join(lines))
+
+    subject = f'Your Events Platform updates ({len(notifications)} events)'
+    message = f"""
+Hello {seeker.email},
+
+{chr(10).join(sections)}
+
+See you soon!
+
+Best regards,
+Events Platform Team
+        """
+    return subject, message
+
+
+def prefetch_shard_enrollments(notifications):
+    """Attach each notification's enrollment (and its event) from the enrollment's shard."""
+    groups = {}
+    for notification in notifications:
+        groups.setdefault(shard_for_enrollment(notification.enrollment_id), []).append(notification.enrollment_id)
+    enrollments = {
+        enrollment.id: enrollment
+        for found in fan_out(lambda alias: list(Enrollment.objects.using(alias).filter(id__in=groups[alias])), groups)
+        for enrollment in found
+    }
+    events = Event.objects.in_bulk({enrollment.event_id for enrollment in enrollments.values()})
+    for notification in notifications:
+        enrollment = enrollments.get(notification.enrollment_id)
+        if enrollment is not None:
+            enrollment.event = events[enrollment.event_id]
+        notification.enrollment = enrollment
+    return notifications
+
+
+@shared_task
+def send_followup_email(enrollment_id):
+    """Deprecated: queue a digest follow-up for messages enqueued before follow-ups became notifications."""
+    # Remove once no worker can still hold a message from the old re-enroll path
+    seeker_id = Enrollment.objects.using(shard_for_enrollment(enrollment_id)).filter(
+        id=enrollment_id, status='enrolled'
+    ).values_list('seeker_id', flat=True).first()
+    if seeker_id is None:
+        return
+    Notification.objects.get_or_create(
+        enrollment_id=enrollment_id,
+        kind='followup',
+        sent_at=None,
+        # The message's hour-long countdown has already run out
+        defaults={'recipient_id': seeker_id, 'due_at': timezone.now()}
+    )
 
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[seeker.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            # Log error in production
-            print(f"Error sending reminder email to {seeker.email}: {e}")
 
+@shared_task
+def send_reminder_emails():
+    """Queue reminders for enrolled events starting in about 1 hour, then send due digests."""
+    now = timezone.now()
+    reminder_time = now + timedelta(hours=1)
+    # Look one beat interval past the digest window so reminders exist before they fall due
+    reminder_window_end = reminder_time + timedelta(
+        minutes=2 * settings.NOTIFICATION_LEAD_MINUTES + settings.NOTIFICATION_DIGEST_WINDOW_MINUTES
+    )
+
+    starts = dict(Event.objects.filter(
+        starts_at__gte=reminder_time,
+        starts_at__lte=reminder_window_end,
+    ).values_list('id', 'starts_at'))
+
+    # Enrollments live on their event's shard, so they are read per shard without a join
+    for alias, event_ids in group_by_shard(starts).items():
+        enrollments = Enrollment.objects.using(alias).filter(
+            event_id__in=event_ids,
+            status='enrolled',
+        ).values_list('id', 'seeker_id', 'event_id')
+
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient_id=seeker_id,
+                    enrollment_id=enrollment_id,
+                    kind='reminder',
+                    due_at=starts[event_id] - timedelta(hours=1),
+                )
+                for enrollment_id, seeker_id, event_id in enrollments.iterator()
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    send_notification_digests()
+
+
+@shared_task
+def send_notification_digests():
+    """Queue digest batches for every recipient with a notification due now."""
+    due = timezone.now() + timedelta(minutes=settings.NOTIFICATION_LEAD_MINUTES)
+    recipient_ids = Notification.objects.filter(
+        sent_at__isnull=True,
+        due_at__lte=due,
+    ).order_by('recipient_id').values_list('recipient_id', flat=True).distinct()
+
+    # Hand the sends to the rate-limited bulk lane in fixed-size batches of recipients
+    batch = []
+    for recipient_id in recipient_ids.iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE):
+        batch.append(recipient_id)
+        if len(batch) == settings.NOTIFICATION_BATCH_SIZE:
+            send_digest_batch.delay(batch)
+            batch = []
+    if batch:
+        send_digest_batch.delay(batch)
+
+
+@shared_task(ignore_result=True)
+def send_digest_batch(recipient_ids):
+    """Send one email per recipient covering all their notifications due within the digest window."""
+    now = timezone.now()
+    horizon = now + timedelta(
+        minutes=settings.NOTIFICATION_LEAD_MINUTES + settings.NOTIFICATION_DIGEST_WINDOW_MINUTES
+    )
+    pending = Notification.objects.filter(
+        recipient_id__in=recipient_ids,
+        sent_at__isnull=True,
+        due_at__lte=horizon,
+    ).select_related('recipient').order_by('recipient_id', 'due_at')
+    if is_sharded():
+        # Enrollments are on other databases; load them in one pass per shard
+        pending = prefetch_shard_enrollments(list(pending))
+    else:
+        pending = pending.select_related('enrollment__event')
+
+    with get_connection() as connection:
+        for _, group in groupby(pending, key=lambda n: n.recipient_id):
+            notifications = list(group)
+            # Claim row by row: rows an overlapping run holds or has sent are left to it
+            with transaction.atomic():
+                ids = list(Notification.objects.select_for_update(skip_locked=True).filter(
+                    id__in=[n.id for n in notifications], sent_at__isnull=True,
+                ).values_list('id', flat=True))
+                Notification.objects.filter(id__in=ids).update(sent_at=now)
+            claimed = set(ids)
+
+            # Claimed rows whose enrollment is gone or canceled stay stamped, so they are never retried
+            notifications = [
+                n for n in notifications
+                if n.id in claimed and n.enrollment and n.enrollment.status == 'enrolled'
+            ]
+            if not notifications:
+                continue
+
+            notifications.sort(key=lambda n: n.enrollment.event.starts_at)
+            seeker = notifications[0].recipient
+            subject, message = render_digest(seeker, notifications)
+            try:
+                send_mail(
+                    subject=subject,
+                    message=message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[seeker.email],
+                    fail_silently=False,
+                    connection=connection,
+                )
+            except Exception:
+                # Release the claim so the next run retries
+                Notification.objects.filter(id__in=ids).update(sent_at=None)
+                logger.exception('Error sending notification email to %s', seeker.email)
+
+
+@shared_task
+def notify_event_change(event_id, changed_at):
+    """
+    Queue change emails to every enrollee once the edit made at `changed_at` is the latest.
+
+    Earlier edits of a burst find a newer `changed_at` and leave the notice to the last one,
+    so seekers get one email comparing the event with how it was before the first edit.
+    """
+    with transaction.atomic():
+        change = EventChange.objects.select_for_update().filter(
+            event_id=event_id, changed_at=parse_datetime(changed_at)
+        ).first()
+        if change is None:
+            return
+        change.delete()
+    event = Event.objects.filter(pk=event_id).first()
+    if event is None or (event.starts_at, event.location) == (change.previous_starts_at, change.previous_location):
+        return
+
+    previous = (change.previous_starts_at.isoformat(), change.previous_location)
+    enrollments = Enrollment.objects.using(shard_for_event(event_id)).filter(
+        event_id=event_id, status='enrolled'
+    ).order_by('id').values_list('id', 'seeker_id')
+    last_id = 0
+    while True:
+        chunk = list(enrollments.filter(id__gt=last_id)[:settings.EVENT_CHANGE_BATCH_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        enrollment_ids = [enrollment_id for enrollment_id, _ in chunk]
+        # Unsent reminders were timed for the old start; the next reminder run queues fresh ones
+        if event.starts_at != change.previous_starts_at:
+            Notification.objects.filter(
+                enrollment_id__in=enrollment_ids, kind='reminder', sent_at__isnull=True
+            ).delete()
+        send_event_change_batch.delay(event_id, [seeker_id for _, seeker_id in chunk], *previous)
+
+
+@shared_task(bind=True, ignore_result=True)
+def send_event_change_batch(self, event_id, seeker_ids, previous_starts_at, previous_location):
+    """Send one batch of event change emails over a single SMTP connection, retrying unsent recipients."""
+    event = Event.objects.filter(pk=event_id).first()
+    if event is None:
+        return
+    seekers = list(User.objects.filter(id__in=seeker_ids).only('id', 'email').order_by('id'))
+    messages = []
+    for seeker in seekers:
+        subject, message = render_event_change(event, seeker, parse_datetime(previous_starts_at), previous_location)
+        messages.append(EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [seeker.email]))
+    try:
+        send_in_order(messages)
+    except PartialSendError as error:
+        unsent = [seeker.id for seeker in seekers[error.sent:]]
+        logger.warning('Event %s change notice reached %d of %d seekers; retrying the rest', event_id, error.sent, len(seekers))
+        raise self.retry(
+            args=(event_id, unsent, previous_starts_at, previous_location),
+            exc=error, countdown=retry_countdown(self.request.retries), max_retries=settings.EMAIL_MAX_RETRIES,
+        )
+
+
+@shared_task
+def prune_tombstones():
+    """Delete sync tombstones and sent notifications older than the retention window."""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    Notification.objects.filter(sent_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task
+def archive_past_events():
+    """Move long-finished events and their enrollments into the archive tables."""
+    from .archive import archive_past_events as archive
+    return archive()
+
+
+@shared_task
+def compute_recommendations():
+    """Rebuild every seeker's precomputed event recommendations."""
+    from .recommendations import compute_recommendations as compute
+    return compute()
+
+
+@shared_task
+def export_analytics():
+    """Append events, enrollments and tombstones changed since the last export to the columnar files."""
+    from .export import export_analytics as export
+    return export()
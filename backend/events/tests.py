@@ -0,0 +1,1029 @@
+import asyncio
+import contextvars
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import groupby
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from celery.signals import task_postrun, task_prerun
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import EmailOTP, UserProfile
+from events_platform import pubsub, tracing
+from events_platform.asgi import application
+from events_platform.query_shapes import ShapeRecorder
+from events_platform.renderers import ORJSONRenderer
+from . import archive
+from .admin import EstimatedCountPaginator, estimated_row_count
+from .archive import archive_events, archive_past_events
+from .deletion import delete_event
+from .management.commands import check_query_counts
+from .export import export_analytics, pyarrow
+from .recommendations import compute_recommendations
+from .serializers import (
+    EnrollmentSerializer, EnrollmentValuesSerializer, EventListSerializer, EventListValuesSerializer,
+)
+from .streams import publish_seats
+from .sharding import (
+    SHARD_ID_SPAN, EnrollmentShardRouter, fan_out, group_by_shard, shard_for_enrollment, shard_for_event,
+)
+from .models import (
+    ArchivedEnrollment, ArchivedEventDailyRollup, Enrollment, Event, EventChange, EventDailyRollup, Notification,
+    Recommendation, Tombstone,
+)
+from .tasks import (
+    notify_event_change, prune_tombstones, send_digest_batch, send_event_change_batch, send_followup_email,
+)
+
+
+def make_user(email, role='Seeker'):
+    user = User.objects.create_user(username=email, email=email, password='Str0ng-pass!')
+    UserProfile.objects.create(user=user, role=role, is_email_verified=True)
+    return user
+
+
+def make_event(creator, title='Event', starts_in=timedelta(days=2), **fields):
+    starts_at = timezone.now() + starts_in
+    defaults = {
+        'description': 'Details',
+        'language': 'English',
+        'location': 'Berlin',
+        'starts_at': starts_at,
+        'ends_at': starts_at + timedelta(hours=2),
+    }
+    return Event.objects.create(title=title, created_by=creator, **{**defaults, **fields})
+
+
+class DigestBatchTests(TestCase):
+    def setUp(self):
+        self.facilitator = make_user('host@example.com', role='Facilitator')
+        self.seeker = make_user('seeker@example.com')
+        self.notifications = []
+        for title in ('First', 'Second'):
+            event = make_event(self.facilitator, title=title)
+            enrollment = Enrollment.objects.create(event=event, seeker=self.seeker)
+            self.notifications.append(Notification.objects.create(
+                recipient=self.seeker, enrollment=enrollment, kind='followup', due_at=timezone.now()
+            ))
+
+    def test_sends_one_digest_and_stamps_rows(self):
+        send_digest_batch([self.seeker.id])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('First', mail.outbox[0].body)
+        self.assertIn('Second', mail.outbox[0].body)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_rows_claimed_by_an_overlapping_run_are_left_to_it(self):
+        taken, left = self.notifications
+        other_run = timezone.now() - timedelta(seconds=1)
+
+        def overlapping(rows, key):
+            rows = list(rows)
+            Notification.objects.filter(pk=taken.pk).update(sent_at=other_run)
+            return groupby(rows, key)
+
+        with mock.patch('events.tasks.groupby', overlapping):
+            send_digest_batch([self.seeker.id])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertNotIn('First', mail.outbox[0].body)
+        self.assertIn('Second', mail.outbox[0].body)
+        taken.refresh_from_db()
+        left.refresh_from_db()
+        self.assertEqual(taken.sent_at, other_run)
+        self.assertIsNotNone(left.sent_at)
+
+    def test_failed_send_releases_the_claim(self):
+        with mock.patch('events.tasks.send_mail', side_effect=OSError('SMTP down')), \
+                self.assertLogs('events.tasks', 'ERROR'):
+            send_digest_batch([self.seeker.id])
+        self.assertEqual(Notification.objects.filter(sent_at__isnull=True).count(), 2)
+
+    def test_canceled_enrollments_are_stamped_without_mail(self):
+        Enrollment.objects.update(status='canceled')
+        send_digest_batch([self.seeker.id])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+
+class FollowupShimTests(TestCase):
+    def test_queued_followup_becomes_a_digest_notification(self):
+        seeker = make_user('seeker@example.com')
+        enrollment = Enrollment.objects.create(event=make_event(make_user('host@example.com', role='Facilitator')), seeker=seeker)
+        send_followup_email(enrollment.id)
+        send_followup_email(enrollment.id)
+        notification = Notification.objects.get(enrollment_id=enrollment.id)
+        self.assertEqual((notification.kind, notification.recipient_id), ('followup', seeker.id))
+        self.assertLessEqual(notification.due_at, timezone.now())
+
+    def test_canceled_or_missing_enrollments_are_dropped(self):
+        enrollment = Enrollment.objects.create(
+            event=make_event(make_user('host@example.com', role='Facilitator')),
+            seeker=make_user('seeker@example.com'), status='canceled',
+        )
+        send_followup_email(enrollment.id)
+        send_followup_email(enrollment.id + 1000)
+        self.assertFalse(Notification.objects.exists())
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.facilitator = make_user('host@example.com', role='Facilitator')
+        self.seeker = make_user('seeker@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seeker)
+
+    def as_facilitator(self):
+        client = APIClient()
+        client.force_authenticate(self.facilitator)
+        return client
+
+
+class EventDeletionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(self.facilitator, capacity=10)
+        self.seekers = [self.seeker] + [make_user(f'seeker{i}@example.com') for i in range(4)]
+        self.enrollments = [Enrollment.objects.create(event=self.event, seeker=seeker) for seeker in self.seekers]
+        Notification.objects.create(
+            recipient=self.seeker, enrollment=self.enrollments[0], kind='reminder', due_at=timezone.now()
+        )
+        self.other = Enrollment.objects.create(event=make_event(self.facilitator, 'Other'), seeker=self.seeker)
+
+    def test_enrollments_go_in_chunks_of_set_based_deletes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(delete_event(self.event, chunk_size=2), 5)
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE FROM "events_enrollment"')]
+        self.assertEqual(len(deletes), 3)
+
+        self.assertFalse(Event.objects.exclude(pk=self.other.event_id).exists())
+        self.assertEqual(list(Enrollment.objects.all()), [self.other])
+        self.assertFalse(Notification.objects.exists())
+
+    def test_sync_clients_get_a_tombstone_per_enrollment(self):
+        event_id = self.event.pk
+        delete_event(self.event, chunk_size=2)
+        self.assertEqual(
+            set(Tombstone.objects.filter(kind='enrollment').values_list('object_id', 'owner_id')),
+            {(enrollment.pk, enrollment.seeker_id) for enrollment in self.enrollments},
+        )
+        self.assertTrue(Tombstone.objects.filter(kind='event', object_id=event_id).exists())
+
+    def test_api_delete_uses_the_chunked_path(self):
+        event_id = self.event.pk
+        with mock.patch('events.views.delete_event', wraps=delete_event) as chunked:
+            response = self.as_facilitator().delete(f'/api/events/{event_id}/')
+        self.assertEqual(response.status_code, 204)
+        chunked.assert_called_once()
+        self.assertFalse(Enrollment.objects.filter(event_id=event_id).exists())
+
+
+class SerializationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = [
+            make_event(self.facilitator, 'Full', capacity=1),
+            make_event(self.facilitator, 'Open', starts_in=timedelta(days=3), capacity=5),
+            make_event(self.facilitator, 'Unlimited', starts_in=timedelta(days=4)),
+            make_event(self.facilitator, 'Over', starts_in=-timedelta(days=1)),
+        ]
+        for event in self.events[:2]:
+            Enrollment.objects.create(event=event, seeker=self.seeker)
+
+    def test_values_serializers_match_their_model_serializers(self):
+        events = Event.objects.order_by('id')
+        self.assertEqual(
+            EventListValuesSerializer(EventListValuesSerializer.get_values(events), many=True).data,
+            EventListSerializer(events, many=True).data,
+        )
+        enrollments = Enrollment.objects.order_by('id')
+        self.assertEqual(
+            EnrollmentValuesSerializer(EnrollmentValuesSerializer.get_values(enrollments), many=True).data,
+            EnrollmentSerializer(enrollments, many=True).data,
+        )
+
+    def test_orjson_renderer_produces_the_same_bytes_as_json_renderer(self):
+        data = {
+            'title': 'Caf\u00e9 \u2028 \U0001f389',
+            'starts_at': timezone.now(),
+            'price': Decimal('12.50'),
+            'rows': [{'id': 1, 'seats': None, 'past': False}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = 'application/json; indent=2'
+        self.assertEqual(ORJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+
+    def test_list_responses_match_the_stock_renderer(self):
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_fields_selects_and_omit_drops_output_fields(self):
+        rows = self.client.get('/api/events/?fields=id,title,nonexistent').data['results']
+        self.assertEqual([set(row) for row in rows], [{'id', 'title'}] * len(rows))
+
+        detail = self.client.get(f'/api/events/{self.events[0].pk}/?fields=id,available_seats').data
+        self.assertEqual(detail, {'id': self.events[0].pk, 'available_seats': 0})
+
+        rows = self.client.get('/api/enrollments/?omit=seeker,seeker_email').data['results']
+        expected = set(EnrollmentSerializer.Meta.fields) - {'seeker', 'seeker_email'}
+        self.assertEqual([set(row) for row in rows], [expected] * 2)
+
+    def test_unselected_seat_fields_skip_the_enrolled_counts_query(self):
+        with self.assertNumQueries(2):
+            self.client.get('/api/events/?fields=id,title')
+
+
+class EnrollmentRollupTests(APITestCase):
+    def analytics_event(self, event):
+        response = self.as_facilitator().get('/api/events/analytics/')
+        return next(row for row in response.data['events'] if row['id'] == event.pk)
+
+    def test_deleting_an_enrollment_counts_as_a_cancellation(self):
+        event = make_event(self.facilitator, capacity=10)
+        enrollment_id = self.client.post('/api/enrollments/', {'event': event.pk}).data['id']
+        self.assertEqual(self.client.delete(f'/api/enrollments/{enrollment_id}/').status_code, 204)
+
+        row = self.analytics_event(event)
+        self.assertEqual((row['enrolled'], row['canceled'], row['current_enrollments']), (1, 1, 0))
+
+    def test_deleting_a_canceled_enrollment_counts_nothing_more(self):
+        event = make_event(self.facilitator)
+        enrollment = Enrollment.objects.create(event=event, seeker=self.seeker)
+        enrollment.status = 'canceled'
+        enrollment.save()
+        enrollment.delete()
+        self.assertEqual(EventDailyRollup.objects.get(event=event).canceled, 1)
+
+    def test_deleting_the_event_removes_its_rollups(self):
+        event = make_event(self.facilitator)
+        Enrollment.objects.create(event=event, seeker=self.seeker)
+        self.assertEqual(self.as_facilitator().delete(f'/api/events/{event.pk}/').status_code, 204)
+        self.assertFalse(EventDailyRollup.objects.exists())
+
+
+class EnrollmentConflictTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.booked = make_event(self.facilitator, title='Booked')
+        Enrollment.objects.create(event=self.booked, seeker=self.seeker)
+
+    def enroll(self, event):
+        return self.client.post('/api/enrollments/', {'event': event.pk})
+
+    def test_full_overlapping_event_reports_capacity_not_conflict(self):
+        full = make_event(self.facilitator, title='Full', capacity=1)
+        Enrollment.objects.create(event=full, seeker=make_user('other@example.com'))
+        response = self.enroll(full)
+        self.assertEqual((response.status_code, response.data['code']), (400, 'capacity_full'))
+
+    def test_past_overlapping_event_reports_past_not_conflict(self):
+        past = make_event(self.facilitator, title='Past', starts_in=timedelta(hours=-3))
+        Enrollment.objects.create(event=past, seeker=self.seeker)
+        response = self.enroll(make_event(self.facilitator, title='Also past', starts_in=timedelta(hours=-3)))
+        self.assertEqual((response.status_code, response.data['code']), (400, 'past_event'))
+
+    def test_rescheduling_moves_enrollment_times_and_stamps_them(self):
+        enrollment = Enrollment.objects.get(event=self.booked)
+        event = Event.objects.get(pk=self.booked.pk)
+        event.starts_at += timedelta(days=1)
+        event.ends_at += timedelta(days=1)
+        event.save()
+        moved = Enrollment.objects.get(pk=enrollment.pk)
+        self.assertEqual((moved.event_starts_at, moved.event_ends_at), (event.starts_at, event.ends_at))
+        self.assertGreater(moved.updated_at, enrollment.updated_at)
+
+    def test_re_enrolling_still_checks_conflicts(self):
+        other = make_event(self.facilitator, title='Other')
+        Enrollment.objects.create(event=other, seeker=self.seeker, status='canceled')
+        response = self.enroll(other)
+        self.assertEqual((response.status_code, response.data['code']), (409, 'schedule_conflict'))
+        self.assertEqual(response.data['conflicts'], [self.booked.pk])
+
+
+# Moving an event queues a change notice once the edit commits
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class CalendarTests(APITestCase):
+    def at(self, month, day):
+        starts_at = timezone.make_aware(datetime(2030, month, day, 12))
+        return {'starts_at': starts_at, 'ends_at': starts_at + timedelta(hours=2)}
+
+    def calendar(self, month='2030-03', **params):
+        response = self.client.get('/api/events/calendar/', {'month': month, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['days']
+
+    def test_days_count_events_and_remaining_seats(self):
+        event = make_event(self.facilitator, capacity=5, language='English', **self.at(3, 10))
+        make_event(self.facilitator, language='German', **self.at(3, 10))
+        make_event(self.facilitator, capacity=2, **self.at(3, 12))
+        Enrollment.objects.create(event=event, seeker=self.seeker)
+
+        self.assertEqual(self.calendar(), [
+            {'day': '2030-03-10', 'events': 2, 'remaining_seats': 4, 'unlimited_events': 1},
+            {'day': '2030-03-12', 'events': 1, 'remaining_seats': 2, 'unlimited_events': 0},
+        ])
+        self.assertEqual([(row['day'], row['language']) for row in self.calendar(split='language')], [
+            ('2030-03-10', 'English'), ('2030-03-10', 'German'), ('2030-03-12', 'English'),
+        ])
+
+    def test_summary_is_served_from_the_cache(self):
+        make_event(self.facilitator, **self.at(3, 10))
+        self.calendar()
+        with self.assertNumQueries(0):
+            self.calendar()
+
+    def test_saving_an_event_invalidates_its_months(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            event = make_event(self.facilitator, **self.at(3, 10))
+        self.assertEqual(len(self.calendar()), 1)
+        self.assertEqual(self.calendar('2030-04'), [])
+
+        event = Event.objects.get(pk=event.pk)
+        event.starts_at, event.ends_at = self.at(4, 2).values()
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertEqual(self.calendar(), [])
+        self.assertEqual([row['day'] for row in self.calendar('2030-04')], ['2030-04-02'])
+
+    def test_deleting_an_event_invalidates_its_month(self):
+        event = make_event(self.facilitator, **self.at(3, 10))
+        self.assertEqual(len(self.calendar()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            event.delete()
+        self.assertEqual(self.calendar(), [])
+
+    def test_invalid_month_and_split_are_rejected(self):
+        response = self.client.get('/api/events/calendar/', {'month': '2030-13'})
+        self.assertEqual((response.status_code, response.data['code']), (400, 'invalid_month'))
+        response = self.client.get('/api/events/calendar/', {'split': 'title'})
+        self.assertEqual((response.status_code, response.data['code']), (400, 'invalid_split'))
+
+
+@mock.patch.object(pubsub, '_pubsub', None)
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, PUBSUB_BACKEND='events_platform.pubsub.InProcessPubSub')
+class SeatLookupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = [make_event(self.facilitator, capacity=3), make_event(self.facilitator)]
+
+    def seats(self, ids=None):
+        ids = ids or [event.pk for event in self.events]
+        response = self.client.get('/api/events/seats/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        return {row['event']: row['available_seats'] for row in response.data['results']}
+
+    def test_results_follow_the_requested_order_and_skip_unknown_ids(self):
+        full, unlimited = self.events
+        response = self.client.get('/api/events/seats/', {'ids': f'{unlimited.pk},999999,{full.pk},{unlimited.pk}'})
+        self.assertEqual([row['event'] for row in response.data['results']], [unlimited.pk, full.pk])
+        self.assertEqual(response.data['results'][1], {
+            'event': full.pk, 'capacity': 3, 'total_enrollments': 0, 'available_seats': 3,
+        })
+
+    def test_invalid_or_too_many_ids_are_rejected(self):
+        for ids in ('', 'a,b', ','.join(str(i) for i in range(1, 5))):
+            with self.subTest(ids=ids), self.settings(EVENT_SEATS_MAX_IDS=3):
+                response = self.client.get('/api/events/seats/', {'ids': ids})
+                self.assertEqual((response.status_code, response.data['code']), (400, 'invalid_ids'))
+
+    def test_counts_are_served_from_the_cache(self):
+        self.seats()
+        with self.assertNumQueries(0):
+            self.seats()
+        with self.settings(EVENT_SEATS_CACHE_SECONDS=0), self.assertNumQueries(2):
+            self.seats()
+
+    def test_enrollment_changes_refresh_the_cached_counts(self):
+        event = self.events[0]
+        self.assertEqual(self.seats()[event.pk], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment_id = self.client.post('/api/enrollments/', {'event': event.pk}).data['id']
+        self.assertEqual(self.seats()[event.pk], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/enrollments/{enrollment_id}/')
+        self.assertEqual(self.seats()[event.pk], 3)
+
+    def test_capacity_edits_refresh_the_cached_counts(self):
+        event = self.events[0]
+        self.seats()
+        event.capacity = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertEqual(self.seats()[event.pk], 1)
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(self.facilitator, capacity=10)
+
+    def enroll(self, key, client=None, **data):
+        return (client or self.client).post(
+            '/api/enrollments/', {'event': self.event.pk, **data}, HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_repeated_key_replays_the_first_response(self):
+        first = self.enroll('retry-1')
+        second = self.enroll('retry-1')
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Enrollment.objects.filter(event=self.event).count(), 1)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.enroll('retry-1')
+        response = self.enroll('retry-1', allow_conflicts='true')
+        self.assertEqual((response.status_code, response.data['code']), (422, 'idempotency_key_reused'))
+
+    def test_keys_are_scoped_to_the_user(self):
+        self.enroll('retry-1')
+        other = APIClient()
+        other.force_authenticate(make_user('other@example.com'))
+        response = self.enroll('retry-1', client=other)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Enrollment.objects.filter(event=self.event).count(), 2)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_key_in_flight_answers_409(self):
+        # Another request holds the key's lock
+        with mock.patch.object(cache, 'add', return_value=False):
+            response = self.enroll('retry-1')
+        self.assertEqual((response.status_code, response.data['code']), (409, 'idempotency_in_progress'))
+        self.assertFalse(Enrollment.objects.exists())
+
+
+class QueryCountTests(APITestCase):
+    """Hot endpoints run a fixed number of queries however many rows they return (see QUERY_BUDGETS)."""
+
+    def setUp(self):
+        super().setUp()
+        others = [make_user(f'other{i}@example.com') for i in range(3)]
+        self.upcoming = [
+            make_event(self.facilitator, f'Upcoming {i}', starts_in=timedelta(days=i + 1), capacity=10)
+            for i in range(5)
+        ]
+        past = [make_event(self.facilitator, f'Past {i}', starts_in=-timedelta(days=i + 1)) for i in range(3)]
+        self.enrollments = [
+            Enrollment.objects.create(event=event, seeker=self.seeker) for event in self.upcoming + past
+        ]
+        for seeker in others:
+            for event in self.upcoming:
+                Enrollment.objects.create(event=event, seeker=seeker)
+
+    def assertQueries(self, path, count):
+        with self.assertNumQueries(count):
+            self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_event_list_and_detail(self):
+        self.assertQueries('/api/events/', 3)
+        self.assertQueries(f'/api/events/{self.upcoming[0].pk}/', 3)
+
+    def test_enrollment_lists_and_detail(self):
+        self.assertQueries('/api/enrollments/', 2)
+        self.assertQueries('/api/enrollments/upcoming/', 2)
+        self.assertQueries('/api/enrollments/past/', 2)
+        self.assertQueries(f'/api/enrollments/{self.enrollments[0].pk}/', 1)
+
+    def test_seats_and_calendar(self):
+        ids = ','.join(str(event.pk) for event in self.upcoming)
+        self.assertQueries(f'/api/events/seats/?ids={ids}', 2)
+        self.assertQueries('/api/events/calendar/', 1)
+
+
+@override_settings(ENROLLMENT_SHARDS=['shard0', 'shard1'])
+class ShardRoutingTests(SimpleTestCase):
+    def test_events_spread_over_every_shard_and_stay_put(self):
+        shards = {event_id: shard_for_event(event_id) for event_id in range(1, 101)}
+        self.assertEqual(set(shards.values()), {'shard0', 'shard1'})
+        self.assertEqual(shards, {event_id: shard_for_event(event_id) for event_id in range(1, 101)})
+
+    def test_group_by_shard_keeps_every_event_once(self):
+        groups = group_by_shard(range(1, 21))
+        self.assertEqual(sorted(event_id for ids in groups.values() for event_id in ids), list(range(1, 21)))
+        for alias, event_ids in groups.items():
+            self.assertTrue(all(shard_for_event(event_id) == alias for event_id in event_ids))
+
+    def test_enrollment_ids_name_their_shard(self):
+        self.assertEqual(shard_for_enrollment(SHARD_ID_SPAN + 7), 'shard0')
+        self.assertEqual(shard_for_enrollment(2 * SHARD_ID_SPAN + 7), 'shard1')
+        # Ids from before sharding (or from an unknown block) stay in default
+        self.assertEqual(shard_for_enrollment(7), 'default')
+        self.assertEqual(shard_for_enrollment(3 * SHARD_ID_SPAN), 'default')
+
+    @override_settings(ENROLLMENT_SHARDS=[])
+    def test_unsharded_everything_is_default(self):
+        self.assertEqual(shard_for_event(1), 'default')
+        self.assertEqual(shard_for_enrollment(SHARD_ID_SPAN + 7), 'default')
+        self.assertEqual(fan_out(lambda alias: alias), ['default'])
+
+    def test_router_sends_enrollments_to_their_event_shard(self):
+        router = EnrollmentShardRouter()
+        event = Event(pk=5)
+        enrollment = Enrollment(event_id=5)
+        self.assertEqual(router.db_for_write(Enrollment, instance=enrollment), shard_for_event(5))
+        self.assertEqual(router.db_for_read(Enrollment, instance=event), shard_for_event(5))
+        self.assertEqual(router.db_for_write(Event, instance=event), 'default')
+        notification = Notification(enrollment_id=2 * SHARD_ID_SPAN + 1)
+        self.assertEqual(router.db_for_read(Enrollment, instance=notification), 'shard1')
+
+    def test_fan_out_runs_every_shard_in_order_with_the_callers_context(self):
+        request_id = contextvars.ContextVar('request_id')
+        request_id.set('abc')
+        self.assertEqual(fan_out(lambda alias: (alias, request_id.get())), [('shard0', 'abc'), ('shard1', 'abc')])
+        self.assertEqual(fan_out(lambda alias: alias, ['shard1']), ['shard1'])
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.facilitator = make_user('host@example.com', role='Facilitator')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'Str0ng-pass!'))
+        self.upcoming = make_event(self.facilitator, 'Upcoming', language='English')
+        self.ongoing = make_event(self.facilitator, 'Ongoing', starts_in=-timedelta(hours=1), language='German')
+        self.past = make_event(self.facilitator, 'Past', starts_in=-timedelta(days=1), language='English')
+        Enrollment.objects.create(event=self.upcoming, seeker=make_user('seeker@example.com'))
+
+    def changelist(self, query=''):
+        response = self.client.get(f'/admin/events/event/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_unfiltered_count_uses_the_estimate_above_the_limit(self):
+        events = Event.objects.order_by('id')
+        with mock.patch('events.admin.estimated_row_count', return_value=50) as estimate:
+            with self.settings(ADMIN_EXACT_COUNT_LIMIT=10):
+                self.assertEqual(EstimatedCountPaginator(events, 20).count, 50)
+            # Small tables are counted exactly
+            with self.settings(ADMIN_EXACT_COUNT_LIMIT=100):
+                self.assertEqual(EstimatedCountPaginator(events, 20).count, 3)
+        estimate.assert_called_with(Event, 'default')
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'rowid estimate')
+    def test_sqlite_estimate_spans_the_id_range(self):
+        make_event(self.facilitator, 'Extra').delete()
+        make_event(self.facilitator, 'Last')
+        self.assertEqual(estimated_row_count(Event), 5)
+
+    def test_filtered_count_stops_at_the_limit(self):
+        events = Event.objects.filter(language='English').order_by('id')
+        with self.settings(ADMIN_EXACT_COUNT_LIMIT=1):
+            self.assertEqual(EstimatedCountPaginator(events, 20).count, 1)
+        self.assertEqual(EstimatedCountPaginator(events, 20).count, 2)
+
+    def test_starts_filter(self):
+        for when, event in (('upcoming', self.upcoming), ('ongoing', self.ongoing), ('past', self.past)):
+            self.assertEqual(list(self.changelist(f'?when={when}').result_list), [event])
+
+    def test_language_filter_choices_are_cached(self):
+        cl = self.changelist('?language=German')
+        self.assertEqual(list(cl.result_list), [self.ongoing])
+        make_event(self.facilitator, 'Later', language='French')
+        language_filter = self.changelist().filter_specs[1]
+        self.assertEqual([title for _, title in language_filter.lookup_choices], ['English', 'German'])
+
+    def test_enrollment_totals_are_counted_for_the_page(self):
+        # Session, user, languages, estimate, capped count, page, then one grouped enrollment count
+        with self.assertNumQueries(7):
+            cl = self.changelist()
+        self.assertEqual({event.title: event.enrolled_count for event in cl.result_list}, {
+            'Upcoming': 1, 'Ongoing': 0, 'Past': 0,
+        })
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, record):
+        self.spans.append(record)
+
+
+@override_settings(TRACING_SAMPLE_RATE=1.0)
+class TracingTests(APITestCase):
+    TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+    PARENT_ID = '00f067aa0ba902b7'
+
+    def setUp(self):
+        super().setUp()
+        self.exporter = ListExporter()
+        exporter = mock.patch.object(tracing, '_exporter', self.exporter)
+        exporter.start()
+        self.addCleanup(exporter.stop)
+        connection.execute_wrappers.append(tracing.trace_query)
+        self.addCleanup(connection.execute_wrappers.remove, tracing.trace_query)
+
+    def traceparent(self, flags='01'):
+        return f'00-{self.TRACE_ID}-{self.PARENT_ID}-{flags}'
+
+    def test_request_continues_the_incoming_trace_and_times_its_queries(self):
+        response = self.client.get('/api/events/', HTTP_TRACEPARENT=self.traceparent())
+        request_span = next(span for span in self.exporter.spans if span['name'].startswith('GET '))
+        self.assertEqual(request_span['attributes']['http.path'], '/api/events/')
+        self.assertEqual((request_span['trace_id'], request_span['parent_id']), (self.TRACE_ID, self.PARENT_ID))
+        self.assertEqual(request_span['attributes']['http.status_code'], 200)
+        self.assertEqual(response['traceparent'], f"00-{self.TRACE_ID}-{request_span['span_id']}-01")
+
+        queries = [span for span in self.exporter.spans if span['name'] == 'db.query']
+        self.assertTrue(queries)
+        self.assertEqual({span['parent_id'] for span in queries}, {request_span['span_id']})
+        self.assertTrue(all(span['trace_id'] == self.TRACE_ID for span in queries))
+
+    def test_unsampled_incoming_trace_records_nothing(self):
+        response = self.client.get('/api/events/', HTTP_TRACEPARENT=self.traceparent('00'))
+        self.assertEqual(self.exporter.spans, [])
+        self.assertNotIn('traceparent', response)
+
+    def test_queued_tasks_carry_the_current_trace(self):
+        headers = {}
+        tracing.inject_task_headers(headers=headers)
+        self.assertEqual(headers, {})
+
+        request_span, token = tracing.start_span('request', traceparent=self.traceparent())
+        tracing.inject_task_headers(headers=headers)
+        tracing.end_span(request_span, token)
+        self.assertEqual(headers, {'traceparent': request_span.traceparent})
+
+    def test_task_joins_the_trace_that_queued_it(self):
+        task_prerun.connect(tracing.start_task_span, dispatch_uid='test.start_task_span')
+        task_postrun.connect(tracing.end_task_span, dispatch_uid='test.end_task_span')
+        self.addCleanup(task_prerun.disconnect, dispatch_uid='test.start_task_span')
+        self.addCleanup(task_postrun.disconnect, dispatch_uid='test.end_task_span')
+
+        prune_tombstones.apply(headers={'traceparent': self.traceparent()})
+        task_span = next(span for span in self.exporter.spans if span['name'].startswith('task '))
+        self.assertEqual(task_span['name'], 'task events.tasks.prune_tombstones')
+        self.assertEqual((task_span['trace_id'], task_span['parent_id']), (self.TRACE_ID, self.PARENT_ID))
+        self.assertEqual(task_span['attributes']['celery.state'], 'SUCCESS')
+        queries = [span for span in self.exporter.spans if span['name'] == 'db.query']
+        self.assertEqual({span['parent_id'] for span in queries}, {task_span['span_id']})
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, EMAIL_RETRY_BACKOFF_SECONDS=0)
+class EventChangeNoticeTests(TestCase):
+    def setUp(self):
+        self.event = make_event(make_user('host@example.com', role='Facilitator'), location='Berlin')
+        self.seekers = [make_user(f'seeker{i}@example.com') for i in range(3)]
+        for seeker in self.seekers:
+            Enrollment.objects.create(event=self.event, seeker=seeker)
+        Enrollment.objects.create(event=self.event, seeker=make_user('gone@example.com'), status='canceled')
+
+    def move(self):
+        changed_at = timezone.now()
+        EventChange.objects.create(
+            event=self.event, previous_starts_at=self.event.starts_at, previous_location='Paris', changed_at=changed_at
+        )
+        return changed_at.isoformat()
+
+    @override_settings(EVENT_CHANGE_BATCH_SIZE=2)
+    def test_enrollees_are_notified_in_batches(self):
+        with mock.patch.object(send_event_change_batch, 'delay', wraps=send_event_change_batch.delay) as delay:
+            notify_event_change(self.event.pk, self.move())
+        self.assertEqual(
+            [call.args[1] for call in delay.call_args_list], [[s.id for s in self.seekers[:2]], [self.seekers[2].id]]
+        )
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [s.email for s in self.seekers])
+        self.assertIn('Paris', mail.outbox[0].body)
+        self.assertFalse(EventChange.objects.exists())
+
+    def test_stale_notice_of_a_burst_sends_nothing(self):
+        self.move()
+        notify_event_change(self.event.pk, (timezone.now() - timedelta(minutes=1)).isoformat())
+        self.assertEqual(mail.outbox, [])
+
+    def fail_once_for(self, email):
+        send_messages, failed = LocmemBackend.send_messages, []
+
+        def flaky(backend, messages):
+            if messages[0].to == [email] and not failed:
+                failed.append(email)
+                raise ConnectionError('connection reset')
+            return send_messages(backend, messages)
+        return mock.patch.object(LocmemBackend, 'send_messages', flaky)
+
+    def test_failed_send_retries_only_the_unsent_recipients(self):
+        seeker_ids = [seeker.id for seeker in self.seekers]
+        with self.fail_once_for(self.seekers[1].email), self.assertLogs('events.tasks', 'WARNING'):
+            send_event_change_batch.apply(args=(self.event.pk, seeker_ids, self.event.starts_at.isoformat(), 'Paris'))
+        # The first seeker was reached before the failure and is not mailed again
+        self.assertEqual([message.to[0] for message in mail.outbox], [s.email for s in self.seekers])
+
+    @override_settings(EMAIL_MAX_RETRIES=0)
+    def test_batch_gives_up_after_the_last_retry(self):
+        seeker_ids = [seeker.id for seeker in self.seekers]
+        with self.fail_once_for(self.seekers[1].email), self.assertLogs('events.tasks', 'WARNING'):
+            result = send_event_change_batch.apply(args=(self.event.pk, seeker_ids, self.event.starts_at.isoformat(), 'Paris'))
+        self.assertEqual(result.state, 'FAILURE')
+        self.assertEqual([message.to[0] for message in mail.outbox], [self.seekers[0].email])
+
+
+class ArchiveTests(APITestCase):
+    def test_archiving_cleans_up_dependents_and_keeps_analytics(self):
+        event = make_event(self.facilitator, starts_in=-timedelta(days=400), capacity=4)
+        enrollment = Enrollment.objects.create(event=event, seeker=self.seeker)
+        Recommendation.objects.create(seeker=self.seeker, event=event, rank=1, score=1.0, computed_at=timezone.now())
+        EventChange.objects.create(
+            event=event, previous_starts_at=event.starts_at, previous_location='Paris', changed_at=timezone.now()
+        )
+        before = self.as_facilitator().get('/api/events/analytics/').data
+
+        self.assertEqual(archive_past_events(), 1)
+
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(Recommendation.objects.exists())
+        self.assertFalse(EventChange.objects.exists())
+        self.assertFalse(EventDailyRollup.objects.exists())
+        self.assertEqual(ArchivedEventDailyRollup.objects.get(event_id=event.pk).enrolled, 1)
+        self.assertEqual(
+            set(Tombstone.objects.values_list('kind', 'object_id', 'owner_id')),
+            {('event', event.pk, self.facilitator.pk), ('enrollment', enrollment.pk, self.seeker.pk)},
+        )
+
+        after = self.as_facilitator().get('/api/events/analytics/').data
+        self.assertEqual(after['totals'], before['totals'])
+        self.assertEqual(after['trend'], before['trend'])
+        self.assertEqual(after['events'], [])
+
+    @unittest.skipIf(pyarrow is None, 'the export needs pyarrow')
+    @override_settings(ANALYTICS_EXPORT_LAG_SECONDS=0)
+    def test_export_tells_archived_rows_from_deleted_ones(self):
+        archived = make_event(self.facilitator, starts_in=-timedelta(days=400))
+        enrollment = Enrollment.objects.create(event=archived, seeker=self.seeker)
+        deleted = make_event(self.facilitator)
+        deleted_id = deleted.pk
+        archive_past_events()
+        deleted.delete()
+
+        with tempfile.TemporaryDirectory() as directory:
+            export_analytics(tables=['tombstones'], directory=directory, fmt='parquet')
+            path, = Path(directory, 'tombstones').iterdir()
+            rows = pyarrow.parquet.read_table(path).select(['kind', 'object_id', 'reason']).to_pylist()
+        self.assertCountEqual(
+            [tuple(row.values()) for row in rows],
+            [('event', archived.pk, 'archived'), ('enrollment', enrollment.pk, 'archived'), ('event', deleted_id, 'deleted')],
+        )
+
+
+class ArchiveChunkTests(TransactionTestCase):
+    """Archive chunks commit on their own, so these run outside a test transaction."""
+
+    def test_enrollments_written_mid_archive_are_archived_not_lost(self):
+        event = make_event(make_user('host@example.com', role='Facilitator'), starts_in=-timedelta(days=400))
+        for i in range(5):
+            Enrollment.objects.create(event=event, seeker=make_user(f'seeker{i}@example.com'))
+        delete_where_in = archive.delete_where_in
+        late = []
+
+        def delete_and_enroll(model, field, values, **kwargs):
+            # Between a chunk's copy and its delete, another seeker enrolls
+            if model is Enrollment and not late:
+                late.append(Enrollment.objects.create(event=event, seeker=make_user('late@example.com')))
+            return delete_where_in(model, field, values, **kwargs)
+
+        with mock.patch('events.archive.delete_where_in', delete_and_enroll):
+            self.assertEqual(archive_events([event.pk], chunk_size=2), 1)
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertEqual(ArchivedEnrollment.objects.filter(event_id=event.pk).count(), 6)
+        self.assertTrue(ArchivedEnrollment.objects.filter(pk=late[0].pk).exists())
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class ChangefeedTests(APITestCase):
+    def sync(self, token=None, **params):
+        if token:
+            params['token'] = token
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages_follow_the_cursor_without_gaps_or_repeats(self):
+        now = timezone.now()
+        events = [make_event(self.facilitator, title=f'Event {i}') for i in range(5)]
+        # Two rows share a timestamp, so the id breaks the tie
+        for i, event in enumerate(events):
+            Event.objects.filter(pk=event.pk).update(updated_at=now - timedelta(minutes=10 - min(i, 3)))
+
+        seen, token = [], None
+        while True:
+            page = self.sync(token, limit=2)
+            seen += [row['id'] for row in page['events']]
+            token = page['token']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, [event.pk for event in events])
+        self.assertEqual(self.sync(token)['events'], [])
+
+    def test_rows_inside_the_lag_wait_for_a_later_sync(self):
+        event = make_event(self.facilitator)
+        with override_settings(SYNC_LAG_SECONDS=60):
+            page = self.sync()
+        self.assertEqual(page['events'], [])
+        self.assertEqual([row['id'] for row in self.sync(page['token'])['events']], [event.pk])
+
+    def test_enrollment_changes_send_seats_without_touching_the_event(self):
+        event = make_event(self.facilitator, capacity=3)
+        Event.objects.filter(pk=event.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        token = self.sync()['token']
+        updated_at = Event.objects.get(pk=event.pk).updated_at
+
+        # Commit hooks refresh the cached seat counts
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment_id = self.client.post('/api/enrollments/', {'event': event.pk}).data['id']
+        page = self.sync(token)
+        self.assertEqual(page['events'], [])
+        self.assertEqual([(row['event'], row['available_seats']) for row in page['seats']], [(event.pk, 2)])
+        self.assertEqual([row['id'] for row in page['enrollments']], [enrollment_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/enrollments/{enrollment_id}/')
+        page = self.sync(page['token'])
+        self.assertEqual([(row['event'], row['available_seats']) for row in page['seats']], [(event.pk, 3)])
+        self.assertEqual(page['deleted']['enrollments'], [enrollment_id])
+        self.assertEqual(Event.objects.get(pk=event.pk).updated_at, updated_at)
+        self.assertEqual(self.sync(page['token'])['seats'], [])
+
+    def test_first_sync_starts_seats_at_its_own_time(self):
+        event = make_event(self.facilitator, capacity=3)
+        Enrollment.objects.create(event=event, seeker=make_user('other@example.com'))
+        page = self.sync()
+        self.assertEqual(page['seats'], [])
+        self.assertEqual([(row['id'], row['available_seats']) for row in page['events']], [(event.pk, 2)])
+
+    def test_tampered_or_expired_tokens_are_rejected(self):
+        token = self.sync()['token']
+        response = self.client.get('/api/sync/', {'token': token[:-2] + 'xx'})
+        self.assertEqual((response.status_code, response.data['code']), (400, 'invalid_sync_token'))
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=-1):
+            response = self.client.get('/api/sync/', {'token': token})
+        self.assertEqual((response.status_code, response.data['code']), (410, 'sync_token_expired'))
+
+    def test_token_of_another_user_is_rejected(self):
+        token = self.sync()['token']
+        response = self.as_facilitator().get('/api/sync/', {'token': token})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['code'], 'invalid_sync_token')
+
+
+@mock.patch.object(pubsub, '_pubsub', None)
+@override_settings(PUBSUB_BACKEND='events_platform.pubsub.InProcessPubSub')
+class SeatStreamTests(TestCase):
+    def setUp(self):
+        self.seeker = make_user('seeker@example.com')
+        self.event = make_event(make_user('host@example.com', role='Facilitator'), capacity=5)
+
+    async def open_stream(self, token):
+        """Start a stream request; returns (response messages, disconnect, finished task)."""
+        sent, disconnected = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'headers': [],
+            'path': f'/api/events/{self.event.pk}/seats/stream/', 'query_string': f'token={token}'.encode(),
+        }
+        task = asyncio.ensure_future(application(scope, receive, sent.put))
+        return sent, disconnected, task
+
+    async def next_message(self, sent):
+        return await asyncio.wait_for(sent.get(), timeout=5)
+
+    async def test_seat_changes_reach_the_stream(self):
+        sent, disconnected, task = await self.open_stream(str(AccessToken.for_user(self.seeker)))
+        self.assertEqual((await self.next_message(sent))['status'], 200)
+        self.assertIn(b'"available_seats": 5', (await self.next_message(sent))['body'])
+
+        await sync_to_async(Enrollment.objects.create)(event=self.event, seeker=self.seeker)
+        await sync_to_async(publish_seats)(self.event.pk)
+        body = (await self.next_message(sent))['body']
+        self.assertTrue(body.startswith(b'event: seats\n'))
+        self.assertIn(b'"available_seats": 4', body)
+
+        disconnected.set()
+        await asyncio.wait_for(task, timeout=5)
+        self.assertFalse(pubsub.get_pubsub()._subscribers)
+
+    async def test_missing_or_bad_tokens_are_rejected(self):
+        for token in ('', 'not-a-jwt'):
+            sent, _, task = await self.open_stream(token)
+            await asyncio.wait_for(task, timeout=5)
+            self.assertEqual((await self.next_message(sent))['status'], 401)
+            self.assertEqual(json.loads((await self.next_message(sent))['body'])['code'], 'not_authenticated')
+
+
+class RedisListenerTests(SimpleTestCase):
+    class Stop(BaseException):
+        pass
+
+    def test_listener_resubscribes_after_losing_redis(self):
+        import redis
+
+        def dropped():
+            raise redis.ConnectionError('connection reset')
+            yield
+
+        def one_message():
+            yield {'channel': b'pubsub:seats.1', 'data': b'not json'}
+            yield {'channel': b'pubsub:seats.1', 'data': b'{"available_seats": 3}'}
+            raise redis.ConnectionError('connection reset')
+
+        backend = pubsub.RedisPubSub(url='redis://localhost:6379/15')
+        backend._client = mock.Mock()
+        backend._client.pubsub.return_value.listen.side_effect = [dropped(), one_message()]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise self.Stop
+
+        with mock.patch.object(backend, 'dispatch') as dispatch, mock.patch('events_platform.pubsub.time.sleep', sleep):
+            with self.assertRaises(self.Stop), self.assertLogs('events_platform.pubsub', 'WARNING'):
+                backend._listen()
+        dispatch.assert_called_once_with('seats.1', {'available_seats': 3})
+        # A successful resubscribe resets the backoff
+        self.assertEqual(sleeps, [pubsub.RECONNECT_MIN_SECONDS, pubsub.RECONNECT_MIN_SECONDS])
+
+
+class RecommendationTests(TestCase):
+    def test_events_shared_with_similar_seekers_are_recommended(self):
+        facilitator = make_user('host@example.com', role='Facilitator')
+        seeker, other = make_user('seeker@example.com'), make_user('other@example.com')
+        shared, suggested, skipped = (make_event(facilitator, title=title) for title in ('Shared', 'Suggested', 'Skipped'))
+        Enrollment.objects.create(event=shared, seeker=seeker)
+        Enrollment.objects.create(event=shared, seeker=other)
+        Enrollment.objects.create(event=suggested, seeker=other)
+        Enrollment.objects.create(event=skipped, seeker=other, status='canceled')
+
+        with mock.patch('events.recommendations.HISTORY_CHUNK_SIZE', 1):
+            compute_recommendations()
+        recommended = set(Recommendation.objects.filter(seeker=seeker).values_list('event_id', flat=True))
+        self.assertIn(suggested.id, recommended)
+        self.assertNotIn(shared.id, recommended)
+
+
+class QueryBudgetCheckTests(TestCase):
+    def check(self):
+        out = StringIO()
+        call_command('check_query_counts', small=1, large=3, stdout=out)
+        return out.getvalue()
+
+    def test_current_endpoints_pass(self):
+        self.assertIn('All endpoints within query budget', self.check())
+
+    @mock.patch.object(check_query_counts, 'TASK_BUDGETS', [])
+    @mock.patch.object(check_query_counts, 'QUERY_BUDGETS', [('seeker', '/api/events/', 1)])
+    def test_endpoint_over_budget_fails(self):
+        with self.assertRaisesMessage(CommandError, 'seeker /api/events/: over budget (1)'):
+            self.check()
+
+    @mock.patch.object(check_query_counts, 'TASK_BUDGETS', [])
+    @mock.patch.object(check_query_counts, 'QUERY_BUDGETS', [('seeker', '/n-plus-one/', 100)])
+    def test_query_count_growing_with_history_fails(self):
+        def workload(history):
+            yield 'n+1', lambda: [Event.objects.filter(pk=i).exists() for i in range(history)]
+
+        with mock.patch.object(check_query_counts, 'workload', workload):
+            with self.assertRaisesMessage(CommandError, 'grows with history (1 -> 3)'):
+                self.check()
+
+    def test_full_scans_of_hot_tables_are_reported(self):
+        table = Event._meta.db_table
+        self.assertEqual(
+            check_query_counts.full_scans(f'SELECT "id" FROM "{table}" WHERE "description" = %s', ['x']), {table}
+        )
+        self.assertEqual(check_query_counts.full_scans(f'SELECT "id" FROM "{table}" WHERE "id" = %s', [1]), set())
+        self.assertEqual(check_query_counts.full_scans(f'DELETE FROM "{table}"', []), set())
+
+
+class QueryShapeCaptureTests(TestCase):
+    def test_only_choices_and_boolean_values_are_sampled(self):
+        recorder = ShapeRecorder()
+        with connection.execute_wrapper(recorder):
+            EmailOTP.objects.filter(email='seeker@example.com', otp='123456', is_used=False).first()
+            list(Enrollment.objects.filter(status='enrolled', seeker_id=42))
+
+        captured = json.dumps(recorder.ranked())
+        self.assertNotIn('seeker@example.com', captured)
+        self.assertNotIn('123456', captured)
+        enrollment_samples = next(
+            entry['samples'] for entry in recorder.ranked() if 'events_enrollment' in entry['shape']
+        )
+        self.assertEqual(sorted(enrollment_samples, key=bool), [None, ['enrolled']])
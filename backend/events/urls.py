@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EventViewSet, EnrollmentViewSet
+from .views import EventViewSet, EnrollmentViewSet, changefeed
 
 router = DefaultRouter()
 router.register(r'events', EventViewSet, basename='event')
 router.register(r'enrollments', EnrollmentViewSet, basename='enrollment')
 
 urlpatterns = [
+    path('sync/', changefeed, name='changefeed'),
     path('', include(router.urls)),
 ]
 
@@ -1,28 +1,111 @@
 from rest_framework import viewsets, status, generics
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q, Count, Sum
 from django.utils import timezone
-from .models import Event, Enrollment
-from .serializers import EventSerializer, EventListSerializer, EnrollmentSerializer
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import timedelta
+from operator import itemgetter
+from .models import (
+    Event, Enrollment, EventDailyRollup, Notification, Tombstone,
+    ArchivedEnrollment, ArchivedEvent, ArchivedEventDailyRollup,
+)
+from .calendar_summary import SPLITS, month_summary
+from .deletion import delete_event
+from .streams import cached_seat_payloads
+from .sharding import enrollment_values, is_sharded, shard_for_enrollment
+from .serializers import (
+    EventSerializer, EventListSerializer, EnrollmentSerializer,
+    EventListValuesSerializer, EnrollmentValuesSerializer,
+)
 from accounts.permissions import IsVerified, IsSeeker, IsFacilitator, IsEventOwner
+from events_platform.renderers import ORJSONRenderer
+from events_platform.idempotency import idempotent
+from events_platform.throttling import EnrollThrottle, ThrottleFirstMixin
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class SparseFieldsetMixin:
+    """Let read requests choose their output fields with ?fields= and ?omit=."""
+
+    def get_sparse_fields(self, available):
+        """Return the selected subset of `available`, or None to render everything."""
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        fields = self.request.query_params.get('fields')
+        omit = self.request.query_params.get('omit')
+        if not fields and not omit:
+            return None
+
+        selected = set(available)
+        if fields:
+            selected &= {name.strip() for name in fields.split(',')}
+        if omit:
+            selected -= {name.strip() for name in omit.split(',')}
+        return selected
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields(self.get_serializer_class().Meta.fields)
+        return context
+
+    def apply_sparse_fields(self, queryset, serializer):
+        """Push the selected fields down into `.only()`."""
+        if serializer.context.get('sparse_fields') is None:
+            return queryset
+        lookups, relations = serializer.get_only_fields()
+        return queryset.select_related(None).select_related(*relations).only(*lookups)
+
+
+class ValuesListMixin:
+    """Serve read-only list actions from `.values()` rows rendered with orjson."""
+    values_actions = ()
+    values_serializer_class = None
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action in self.values_actions:
+            renderers = [
+                ORJSONRenderer() if type(renderer) is JSONRenderer else renderer
+                for renderer in renderers
+            ]
+        return renderers
+
+    def values_response(self, queryset, rows=None):
+        """Paginate and serialize a queryset (or prepared `.values()` rows) with the values serializer."""
+        serializer_class = self.values_serializer_class
+        context = self.get_serializer_context()
+        if rows is None:
+            rows = serializer_class.get_values(queryset, context.get('sparse_fields'))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            serializer = serializer_class(page, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        serializer = serializer_class(rows, many=True, context=context)
+        return Response(serializer.data)
+
+
+class EventViewSet(SparseFieldsetMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for Event CRUD operations."""
     queryset = Event.objects.all()
     permission_classes = [IsAuthenticated, IsVerified]
+    values_actions = ('list', 'recommended')
+    values_serializer_class = EventListValuesSerializer
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in self.values_actions:
             return EventListSerializer
         return EventSerializer
 
     def get_permissions(self):
         """Set permissions based on action."""
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'analytics']:
             return [IsAuthenticated(), IsVerified(), IsFacilitator()]
+        if self.action == 'recommended':
+            return [IsAuthenticated(), IsVerified(), IsSeeker()]
         return super().get_permissions()
 
     def get_queryset(self):
@@ -66,12 +149,31 @@ class EventViewSet(viewsets.ModelViewSet):
             # Order by upcoming first
             queryset = queryset.order_by('starts_at')
 
+        if self.action not in self.values_actions:
+            queryset = queryset.select_related('created_by')
+        if self.action == 'retrieve':
+            queryset = self.apply_sparse_fields(queryset, self.get_serializer())
+
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """List events through the values fast path."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.values_response(queryset)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """Create an event, replaying the first response for a repeated Idempotency-Key."""
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Set created_by to current user."""
         serializer.save(created_by=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete enrollments in chunks before the event, instead of through the cascade collector."""
+        delete_event(instance)
+
     def get_object(self):
         """Override to check ownership for update/delete."""
         obj = super().get_object()
@@ -91,19 +193,181 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        context = self.get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields(EnrollmentSerializer.Meta.fields)
         enrollments = event.enrollments.filter(status='enrolled')
-        serializer = EnrollmentSerializer(enrollments, many=True)
+        if is_sharded():
+            # The event's shard cannot join to events or users
+            enrollments = enrollments.prefetch_related('event', 'seeker')
+        else:
+            enrollments = self.apply_sparse_fields(
+                enrollments.select_related('event', 'seeker'),
+                EnrollmentSerializer(context=context)
+            )
+        serializer = EnrollmentSerializer(enrollments, many=True, context=context)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """Upcoming events picked for the seeker by the nightly recommendations batch."""
+        queryset = Event.objects.filter(
+            recommendations__seeker=request.user,
+            starts_at__gt=timezone.now()
+        ).order_by('recommendations__rank')
+        return self.values_response(queryset)
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Enrollment totals, fill rates and daily trend across the facilitator's events."""
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+
+        rollups = EventDailyRollup.objects.filter(event__created_by=request.user)
+        archived_rollups = ArchivedEventDailyRollup.objects.filter(event__created_by=request.user)
+        per_event = {
+            row['event_id']: row
+            for row in rollups.values('event_id').annotate(
+                enrolled=Sum('enrolled'), canceled=Sum('canceled')
+            ).order_by()
+        }
+        # Archived events keep counting towards the trend and the totals
+        trend = {}
+        for queryset in (rollups, archived_rollups):
+            for row in queryset.filter(day__gte=since).values('day').annotate(
+                enrolled=Sum('enrolled'), canceled=Sum('canceled')
+            ).order_by('day'):
+                day = trend.setdefault(row['day'], {'day': row['day'], 'enrolled': 0, 'canceled': 0})
+                day['enrolled'] += row['enrolled']
+                day['canceled'] += row['canceled']
+
+        totals = {'events': 0, 'enrolled': 0, 'canceled': 0, 'capacity': 0, 'seats_filled': 0}
+
+        def add_to_totals(capacity, enrolled, canceled):
+            totals['events'] += 1
+            totals['enrolled'] += enrolled
+            totals['canceled'] += canceled
+            if capacity:
+                totals['capacity'] += capacity
+                totals['seats_filled'] += enrolled - canceled
+
+        events = []
+        for event in Event.objects.filter(created_by=request.user).values('id', 'title', 'starts_at', 'capacity'):
+            sums = per_event.get(event['id'], {})
+            enrolled = sums.get('enrolled') or 0
+            canceled = sums.get('canceled') or 0
+            current = enrolled - canceled
+            capacity = event['capacity']
+            add_to_totals(capacity, enrolled, canceled)
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+            events.append({
+                **event,
+                'enrolled': enrolled,
+                'canceled': canceled,
+                'current_enrollments': current,
+                'fill_rate': round(current / capacity, 4) if capacity else None,
+            })
+        for event in ArchivedEvent.objects.filter(created_by=request.user).values('id', 'capacity').annotate(
+            enrolled=Sum('daily_rollups__enrolled'), canceled=Sum('daily_rollups__canceled')
+        ).order_by():
+            add_to_totals(event['capacity'], event['enrolled'] or 0, event['canceled'] or 0)
+
+        totals['fill_rate'] = round(totals['seats_filled'] / totals['capacity'], 4) if totals['capacity'] else None
+        return Response({
+            'days': days,
+            'totals': totals,
+            'trend': [trend[day] for day in sorted(trend)],
+            'events': events,
+        })
+
+    @action(detail=False, methods=['get'])
+    def seats(self, request):
+        """Capacity and seat counts for many events at once, in the order of ?ids=1,2,3."""
+        try:
+            event_ids = list(dict.fromkeys(
+                int(event_id) for event_id in request.query_params.get('ids', '').split(',') if event_id.strip()
+            ))
+        except ValueError:
+            event_ids = None
+        if not event_ids or len(event_ids) > settings.EVENT_SEATS_MAX_IDS:
+            return Response(
+                {
+                    'detail': f'ids must be a comma-separated list of 1 to {settings.EVENT_SEATS_MAX_IDS} event ids.',
+                    'code': 'invalid_ids'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        payloads = cached_seat_payloads(event_ids)
+        return Response({'results': [payloads[event_id] for event_id in event_ids if event_id in payloads]})
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Event counts and remaining seats per day of a month, optionally split by language or location."""
+        month = request.query_params.get('month')
+        try:
+            month = parse_date(f'{month}-01') if month else timezone.localdate()
+        except ValueError:
+            month = None
+        if month is None:
+            return Response(
+                {'detail': 'month must be YYYY-MM.', 'code': 'invalid_month'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        split = request.query_params.get('split') or None
+        if split is not None and split not in SPLITS:
+            return Response(
+                {'detail': f'split must be one of: {", ".join(SPLITS)}.', 'code': 'invalid_split'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(month_summary(month, split))
+
+
+def _truthy(value):
+    """Whether a JSON or form value means yes."""
+    return value is True or str(value).lower() in ('true', '1', 'yes')
+
+
+def _busy_blocks(intervals):
+    """Merge sorted (event_id, starts_at, ends_at) rows into busy blocks listing their events."""
+    blocks = []
+    for event_id, starts_at, ends_at in intervals:
+        if blocks and starts_at <= blocks[-1]['end']:
+            blocks[-1]['end'] = max(blocks[-1]['end'], ends_at)
+            blocks[-1]['events'].append(event_id)
+        else:
+            blocks.append({'start': starts_at, 'end': ends_at, 'events': [event_id]})
+    return blocks
+
+
+class EnrollmentViewSet(ThrottleFirstMixin, SparseFieldsetMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for Enrollment operations (Seeker only)."""
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated, IsVerified, IsSeeker]
+    values_actions = ('list', 'upcoming', 'past')
+    values_serializer_class = EnrollmentValuesSerializer
+
+    def get_throttles(self):
+        """Only enrolling is rate limited."""
+        if self.action == 'create':
+            return [EnrollThrottle()]
+        return super().get_throttles()
 
     def get_queryset(self):
         """Return enrollments for the current seeker."""
-        return Enrollment.objects.filter(seeker=self.request.user)
+        queryset = Enrollment.objects.filter(seeker=self.request.user)
+        if is_sharded():
+            # Detail lookups go straight to the shard named by the id
+            try:
+                return queryset.using(shard_for_enrollment(self.kwargs.get('pk', 0)))
+            except ValueError:
+                return queryset.none()
+        if self.action not in self.values_actions:
+            queryset = queryset.select_related('event', 'seeker')
+        if self.action == 'retrieve':
+            queryset = self.apply_sparse_fields(queryset, self.get_serializer())
+        return queryset
 
     def get_serializer_context(self):
         """Add context to serializer."""
@@ -115,28 +379,105 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 pass
         return context
 
+    def sharded_rows(self, extra=(), **filters):
+        """The seeker's enrollment rows from every shard, with event and seeker columns merged in."""
+        sparse_fields = self.get_serializer_context().get('sparse_fields')
+        columns = self.values_serializer_class.get_columns(sparse_fields, extra=extra)
+        return enrollment_values(lambda queryset: queryset.filter(seeker=self.request.user, **filters), columns)
+
+    def list(self, request, *args, **kwargs):
+        """List enrollments through the values fast path."""
+        if is_sharded():
+            rows = sorted(self.sharded_rows(extra=('id',)), key=itemgetter('id'))
+            return self.values_response(None, rows=rows)
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        return self.values_response(queryset)
+
     @action(detail=False, methods=['get'])
     def past(self, request):
-        """List past enrollments (events already ended)."""
+        """List past enrollments (events already ended), including archived ones."""
         now = timezone.now()
+        archived = ArchivedEnrollment.objects.filter(seeker=request.user, status='enrolled')
+        sparse_fields = self.get_serializer_context().get('sparse_fields')
+        get_values = self.values_serializer_class.get_values
+
+        if is_sharded():
+            rows = [
+                row for row in self.sharded_rows(extra=('id', 'event__ends_at'), status='enrolled')
+                if row['event__ends_at'] < now
+            ]
+            rows.extend(get_values(archived, sparse_fields, extra=('id', 'event__ends_at')))
+            rows.sort(key=itemgetter('id'))
+            rows.sort(key=itemgetter('event__ends_at'), reverse=True)
+            return self.values_response(None, rows=rows)
+
         enrollments = self.get_queryset().filter(
             event__ends_at__lt=now,
             status='enrolled'
-        )
-        serializer = self.get_serializer(enrollments, many=True)
-        return Response(serializer.data)
+        ).order_by()
+        rows = get_values(enrollments, sparse_fields, extra=('id', 'event__ends_at')).union(
+            get_values(archived, sparse_fields, extra=('id', 'event__ends_at')),
+            all=True
+        ).order_by('-event__ends_at', 'id')
+        return self.values_response(enrollments, rows=rows)
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """List upcoming enrollments."""
         now = timezone.now()
+        if is_sharded():
+            rows = [
+                row for row in self.sharded_rows(extra=('id', 'event__starts_at', 'event__ends_at'), status='enrolled')
+                if row['event__ends_at'] >= now
+            ]
+            rows.sort(key=itemgetter('event__starts_at', 'id'))
+            return self.values_response(None, rows=rows)
+
         enrollments = self.get_queryset().filter(
             event__ends_at__gte=now,
             status='enrolled'
-        ).order_by('event__starts_at')
-        serializer = self.get_serializer(enrollments, many=True)
-        return Response(serializer.data)
+        ).order_by('event__starts_at', 'id')
+        return self.values_response(enrollments)
+
+    @action(detail=False, methods=['get'])
+    def busy(self, request):
+        """Busy blocks and free gaps in the seeker's schedule between ?start= and ?end=."""
+        try:
+            start = parse_datetime(request.query_params.get('start') or timezone.now().isoformat())
+            end = request.query_params.get('end')
+            end = parse_datetime(end) if end else start and start + timedelta(days=settings.FREE_BUSY_DEFAULT_DAYS)
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response(
+                {'detail': 'start and end must be ISO 8601 datetimes.', 'code': 'invalid_range'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+        if not start < end <= start + timedelta(days=settings.FREE_BUSY_MAX_DAYS):
+            return Response(
+                {
+                    'detail': f'end must be after start and at most {settings.FREE_BUSY_MAX_DAYS} days later.',
+                    'code': 'invalid_range'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        busy = _busy_blocks(Enrollment.overlapping(request.user.id, start, end))
+        free = []
+        cursor = start
+        for block in busy:
+            if block['start'] > cursor:
+                free.append({'start': cursor, 'end': block['start']})
+            cursor = max(cursor, block['end'])
+        if cursor < end:
+            free.append({'start': cursor, 'end': end})
+        return Response({'start': start, 'end': end, 'busy': busy, 'free': free})
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Enroll in an event."""
         event_id = request.data.get('event')
@@ -155,41 +496,180 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
             )
 
         # Check if already enrolled
-        existing = Enrollment.objects.filter(event=event, seeker=request.user).first()
-        if existing:
-            if existing.status == 'enrolled':
-                return Response(
-                    {'detail': 'You are already enrolled in this event.', 'code': 'already_enrolled'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            else:
-                # Re-enroll if previously canceled
-                existing.status = 'enrolled'
-                existing.save()
-                
-                # Schedule follow-up email
-                from .tasks import send_followup_email
-                send_followup_email.apply_async((existing.id,), countdown=3600)
-                
-                serializer = self.get_serializer(existing)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-
-        # Check capacity
-        if event.capacity is not None and event.available_seats <= 0:
+        existing = event.enrollments.filter(seeker=request.user).first()
+        if existing and existing.status == 'enrolled':
             return Response(
-                {'detail': 'Event is at full capacity.', 'code': 'capacity_full'},
+                {'detail': 'You are already enrolled in this event.', 'code': 'already_enrolled'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check if event is past
-        if event.is_past:
-            return Response(
-                {'detail': 'Cannot enroll in past events.', 'code': 'past_event'},
-                status=status.HTTP_400_BAD_REQUEST
+        # Only new enrollments are held to seats and start time; re-enrolling never was
+        if not existing:
+            # Check capacity
+            if event.capacity is not None and event.available_seats <= 0:
+                return Response(
+                    {'detail': 'Event is at full capacity.', 'code': 'capacity_full'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Check if event is past
+            if event.is_past:
+                return Response(
+                    {'detail': 'Cannot enroll in past events.', 'code': 'past_event'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Check for overlapping enrollments unless the seeker accepts them
+        if not _truthy(request.data.get('allow_conflicts')):
+            conflicts = [
+                event_id for event_id, _, _ in Enrollment.overlapping(request.user.id, event.starts_at, event.ends_at)
+                if event_id != event.pk
+            ]
+            if conflicts:
+                return Response(
+                    {
+                        'detail': 'This event overlaps events you are already enrolled in.',
+                        'code': 'schedule_conflict',
+                        'conflicts': conflicts,
+                    },
+                    status=status.HTTP_409_CONFLICT
+                )
+
+        if existing:
+            # Re-enroll if previously canceled
+            existing.status = 'enrolled'
+            existing.save()
+            
+            # Schedule follow-up email; repeat re-enrollments share the pending one
+            Notification.objects.get_or_create(
+                enrollment=existing,
+                kind='followup',
+                sent_at=None,
+                defaults={'recipient': request.user, 'due_at': timezone.now() + timedelta(hours=1)}
             )
+            
+            serializer = self.get_serializer(existing)
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
         serializer = self.get_serializer(data={'event': event_id, 'status': 'enrolled'})
         serializer.is_valid(raise_exception=True)
         serializer.save(seeker=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+
+
+SYNC_TOKEN_SALT = 'events.changefeed'
+
+
+def _after_cursor(queryset, field, cursor, until):
+    """Rows strictly after a (timestamp, id) cursor and no newer than `until`, oldest first."""
+    queryset = queryset.filter(**{f'{field}__lte': until})
+    if cursor:
+        moment = parse_datetime(cursor[0])
+        queryset = queryset.filter(**{f'{field}__gte': moment}).exclude(**{field: moment, 'id__lte': cursor[1]})
+    return queryset.order_by(field, 'id')
+
+
+def _take(rows, limit, cursors, key, field):
+    """Trim a page to `limit` rows and advance its cursor to the last one."""
+    rows = list(rows[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        cursors[key] = [rows[-1][field].isoformat(), rows[-1]['id']]
+    return rows, has_more
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsVerified])
+def changefeed(request):
+    """Return events, enrollments, seat counts and deletions changed since the given sync token."""
+    user = request.user
+    cursors = {}
+    token = request.query_params.get('token')
+    if token:
+        try:
+            payload = signing.loads(
+                token,
+                salt=SYNC_TOKEN_SALT,
+                max_age=timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+            )
+        except signing.SignatureExpired:
+            return Response(
+                {'detail': 'Sync token has expired. Start a full sync without a token.', 'code': 'sync_token_expired'},
+                status=status.HTTP_410_GONE
+            )
+        except signing.BadSignature:
+            payload = {}
+        if payload.get('user') != user.pk:
+            return Response(
+                {'detail': 'Invalid sync token.', 'code': 'invalid_sync_token'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cursors = payload['cursors']
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE)), 1), settings.SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = settings.SYNC_PAGE_SIZE
+
+    # A row committed late can carry an earlier timestamp than one already synced past
+    until = timezone.now() - timedelta(seconds=settings.SYNC_LAG_SECONDS)
+    is_facilitator = user.profile.role == 'Facilitator'
+    events = Event.objects.all()
+    event_tombstones = Q(kind='event')
+    if is_facilitator:
+        events = events.filter(created_by=user)
+        event_tombstones &= Q(owner_id=user.pk)
+
+    event_rows, events_more = _take(
+        EventListValuesSerializer.get_values(
+            _after_cursor(events, 'updated_at', cursors.get('events'), until), extra=('updated_at',)
+        ),
+        limit, cursors, 'events', 'updated_at'
+    )
+    if is_sharded():
+        # Take a page from every shard, then keep the oldest `limit + 1` overall
+        enrollment_rows = enrollment_values(
+            lambda queryset: _after_cursor(
+                queryset.filter(seeker=user), 'updated_at', cursors.get('enrollments'), until
+            )[:limit + 1],
+            EnrollmentValuesSerializer.get_columns(extra=('updated_at',))
+        )
+        enrollment_rows.sort(key=itemgetter('updated_at', 'id'))
+    else:
+        enrollment_rows = EnrollmentValuesSerializer.get_values(
+            _after_cursor(Enrollment.objects.filter(seeker=user), 'updated_at', cursors.get('enrollments'), until)
+        )
+    enrollment_rows, enrollments_more = _take(enrollment_rows, limit, cursors, 'enrollments', 'updated_at')
+    # Seat counts change without the event changing; each counted transition stamps the event's daily rollup
+    if 'seats' not in cursors:
+        # Event rows of a first sync carry their current seats already
+        cursors['seats'] = [until.isoformat(), 0]
+    seat_rows, seats_more = _take(
+        _after_cursor(
+            EventDailyRollup.objects.filter(event__in=events), 'updated_at', cursors['seats'], until
+        ).values('id', 'event_id', 'updated_at'),
+        limit, cursors, 'seats', 'updated_at'
+    )
+    seat_event_ids = list(dict.fromkeys(row['event_id'] for row in seat_rows))
+    seats = cached_seat_payloads(seat_event_ids)
+    tombstones, deleted_more = _take(
+        _after_cursor(
+            Tombstone.objects.filter(event_tombstones | Q(kind='enrollment', owner_id=user.pk)),
+            'deleted_at', cursors.get('deleted'), until
+        ).values('id', 'kind', 'object_id', 'deleted_at'),
+        limit, cursors, 'deleted', 'deleted_at'
+    )
+
+    return Response({
+        'events': EventListValuesSerializer(event_rows, many=True).data,
+        'enrollments': EnrollmentValuesSerializer(enrollment_rows, many=True).data,
+        'deleted': {
+            'events': [row['object_id'] for row in tombstones if row['kind'] == 'event'],
+            'enrollments': [row['object_id'] for row in tombstones if row['kind'] == 'enrollment'],
+        },
+        'seats': [seats[event_id] for event_id in seat_event_ids if event_id in seats],
+        'has_more': events_more or enrollments_more or seats_more or deleted_more,
+        'token': signing.dumps({'user': user.pk, 'cursors': cursors}, salt=SYNC_TOKEN_SALT),
+    })
@@ -2,6 +2,7 @@
 ASGI config for events_platform project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Seat availability streams are served here directly; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -9,9 +10,22 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'events_platform.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+if settings.DEBUG:
+    # Serve static files (the admin's) like runserver does
+    django_application = ASGIStaticFilesHandler(django_application)
+
+from events.streams import SEAT_STREAM_PATH, seat_stream  # noqa: E402  (needs apps loaded)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and SEAT_STREAM_PATH.match(scope['path']):
+        return await seat_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
 
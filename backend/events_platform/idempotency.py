@@ -0,0 +1,82 @@
+"""
+`Idempotency-Key` support for create endpoints.
+
+The first response for a key is stored in the cache and replayed for repeats
+from the same user. A cache lock marks the key as in flight, so a concurrent
+duplicate waits for the stored response instead of running the write again.
+Server errors and raised exceptions are not stored, so the client can retry.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+POLL_INTERVAL_SECONDS = 0.05
+
+
+def _fingerprint(request):
+    return hashlib.sha256(json.dumps(request.data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {'detail': 'This Idempotency-Key was already used with a different request.', 'code': 'idempotency_key_reused'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """Make a viewset action replay its first response for a repeated `Idempotency-Key`."""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'detail': 'Idempotency-Key must be at most 255 characters.', 'code': 'invalid_idempotency_key'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        result_key = f'idempotency:{type(self).__name__}:{request.user.pk}:{digest}'
+        lock_key = f'{result_key}:lock'
+        fingerprint = _fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            stored = cache.get(result_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            if cache.add(lock_key, fingerprint, settings.IDEMPOTENCY_LOCK_SECONDS):
+                try:
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code < 500:
+                        cache.set(
+                            result_key,
+                            {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data},
+                            settings.IDEMPOTENCY_KEY_TTL_SECONDS
+                        )
+                    return response
+                finally:
+                    cache.delete(lock_key)
+
+            # Another request holds the key; wait for its response
+            if time.monotonic() >= deadline:
+                return Response(
+                    {'detail': 'A request with this Idempotency-Key is still in progress.', 'code': 'idempotency_in_progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    return wrapper
@@ -0,0 +1,41 @@
+"""
+Batch email sending that knows how far it got.
+
+Batch tasks send their messages one at a time over a single connection, so
+when the mail server fails part way the task can retry just the recipients
+that were not reached instead of dropping (or repeating) the whole batch.
+"""
+import logging
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class PartialSendError(Exception):
+    """Sending stopped after the first `sent` messages of a batch."""
+
+    def __init__(self, sent):
+        super().__init__(f'Sending failed after {sent} message(s)')
+        self.sent = sent
+
+
+def send_in_order(messages):
+    """Send `messages` in order over one connection; raise PartialSendError if one fails."""
+    sent = 0
+    try:
+        with get_connection() as connection:
+            for message in messages:
+                connection.send_messages([message])
+                sent += 1
+    except Exception as error:
+        if sent < len(messages):
+            raise PartialSendError(sent) from error
+        # Everything went out; only closing the connection failed
+        logger.warning('Error closing the mail connection after %d message(s)', sent, exc_info=True)
+    return sent
+
+
+def retry_countdown(retries):
+    """Seconds before retry number `retries + 1` of a batch send, doubling each time."""
+    return settings.EMAIL_RETRY_BACKOFF_SECONDS * 2 ** retries
@@ -0,0 +1,174 @@
+"""
+Pluggable publish/subscribe backends for server-push streams.
+
+Publishers call `get_pubsub().publish(channel, message)` from sync code.
+Subscribers live on an asyncio event loop and read with `await subscription.get()`.
+Subscriptions conflate: a slow listener only sees the latest message for its channel.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Wait between attempts to resubscribe after losing Redis, doubling up to the maximum
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30
+
+
+class Subscription:
+    """One listener on a channel, bound to the event loop that created it."""
+
+    def __init__(self, pubsub, channel):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self._latest = None
+        self._ready = asyncio.Event()
+
+    def deliver(self, message):
+        """Store a message; must be called on the subscription's loop."""
+        self._latest = message
+        self._ready.set()
+
+    async def get(self):
+        """Wait for the next message."""
+        await self._ready.wait()
+        self._ready.clear()
+        return self._latest
+
+    def close(self):
+        self.pubsub.unsubscribe(self)
+
+
+class InProcessPubSub:
+    """Fan messages out to subscribers in this process."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            listeners = self._subscribers.get(subscription.channel)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self.dispatch(channel, message)
+
+    def dispatch(self, channel, message):
+        """Deliver to local subscribers with one thread-safe hop per event loop."""
+        with self._lock:
+            listeners = list(self._subscribers.get(channel, ()))
+
+        by_loop = defaultdict(list)
+        for subscription in listeners:
+            by_loop[subscription.loop].append(subscription)
+
+        for loop, subscriptions in by_loop.items():
+            if loop.is_closed():
+                continue
+            loop.call_soon_threadsafe(_deliver_all, subscriptions, message)
+
+
+def _deliver_all(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class RedisPubSub(InProcessPubSub):
+    """
+    Publish through Redis so every web process sees every message.
+
+    Each process holds a single Redis pattern subscription and fans out to
+    its own subscribers locally, so listener count does not touch Redis.
+    """
+
+    def __init__(self, url=None, prefix='pubsub:'):
+        super().__init__()
+        self.url = url or settings.PUBSUB_REDIS_URL
+        self.prefix = prefix
+        self._client = None
+        self._listener = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, channel, message):
+        import redis
+        try:
+            self.client.publish(self.prefix + channel, json.dumps(message))
+        except redis.RedisError:
+            # Pushes are best effort; the write that triggered them has already committed
+            logger.warning('Could not publish to %s', channel, exc_info=True)
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        self._ensure_listener()
+        return subscription
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='pubsub-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        """Relay Redis messages to local subscribers, resubscribing whenever the connection drops."""
+        import redis
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.prefix + '*')
+                delay = RECONNECT_MIN_SECONDS
+                for item in pubsub.listen():
+                    channel = item['channel'].decode()[len(self.prefix):]
+                    try:
+                        message = json.loads(item['data'])
+                    except ValueError:
+                        logger.warning('Dropped a malformed message on %s', channel)
+                        continue
+                    self.dispatch(channel, message)
+            except redis.RedisError:
+                # Messages published meanwhile are lost; the next seat change brings listeners up to date
+                logger.warning('Lost the Redis subscription; retrying in %.1f s', delay, exc_info=True)
+            finally:
+                try:
+                    pubsub.close()
+                except redis.RedisError:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+_pubsub = None
+_pubsub_lock = threading.Lock()
+
+
+def get_pubsub():
+    """Return the process-wide backend configured by `PUBSUB_BACKEND`."""
+    global _pubsub
+    if _pubsub is None:
+        with _pubsub_lock:
+            if _pubsub is None:
+                _pubsub = import_string(settings.PUBSUB_BACKEND)()
+    return _pubsub
@@ -0,0 +1,211 @@
+"""
+Capture of normalized query shapes and their timings, for the index advisor.
+
+With `QUERY_CAPTURE_FILE` set, every statement is reduced to its shape (IN
+lists, multi-row VALUES and LIMIT/OFFSET numbers collapsed) and counted per
+database alias with its total and worst time. Each process appends its counts
+to the file as JSON lines every `QUERY_CAPTURE_FLUSH_SECONDS` and at exit;
+`python manage.py advise_indexes <file>` merges them. Up to three distinct
+values are kept per placeholder compared with `=` or `IN` against a choices or
+boolean column, so filters that are always the same constant
+(status = 'enrolled') can become partial index conditions. No other parameter
+is written, so emails, codes and ids never reach the file.
+"""
+import atexit
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+
+IN_LIST = re.compile(r'IN \((?:%s, )+%s\)')
+VALUES_ROWS = re.compile(r'(VALUES \((?:%s, )*%s\))(?:, \((?:%s, )*%s\))+')
+# Placeholder groups in statement order, as collapsed by `normalize`
+PLACEHOLDERS = re.compile(r'IN \((?:%s, )*%s\)|VALUES \((?:%s, )*%s\)(?:, \((?:%s, )*%s\))*|%s')
+LIMIT_OFFSET = re.compile(r'\b(LIMIT|OFFSET) \d+')
+# Column compared by the placeholder that follows, e.g. `"events_enrollment"."status" = ` or `U0."status" `
+COMPARED_COLUMN = re.compile(r'(?:"(?P<table>\w+)"|(?P<alias>[A-Z]\d+))\."(?P<column>\w+)" (?:= )?$')
+TABLE_ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+WHITESPACE = re.compile(r'\s+')
+MAX_SAMPLES = 3
+MAX_SAMPLE_LENGTH = 32
+
+
+def normalize(sql):
+    """The statement with its variable-length parts collapsed to one placeholder each."""
+    shape = WHITESPACE.sub(' ', sql).strip()
+    shape = IN_LIST.sub('IN (%s)', shape)
+    shape = VALUES_ROWS.sub(r'\1', shape)
+    return LIMIT_OFFSET.sub(r'\1 1', shape)
+
+
+@lru_cache(maxsize=None)
+def sampled_columns():
+    """(table, column) of every choices or boolean field, the only columns whose values are kept."""
+    from django.apps import apps
+    from django.db import models
+
+    return frozenset(
+        (model._meta.db_table, field.column)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if field.choices or isinstance(field, models.BooleanField)
+    )
+
+
+def _sample(value, column):
+    """The value wrapped in a list when `column` may be sampled, or None."""
+    if column not in sampled_columns():
+        return None
+    if value is None or isinstance(value, (bool, int)):
+        return [value]
+    if isinstance(value, str) and len(value) <= MAX_SAMPLE_LENGTH:
+        return [value]
+    return None
+
+
+def _compared_column(sql, position, aliases):
+    """(table, column) compared with `=` or `IN` by the placeholder at `position`, or None."""
+    match = COMPARED_COLUMN.search(sql, max(position - 200, 0), position)
+    if match is None:
+        return None
+    return match.group('table') or aliases.get(match.group('alias')), match.group('column')
+
+
+def samples_for(sql, params):
+    """Per placeholder of the normalized statement, its sample values (None when not kept)."""
+    sql = WHITESPACE.sub(' ', sql)
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+    samples = []
+    consumed = 0
+    for match in PLACEHOLDERS.finditer(sql):
+        group = match.group()
+        count = group.count('%s')
+        if consumed + count > len(params):
+            return None
+        if group.startswith('IN'):
+            column = _compared_column(sql, match.start(), aliases)
+            samples.append(_sample(params[consumed], column) if count == 1 else None)
+        elif group.startswith('VALUES'):
+            samples.extend([None] * group.partition(')')[0].count('%s'))
+        else:
+            samples.append(_sample(params[consumed], _compared_column(sql, match.start(), aliases)))
+        consumed += count
+    return samples if consumed == len(params) else None
+
+
+def merge_samples(left, right):
+    """Union two per-placeholder sample lists; a placeholder with too many values keeps none."""
+    if left is None or right is None or len(left) != len(right):
+        return None
+    merged = []
+    for ours, theirs in zip(left, right):
+        if ours is None or theirs is None:
+            merged.append(None)
+            continue
+        values = ours + [value for value in theirs if value not in ours]
+        merged.append(values if len(values) <= MAX_SAMPLES else None)
+    return merged
+
+
+class ShapeRecorder:
+    """Execute wrapper that counts calls and time per (alias, shape)."""
+
+    def __init__(self):
+        self.shapes = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(context['connection'].alias, sql, None if many else params, time.perf_counter() - started)
+
+    def record(self, alias, sql, params, seconds):
+        shape = normalize(sql)
+        samples = samples_for(sql, params) if isinstance(params, (list, tuple)) else None
+        self.add({
+            'alias': alias,
+            'shape': shape,
+            'calls': 1,
+            'total_ms': seconds * 1000,
+            'max_ms': seconds * 1000,
+            'samples': samples,
+        })
+
+    def add(self, entry):
+        """Fold one recorded or loaded entry into the counts."""
+        key = (entry['alias'], entry['shape'])
+        with self._lock:
+            current = self.shapes.get(key)
+            if current is None:
+                self.shapes[key] = dict(entry)
+                return
+            current['calls'] += entry['calls']
+            current['total_ms'] += entry['total_ms']
+            current['max_ms'] = max(current['max_ms'], entry['max_ms'])
+            current['samples'] = merge_samples(current['samples'], entry['samples'])
+
+    def drain(self):
+        with self._lock:
+            entries, self.shapes = list(self.shapes.values()), {}
+        return entries
+
+    def load(self, path):
+        """Add every entry of a capture file."""
+        with open(path) as capture:
+            for line in capture:
+                if line.strip():
+                    self.add(json.loads(line))
+
+    def ranked(self):
+        """Entries by total time, most expensive first."""
+        return sorted(self.shapes.values(), key=lambda entry: entry['total_ms'], reverse=True)
+
+
+class FileCapture(ShapeRecorder):
+    """Shape recorder that appends its counts to `QUERY_CAPTURE_FILE` now and then."""
+
+    def __init__(self):
+        super().__init__()
+        self._flushed = time.monotonic()
+        self._file_lock = threading.Lock()
+
+    def record(self, alias, sql, params, seconds):
+        super().record(alias, sql, params, seconds)
+        if time.monotonic() - self._flushed >= settings.QUERY_CAPTURE_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        entries = self.drain()
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries)
+        with self._file_lock, open(settings.QUERY_CAPTURE_FILE, 'a') as capture:
+            capture.write(lines)
+
+
+_capture = None
+
+
+def install_capture(connection, **kwargs):
+    if _capture not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_capture)
+
+
+def install():
+    """Record the shape of every query when `QUERY_CAPTURE_FILE` is set."""
+    global _capture
+    if not settings.QUERY_CAPTURE_FILE or _capture is not None:
+        return
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    _capture = FileCapture()
+    atexit.register(_capture.flush)
+    connection_created.connect(install_capture, dispatch_uid='query_shapes.install_capture')
+    for connection in connections.all(initialized_only=True):
+        install_capture(connection)
@@ -4,8 +4,10 @@ Django settings for events_platform project.
 
 from pathlib import Path
 from datetime import timedelta
+import importlib.util
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'events_platform.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -72,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'events_platform.wsgi.application'
+ASGI_APPLICATION = 'events_platform.asgi.application'
 
 
 # Database
@@ -98,6 +102,23 @@ if os.getenv('USE_SQLITE', 'False') == 'True':
     }
 
 
+# Optional Enrollment sharding across extra database aliases, e.g. ENROLLMENT_SHARDS=shard0,shard1
+ENROLLMENT_SHARDS = [alias.strip() for alias in os.getenv('ENROLLMENT_SHARDS', '').split(',') if alias.strip()]
+for alias in ENROLLMENT_SHARDS:
+    if os.getenv('USE_SQLITE', 'False') == 'True':
+        DATABASES[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / f'{alias}.sqlite3',
+        }
+    else:
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'NAME': os.getenv(f'{alias.upper()}_DB_NAME', f"{DATABASES['default']['NAME']}_{alias}"),
+            'HOST': os.getenv(f'{alias.upper()}_DB_HOST', DATABASES['default']['HOST']),
+        }
+DATABASE_ROUTERS = ['events.sharding.EnrollmentShardRouter']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -154,8 +175,45 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'EXCEPTION_HANDLER': 'events_platform.exceptions.custom_exception_handler',
+    # Reverse proxies in front of the app. Anonymous clients are throttled by the address the
+    # last of them saw (REMOTE_ADDR when 0), so a forged X-Forwarded-For cannot buy a fresh bucket
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+    # Per-scope sliding-window limits, counted per user (valid access token) or per IP
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('LOGIN_THROTTLE_RATE', '10/min'),
+        'signup': os.getenv('SIGNUP_THROTTLE_RATE', '5/hour'),
+        'verify_email': os.getenv('VERIFY_EMAIL_THROTTLE_RATE', '10/min'),
+        'enroll': os.getenv('ENROLL_THROTTLE_RATE', '30/min'),
+    },
 }
 
+# Cache shared by every web process (throttle counters); local memory when no Redis URL is set
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Admin changelists: exact counts stop here, larger tables use the planner's estimate
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_FILTER_CACHE_SECONDS = 60 * 60
+
+# Idempotency-Key replay for create endpoints
+IDEMPOTENCY_CACHE_ALIAS = 'default'
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_KEY_TTL_SECONDS', str(24 * 60 * 60)))
+IDEMPOTENCY_LOCK_SECONDS = 30  # Upper bound on how long one create may hold a key
+IDEMPOTENCY_WAIT_SECONDS = 10  # How long a concurrent duplicate waits before 409
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -176,6 +234,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Retry-After', 'Idempotent-Replayed']
 
 # Email settings (for OTP and scheduled emails)
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
@@ -186,16 +246,128 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@eventsplatform.com')
 
+# Tracing: share of requests (and the tasks they queue) traced, 0 to turn it off,
+# and the exporter spans are written to (StdoutExporter or FileExporter)
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '0'))
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'events_platform.tracing.StdoutExporter')
+TRACING_FILE = os.getenv('TRACING_FILE', str(BASE_DIR / 'traces.jsonl'))
+TRACED_EMAIL_BACKEND = EMAIL_BACKEND
+if TRACING_SAMPLE_RATE:
+    # Wrap the configured backend so SMTP opens and sends show up as spans
+    EMAIL_BACKEND = 'events_platform.tracing.TracingEmailBackend'
+
+# Query shape capture for the index advisor: JSON lines file to append to (empty to turn it off)
+# and how often each process flushes its counts there
+QUERY_CAPTURE_FILE = os.getenv('QUERY_CAPTURE_FILE', '')
+QUERY_CAPTURE_FLUSH_SECONDS = int(os.getenv('QUERY_CAPTURE_FLUSH_SECONDS', '60'))
+
 # OTP Settings
 OTP_EXPIRY_MINUTES = 5
 OTP_MAX_ATTEMPTS = 5
 
+# Bulk seeker invitations: invite OTP lifetime, emails per request, and messages per SMTP connection
+INVITE_EXPIRY_HOURS = int(os.getenv('INVITE_EXPIRY_HOURS', '72'))
+INVITE_MAX_EMAILS = int(os.getenv('INVITE_MAX_EMAILS', '1000'))
+INVITE_EMAIL_BATCH_SIZE = int(os.getenv('INVITE_EMAIL_BATCH_SIZE', '200'))
+
+# Notification digests: everything due to one recipient within the window goes out as one email
+NOTIFICATION_DIGEST_WINDOW_MINUTES = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_MINUTES', '15'))
+NOTIFICATION_LEAD_MINUTES = 5  # Matches the send-event-reminders beat interval
+
+# Event change notices: quiet period that folds a burst of edits into one email, and
+# enrollees per batch task (each batch is sent over one SMTP connection)
+EVENT_CHANGE_COALESCE_SECONDS = int(os.getenv('EVENT_CHANGE_COALESCE_SECONDS', '120'))
+EVENT_CHANGE_BATCH_SIZE = int(os.getenv('EVENT_CHANGE_BATCH_SIZE', '500'))
+
+# Delta sync settings
+SYNC_PAGE_SIZE = 100
+SYNC_MAX_PAGE_SIZE = 500
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '30'))
+SYNC_LAG_SECONDS = 60  # Rows this fresh wait for the next sync, so transactions still open are not skipped
+
+# Archive events (and their enrollments) this many days after they end
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+ARCHIVE_BATCH_SIZE = 100
+
+# Enrollments removed per short transaction when an event is deleted
+EVENT_DELETE_CHUNK_SIZE = 5000
+
+# Columnar analytics export (needs pyarrow): output directory, format (parquet or arrow),
+# rows per chunk, and how long a change waits before it is exported
+ANALYTICS_EXPORT_DIR = os.getenv('ANALYTICS_EXPORT_DIR', str(BASE_DIR / 'exports'))
+ANALYTICS_EXPORT_FORMAT = os.getenv('ANALYTICS_EXPORT_FORMAT', 'parquet')
+ANALYTICS_EXPORT_CHUNK_SIZE = 50000
+ANALYTICS_EXPORT_LAG_SECONDS = 60
+
+# Recommendations kept per seeker, and seekers scored per batch chunk
+RECOMMENDATIONS_TOP_K = 20
+RECOMMENDATIONS_CHUNK_SIZE = 5000
+
+# Free/busy lookups: default and longest window
+FREE_BUSY_DEFAULT_DAYS = 7
+FREE_BUSY_MAX_DAYS = 90
+
+# How long a month's calendar summary is cached; event edits invalidate it sooner
+EVENT_CALENDAR_CACHE_SECONDS = int(os.getenv('EVENT_CALENDAR_CACHE_SECONDS', '60'))
+
+# Batch seat lookups: most ids per request, and how long counts are cached (0 disables;
+# enrollment changes refresh the cached counts as they happen)
+EVENT_SEATS_MAX_IDS = 100
+EVENT_SEATS_CACHE_SECONDS = int(os.getenv('EVENT_SEATS_CACHE_SECONDS', '5'))
+
 # Celery Configuration (for scheduled emails)
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline (no broker needed), e.g. for local development without Redis
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Email lanes: OTPs never wait behind bulk reminder traffic.
+# Run a dedicated worker for the otp queue, e.g. `celery -A events_platform worker -Q otp`.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'accounts.tasks.send_otp_email': {'queue': 'otp'},
+    'accounts.tasks.send_invite_emails': {'queue': 'bulk'},
+    'events.tasks.send_followup_email': {'queue': 'default'},
+    'events.tasks.send_reminder_emails': {'queue': 'bulk'},
+    'events.tasks.send_notification_digests': {'queue': 'bulk'},
+    'events.tasks.send_digest_batch': {'queue': 'bulk'},
+    'events.tasks.notify_event_change': {'queue': 'bulk'},
+    'events.tasks.send_event_change_batch': {'queue': 'bulk'},
+    'events.tasks.prune_tombstones': {'queue': 'bulk'},
+    'events.tasks.archive_past_events': {'queue': 'bulk'},
+    'events.tasks.compute_recommendations': {'queue': 'bulk'},
+    'events.tasks.export_analytics': {'queue': 'bulk'},
+}
+# Per-worker send rate limits per lane (Celery rate strings, e.g. '10/s'; empty for none)
+OTP_EMAIL_RATE_LIMIT = os.getenv('OTP_EMAIL_RATE_LIMIT', '')
+NOTIFICATION_BATCH_RATE_LIMIT = os.getenv('NOTIFICATION_BATCH_RATE_LIMIT', '5/s')
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', '100'))
+# Batch sends that fail part way retry their unsent recipients, backing off from this delay
+EMAIL_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', '5'))
+EMAIL_RETRY_BACKOFF_SECONDS = int(os.getenv('EMAIL_RETRY_BACKOFF_SECONDS', '60'))
+CELERY_TASK_ANNOTATIONS = {
+    'accounts.tasks.send_otp_email': {'rate_limit': OTP_EMAIL_RATE_LIMIT or None},
+    'events.tasks.send_digest_batch': {'rate_limit': NOTIFICATION_BATCH_RATE_LIMIT or None},
+    'accounts.tasks.send_invite_emails': {'rate_limit': NOTIFICATION_BATCH_RATE_LIMIT or None},
+    'events.tasks.send_event_change_batch': {'rate_limit': NOTIFICATION_BATCH_RATE_LIMIT or None},
+}
+# Reserve one task at a time so a worker never sits on a backlog another lane could use
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Server-push settings. Seat changes are published from Celery workers and every web process,
+# so streams go through Redis whenever it is around: PUBSUB_REDIS_URL, or a Redis broker that
+# tasks are sent to. In-process delivery is left for a single process running tasks inline.
+PUBSUB_REDIS_URL = os.getenv('PUBSUB_REDIS_URL', '')
+if not PUBSUB_REDIS_URL and CELERY_BROKER_URL.startswith('redis') and not CELERY_TASK_ALWAYS_EAGER:
+    PUBSUB_REDIS_URL = CELERY_BROKER_URL
+PUBSUB_BACKEND = os.getenv(
+    'PUBSUB_BACKEND',
+    'events_platform.pubsub.RedisPubSub' if PUBSUB_REDIS_URL else 'events_platform.pubsub.InProcessPubSub'
+)
+SEAT_STREAM_KEEPALIVE_SECONDS = 15
+
 # Celery Beat Schedule (only if celery is available)
 try:
     from celery.schedules import crontab
@@ -204,7 +376,25 @@ try:
             'task': 'events.tasks.send_reminder_emails',
             'schedule': crontab(minute='*/5'),  # Run every 5 minutes
         },
+        'prune-sync-tombstones': {
+            'task': 'events.tasks.prune_tombstones',
+            'schedule': crontab(hour=3, minute=0),  # Run daily
+        },
+        'archive-past-events': {
+            'task': 'events.tasks.archive_past_events',
+            'schedule': crontab(hour=4, minute=0),  # Run daily
+        },
+        'compute-recommendations': {
+            'task': 'events.tasks.compute_recommendations',
+            'schedule': crontab(hour=2, minute=0),  # Run daily
+        },
     }
+    # The export needs pyarrow, which is optional
+    if importlib.util.find_spec('pyarrow') is not None:
+        CELERY_BEAT_SCHEDULE['export-analytics'] = {
+            'task': 'events.tasks.export_analytics',
+            'schedule': crontab(minute=15),  # Run hourly
+        }
 except ImportError:
     CELERY_BEAT_SCHEDULE = {}
 
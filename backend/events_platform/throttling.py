@@ -0,0 +1,129 @@
+"""
+Sliding-window rate limits kept in the shared cache.
+
+Each client gets one counter per fixed window; the current count is estimated
+as the current window plus the overlapping share of the previous one. Checking
+a request is a single `get_many`; only accepted requests increment, so a
+rejected request costs one cache round trip. Clients are identified from the
+JWT's user id claim (verified, but without loading the user) or by IP, trusting
+only the `NUM_PROXIES` nearest X-Forwarded-For entries.
+"""
+import math
+import time
+from django.core.cache import caches
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Throttle keyed by its `scope` (or `view.throttle_scope`) and rated by `DEFAULT_THROTTLE_RATES`."""
+
+    scope = None
+    cache_format = 'throttle:%(scope)s:%(ident)s:%(window)s'
+    timer = time.time
+
+    def __init__(self):
+        # Scope and rate are resolved per view in allow_request
+        self.cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def allow_request(self, request, view):
+        self.scope = self.scope or getattr(view, 'throttle_scope', None)
+        if not self.scope or self.scope not in self.THROTTLE_RATES:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.num_requests is None:
+            return True
+
+        ident = self.get_client_ident(request)
+        now = self.timer()
+        window = int(now // self.duration)
+        self.elapsed = now - window * self.duration
+        self.key = self.cache_format % {'scope': self.scope, 'ident': ident, 'window': window}
+        previous_key = self.cache_format % {'scope': self.scope, 'ident': ident, 'window': window - 1}
+
+        counts = self.cache.get_many([previous_key, self.key])
+        self.previous = counts.get(previous_key, 0)
+        self.current = counts.get(self.key, 0)
+        if self.estimate(self.elapsed) >= self.num_requests:
+            return False
+
+        self.increment()
+        return True
+
+    def estimate(self, elapsed):
+        """Requests seen in the last `duration` seconds, weighting the previous window by overlap."""
+        return self.previous * (1 - elapsed / self.duration) + self.current
+
+    def increment(self):
+        # Windows outlive themselves by one duration so the next window can weigh them
+        if self.cache.add(self.key, 1, 2 * self.duration):
+            return
+        try:
+            self.cache.incr(self.key)
+        except ValueError:
+            # Expired between add and incr
+            self.cache.add(self.key, 1, 2 * self.duration)
+
+    def wait(self):
+        """Seconds until the estimate drops below the limit."""
+        if self.current >= self.num_requests:
+            return max(1, math.ceil(self.duration - self.elapsed))
+        # Previous window's weight has to decay until one more request fits
+        target = 1 - (self.num_requests - self.current) / self.previous
+        return max(1, math.ceil(target * self.duration - self.elapsed))
+
+    def get_client_ident(self, request):
+        user_id = self.get_user_id(request)
+        if user_id is not None:
+            return f'user-{user_id}'
+        return f'ip-{self.get_ident(request)}'
+
+    def get_user_id(self, request):
+        """User id from an already authenticated request or a valid access token, without a query."""
+        user = getattr(request, '_user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+        auth = JWTAuthentication()
+        header = auth.get_header(request)
+        raw_token = header and auth.get_raw_token(header)
+        if not raw_token:
+            return None
+        try:
+            return auth.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+        except (InvalidToken, TokenError):
+            return None
+
+
+class LoginThrottle(SlidingWindowThrottle):
+    scope = 'login'
+
+
+class SignupThrottle(SlidingWindowThrottle):
+    scope = 'signup'
+
+
+class VerifyEmailThrottle(SlidingWindowThrottle):
+    scope = 'verify_email'
+
+
+class EnrollThrottle(SlidingWindowThrottle):
+    scope = 'enroll'
+
+
+class ThrottleFirstMixin:
+    """Check throttles before authentication and permissions so rejections never reach the database."""
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self._throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, '_throttles_checked', False):
+            super().check_throttles(request)
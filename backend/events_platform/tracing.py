@@ -0,0 +1,275 @@
+"""
+Lightweight end-to-end tracing for requests, ORM queries, Celery tasks and SMTP sends.
+
+A trace starts at the HTTP request (or at a task queued with no trace) and is
+sampled once there, at `TRACING_SAMPLE_RATE`; unsampled traces record nothing.
+The context travels to Celery as a W3C `traceparent` message header, so a
+task's spans join the request that queued it. Finished spans are handed to
+the exporter named by `TRACING_EXPORTER`, one JSON object per span.
+"""
+import contextvars
+import json
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+TRACEPARENT_HEADER = 'traceparent'
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+MAX_STATEMENT_LENGTH = 1000
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_task_spans = {}
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+class Span:
+    """One timed operation in a trace."""
+
+    def __init__(self, name, trace_id, parent_id=None, sampled=True, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.status = 'ok'
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-{"01" if self.sampled else "00"}'
+
+    def finish(self):
+        if self.sampled:
+            get_exporter().export({
+                'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_id': self.parent_id,
+                'name': self.name,
+                'start': self.start_time,
+                'duration_ms': round((time.perf_counter() - self._started) * 1000, 3),
+                'status': self.status,
+                'attributes': self.attributes,
+            })
+
+
+def parse_traceparent(value):
+    """(trace_id, parent span id, sampled) from a traceparent header, or None."""
+    match = TRACEPARENT_PATTERN.match((value or '').strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_span(name, traceparent=None, **attributes):
+    """
+    Start a span under `traceparent`, else under the current span, else as a new sampled-or-not trace.
+
+    The caller must pass the result to `end_span`.
+    """
+    remote = parse_traceparent(traceparent)
+    parent = _current_span.get()
+    if remote is not None:
+        span = Span(name, remote[0], remote[1], remote[2], attributes)
+    elif parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+    else:
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+        span = Span(name, f'{random.getrandbits(128):032x}', None, sampled, attributes)
+    return span, _current_span.set(span)
+
+
+def end_span(span, token, error=None):
+    if error is not None:
+        span.status = 'error'
+        span.attributes['error'] = repr(error)
+    _current_span.reset(token)
+    span.finish()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Trace a block as a child of the current span; a no-op outside sampled traces."""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    child, token = start_span(name, **attributes)
+    try:
+        yield child
+    except BaseException as exc:
+        end_span(child, token, exc)
+        raise
+    end_span(child, token)
+
+
+class StdoutExporter:
+    """Write spans to stdout as JSON lines."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+
+class FileExporter:
+    """Append spans as JSON lines to `TRACING_FILE`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = open(settings.TRACING_FILE, 'a', buffering=1)
+
+    def export(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = import_string(settings.TRACING_EXPORTER)()
+    return _exporter
+
+
+class TracingMiddleware:
+    """Open a span around every request, continuing an incoming `traceparent`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.TRACING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        request_span, token = start_span(
+            f'{request.method} {request.path}',
+            traceparent=request.headers.get(TRACEPARENT_HEADER),
+            **{'http.method': request.method, 'http.path': request.path}
+        )
+        try:
+            response = self.get_response(request)
+        except BaseException as exc:
+            end_span(request_span, token, exc)
+            raise
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            # Name spans by route so they group across ids
+            request_span.name = f'{request.method} /{match.route}'
+            request_span.attributes['view'] = match.view_name
+        request_span.attributes['http.status_code'] = response.status_code
+        if response.status_code >= 500:
+            request_span.status = 'error'
+        if request_span.sampled:
+            response[TRACEPARENT_HEADER] = request_span.traceparent
+        end_span(request_span, token)
+        return response
+
+
+def trace_query(execute, sql, params, many, context):
+    """Connection execute wrapper that times each query of a sampled trace."""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        return execute(sql, params, many, context)
+    with span(
+        'db.query',
+        **{'db.alias': context['connection'].alias, 'db.statement': sql[:MAX_STATEMENT_LENGTH], 'db.many': many}
+    ):
+        return execute(sql, params, many, context)
+
+
+class TracingEmailBackend:
+    """Email backend that traces the opens and sends of `TRACED_EMAIL_BACKEND`."""
+
+    def __init__(self, fail_silently=False, **kwargs):
+        from django.core.mail import get_connection
+
+        self.backend = get_connection(settings.TRACED_EMAIL_BACKEND, fail_silently=fail_silently, **kwargs)
+
+    def open(self):
+        with span('smtp.open'):
+            return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, email_messages):
+        with span('smtp.send', **{'smtp.messages': len(email_messages)}) as send_span:
+            sent = self.backend.send_messages(email_messages)
+            if send_span is not None:
+                send_span.attributes['smtp.sent'] = sent
+            return sent
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def inject_task_headers(headers=None, **kwargs):
+    """Carry the current trace into a queued task's message headers."""
+    parent = _current_span.get()
+    if parent is not None and headers is not None:
+        headers.setdefault(TRACEPARENT_HEADER, parent.traceparent)
+
+
+def start_task_span(task_id=None, task=None, **kwargs):
+    # Workers expose message headers as request attributes; eagerly applied tasks keep them in `headers`
+    traceparent = getattr(task.request, TRACEPARENT_HEADER, None) or (task.request.headers or {}).get(
+        TRACEPARENT_HEADER
+    )
+    task_span, token = start_span(f'task {task.name}', traceparent=traceparent, **{'celery.task_id': task_id})
+    _task_spans[task_id] = (task_span, token)
+
+
+def end_task_span(task_id=None, state=None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    task_span, token = entry
+    task_span.attributes['celery.state'] = state
+    if state not in (None, 'SUCCESS'):
+        task_span.status = 'error'
+    end_span(task_span, token)
+
+
+def install_query_tracing(connection, **kwargs):
+    if trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_query)
+
+
+def install():
+    """Connect the ORM and Celery hooks when tracing is enabled."""
+    if not settings.TRACING_SAMPLE_RATE:
+        return
+    from celery.signals import before_task_publish, task_postrun, task_prerun
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(install_query_tracing, dispatch_uid='tracing.install_query_tracing')
+    for connection in connections.all(initialized_only=True):
+        install_query_tracing(connection)
+    before_task_publish.connect(inject_task_headers, dispatch_uid='tracing.inject_task_headers')
+    task_prerun.connect(start_task_span, dispatch_uid='tracing.start_task_span')
+    task_postrun.connect(end_task_span, dispatch_uid='tracing.end_task_span')
@@ -6,6 +6,8 @@ function MyEnrollments() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [activeTab, setActiveTab] = useState('upcoming')
+  const [nextUrl, setNextUrl] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchEnrollments()
@@ -20,7 +22,8 @@ function MyEnrollments() {
       } else {
         response = await api.get('/enrollments/past/')
       }
-      setEnrollments(response.data)
+      setEnrollments(response.data.results || response.data)
+      setNextUrl(response.data.next || null)
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to load enrollments')
     } finally {
@@ -28,12 +31,31 @@ function MyEnrollments() {
     }
   }
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true)
+      // `next` is an absolute URL, so it is requested as is
+      const response = await api.get(nextUrl)
+      setEnrollments(current => [...current, ...response.data.results])
+      setNextUrl(response.data.next || null)
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to load more enrollments')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleCancel = async (enrollmentId) => {
     if (!window.confirm('Are you sure you want to cancel this enrollment?')) return
 
     try {
       await api.patch(`/enrollments/${enrollmentId}/`, { status: 'canceled' })
-      setEnrollments(enrollments.filter(e => e.id !== enrollmentId))
+      if (nextUrl) {
+        // Later pages shift by one once this leaves the list, so start over from the first page
+        fetchEnrollments()
+      } else {
+        setEnrollments(enrollments.filter(e => e.id !== enrollmentId))
+      }
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to cancel enrollment')
     }
@@ -90,6 +112,14 @@ function MyEnrollments() {
           ))}
         </div>
       )}
+
+      {nextUrl && (
+        <div style={{ marginTop: '20px', textAlign: 'center' }}>
+          <button className="btn btn-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }